@@ -1,4 +1,16 @@
+"""
+Admin for the intake models.
+
+Every changelist costs the same handful of queries however many rows it
+shows: the owner and pet that each row (and its __str__) refers to are
+joined in with list_select_related, only the displayed columns are loaded,
+and the full-table count is skipped. Pet pickers are autocomplete widgets
+rather than a <select> of every pet, and search goes through the dashboard's
+case search (FTS index on SQLite) instead of LIKE scans across joins.
+"""
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from .dashboard import search_cases
 from .models import (
     PetParent, Pet, HouseholdDetails, FeedingBehavior, FoodPreferences,
     CommercialDietHistory, HomemadeDietHistory, CommercialTreatHistory,
@@ -11,35 +23,217 @@ from .models import (
     AdviceSource, ChronicCondition, BrandToAvoid, TreatPreferenceInPlan
 )
 
-# Register all models in admin
-admin.site.register(PetParent)
-admin.site.register(Pet)
-admin.site.register(HouseholdDetails)
-admin.site.register(FeedingBehavior)
-admin.site.register(FoodPreferences)
-admin.site.register(CommercialDietHistory)
-admin.site.register(HomemadeDietHistory)
-admin.site.register(CommercialTreatHistory)
-admin.site.register(HomemadeTreatHistory)
-admin.site.register(Supplement)
-admin.site.register(RecentDietChange)
-admin.site.register(FoodStorage)
-admin.site.register(FitnessActivity)
-admin.site.register(ActivityDetail)
-admin.site.register(RehabilitationTherapy)
-admin.site.register(MedicalHistory)
-admin.site.register(AdverseReaction)
-admin.site.register(VaccinationStatus)
-admin.site.register(PrimaryVetInfo)
-admin.site.register(ClinicalHistory)
-admin.site.register(ClinicalCondition)
-admin.site.register(LongTermMedication)
-admin.site.register(SurgicalHistory)
-admin.site.register(DiagnosticImaging)
-admin.site.register(ConsentForm)
-admin.site.register(DietPlanPreferences)
-admin.site.register(DoctorNote)
-admin.site.register(AdviceSource)
-admin.site.register(ChronicCondition)
-admin.site.register(BrandToAvoid)
-admin.site.register(TreatPreferenceInPlan)
\ No newline at end of file
+
+class ProjectedChangeList(ChangeList):
+    """Load only the columns the changelist displays"""
+
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        return queryset.only(*self.model_admin.get_list_only(request))
+
+
+class CaseModelAdmin(admin.ModelAdmin):
+    # Paths loaded besides the displayed model fields (what display methods read)
+    list_only_related = ()
+    show_full_result_count = False
+    list_per_page = 50
+
+    def get_changelist(self, request, **kwargs):
+        return ProjectedChangeList
+
+    def get_list_only(self, request):
+        fields = {f.name for f in self.model._meta.concrete_fields}
+        shown = [name for name in self.get_list_display(request) if name in fields]
+        return [self.model._meta.pk.name, *shown, *self.list_only_related]
+
+    def get_queryset(self, request):
+        # The change and delete pages print __str__, which follows the same relations
+        queryset = super().get_queryset(request)
+        if isinstance(self.list_select_related, (list, tuple)):
+            queryset = queryset.select_related(*self.list_select_related)
+        return queryset
+
+    def get_search_results(self, request, queryset, search_term):
+        # search_fields only switch the search box and autocomplete on; every
+        # search is a case search on the owner (name, email, case ID, pet names)
+        if not search_term:
+            return queryset, False
+        return queryset.filter(**{f'{self.owner_path}__in': search_cases(PetParent.objects.all(), search_term)}), False
+
+
+# ═══════════════════════════════════════════════════════
+# INLINES
+# Inline rows print __str__ too, so each joins what it refers to.
+# ═══════════════════════════════════════════════════════
+
+class SelectRelatedInline(admin.TabularInline):
+    related = ('pet',)
+    extra = 0
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(*self.related)
+
+
+class PetInline(SelectRelatedInline):
+    model = Pet
+    related = ('owner',)
+    fields = ['name', 'species', 'breed', 'sex']
+    show_change_link = True
+
+
+class ConsentInline(SelectRelatedInline):
+    model = ConsentForm
+    related = ('pet_parent',)
+
+
+class LongTermMedicationInline(SelectRelatedInline):
+    model = LongTermMedication
+
+
+class SurgicalHistoryInline(SelectRelatedInline):
+    model = SurgicalHistory
+
+
+class DiagnosticImagingInline(SelectRelatedInline):
+    model = DiagnosticImaging
+
+
+class DoctorNoteInline(SelectRelatedInline):
+    model = DoctorNote
+
+
+class ClinicalConditionInline(SelectRelatedInline):
+    model = ClinicalCondition
+    related = ('clinical_history__pet',)
+
+
+# ═══════════════════════════════════════════════════════
+# CASE ROOTS
+# ═══════════════════════════════════════════════════════
+
+@admin.register(PetParent)
+class PetParentAdmin(CaseModelAdmin):
+    owner_path = 'pk'
+    list_display = ['case_id', 'name', 'email', 'phone', 'created_at']
+    # Backed by petparent_created_idx
+    list_filter = ['created_at']
+    search_fields = ['case_id']
+    readonly_fields = ['case_id']
+    inlines = [PetInline, ConsentInline]
+
+
+@admin.register(Pet)
+class PetAdmin(CaseModelAdmin):
+    owner_path = 'owner'
+    list_display = ['name', 'species', 'breed', 'owner_name', 'case_id']
+    list_only_related = ['owner', 'owner__name', 'owner__case_id']
+    list_select_related = ['owner']
+    # Backed by pet_species_name_idx (filter, then the default ordering)
+    list_filter = ['species']
+    search_fields = ['name']
+    autocomplete_fields = ['owner']
+    inlines = [LongTermMedicationInline, SurgicalHistoryInline, DiagnosticImagingInline, DoctorNoteInline]
+
+    @admin.display(description='Owner', ordering='owner__name')
+    def owner_name(self, obj):
+        return obj.owner.name
+
+    @admin.display(description='Case ID', ordering='owner__case_id')
+    def case_id(self, obj):
+        return obj.owner.case_id
+
+
+@admin.register(ConsentForm)
+class ConsentFormAdmin(CaseModelAdmin):
+    owner_path = 'pet_parent'
+    list_display = ['pet_parent_name', 'agreed', 'date_signed']
+    list_only_related = ['pet_parent', 'pet_parent__name', 'pet_parent__case_id']
+    list_select_related = ['pet_parent']
+    search_fields = ['pet_parent__case_id']
+    autocomplete_fields = ['pet_parent']
+
+    @admin.display(description='Pet parent', ordering='pet_parent__name')
+    def pet_parent_name(self, obj):
+        return str(obj.pet_parent)
+
+
+# ═══════════════════════════════════════════════════════
+# PET SECTIONS
+# ═══════════════════════════════════════════════════════
+
+class PetSectionAdmin(CaseModelAdmin):
+    """A section of the intake form: listed by pet and case ID"""
+    owner_path = 'pet__owner'
+    list_only_related = ['pet', 'pet__name', 'pet__owner', 'pet__owner__case_id']
+    list_select_related = ['pet__owner']
+    search_fields = ['pet__name']
+    autocomplete_fields = ['pet']
+
+    @admin.display(description='Pet', ordering='pet__name')
+    def pet_name(self, obj):
+        return obj.pet.name
+
+    @admin.display(description='Case ID', ordering='pet__owner__case_id')
+    def case_id(self, obj):
+        return obj.pet.owner.case_id
+
+
+# Columns shown before the pet and case ID
+SECTION_COLUMNS = {
+    HouseholdDetails: ['who_feeds'],
+    FeedingBehavior: ['meals_per_day'],
+    FoodPreferences: ['refuses_food'],
+    CommercialDietHistory: ['brand', 'diet_type'],
+    HomemadeDietHistory: ['ingredient_food_item', 'feed_frequency_per_day'],
+    CommercialTreatHistory: ['brand', 'treat_type'],
+    HomemadeTreatHistory: ['ingredient', 'treat_type_form'],
+    Supplement: ['brand_name', 'form'],
+    RecentDietChange: ['brand', 'start_date'],
+    FoodStorage: ['food_type', 'storage_location'],
+    FitnessActivity: ['activity_level'],
+    ActivityDetail: ['activity_type', 'frequency_per_week'],
+    RehabilitationTherapy: ['receives_therapy'],
+    MedicalHistory: ['weight_change'],
+    AdverseReaction: ['brand', 'form_type'],
+    VaccinationStatus: ['yearly_vaccinations'],
+    PrimaryVetInfo: ['vet_name', 'clinic_phone'],
+    LongTermMedication: ['medication_name', 'dose', 'frequency'],
+    SurgicalHistory: ['surgery_name', 'date_performed'],
+    DiagnosticImaging: ['imaging_type', 'date_performed'],
+    DietPlanPreferences: ['id'],
+    AdviceSource: ['id'],
+    ChronicCondition: ['has_chronic'],
+    BrandToAvoid: ['brand_name', 'reason'],
+    TreatPreferenceInPlan: ['id'],
+    DoctorNote: ['created_at'],
+}
+
+for model, columns in SECTION_COLUMNS.items():
+    admin.site.register(model, type(f'{model.__name__}Admin', (PetSectionAdmin,), {
+        'list_display': [*columns, 'pet_name', 'case_id'],
+    }))
+
+
+@admin.register(ClinicalHistory)
+class ClinicalHistoryAdmin(PetSectionAdmin):
+    list_display = ['pet_name', 'case_id', 'created_at']
+    inlines = [ClinicalConditionInline]
+
+
+@admin.register(ClinicalCondition)
+class ClinicalConditionAdmin(CaseModelAdmin):
+    owner_path = 'clinical_history__pet__owner'
+    list_display = ['condition_disease', 'medication_name', 'pet_name', 'case_id']
+    list_only_related = ['clinical_history', 'clinical_history__pet', 'clinical_history__pet__name',
+                         'clinical_history__pet__owner', 'clinical_history__pet__owner__case_id']
+    list_select_related = ['clinical_history__pet__owner']
+    search_fields = ['clinical_history__pet__name']
+    autocomplete_fields = ['clinical_history']
+
+    @admin.display(description='Pet', ordering='clinical_history__pet__name')
+    def pet_name(self, obj):
+        return obj.clinical_history.pet.name
+
+    @admin.display(description='Case ID', ordering='clinical_history__pet__owner__case_id')
+    def case_id(self, obj):
+        return obj.clinical_history.pet.owner.case_id
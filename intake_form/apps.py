@@ -1,5 +1,22 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
 
 
 class IntakeFormConfig(AppConfig):
     name = 'intake_form'
+
+    def ready(self):
+        from . import checks  # noqa: F401 (registers the system checks)
+        from . import db_tuning, instrumentation, journal, metrics, signals
+        # Model signals: case versions, multi-select choices, blob refcounts
+        signals.connect()
+        # SQLite pragmas (WAL, busy timeout, ...) on every new connection
+        connection_created.connect(db_tuning.tune_sqlite, dispatch_uid='sqlite_pragmas')
+        # "database is locked" counter for /metrics, on every connection
+        connection_created.connect(metrics.watch_locked_errors, dispatch_uid='metrics_locked_errors')
+        # Per-request query counts (RequestTimingMiddleware), whichever thread runs the query
+        connection_created.connect(instrumentation.watch_request_queries,
+                                   dispatch_uid='instrumentation_request_queries')
+        # On a process's first request: drain what an earlier process left in the intake journal
+        request_started.connect(journal.drain_leftovers, dispatch_uid=journal.LEFTOVERS_UID)
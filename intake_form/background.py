@@ -0,0 +1,41 @@
+"""
+Named thread pools for work that should not hold up a request (PDF rendering,
+upload post-processing). Each pool is created on first use.
+"""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from django.db import close_old_connections
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _in_worker(fn, *args):
+    # Worker threads get their own DB connections; like a request, reuse one
+    # until CONN_MAX_AGE and drop any that broke
+    close_old_connections()
+    try:
+        return fn(*args)
+    finally:
+        close_old_connections()
+
+
+def submit(pool_name, workers, fn, *args):
+    """
+    Run fn(*args) on the named pool and return its Future.
+
+    With workers = 0 the call runs inline and the Future is already resolved.
+    The tests use this: their uncommitted data is invisible to other threads.
+    """
+    if not workers:
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+    with _pools_lock:
+        pool = _pools.get(pool_name)
+        if pool is None:
+            pool = _pools[pool_name] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=pool_name)
+    return pool.submit(_in_worker, fn, *args)
@@ -0,0 +1,373 @@
+"""
+Benchmarks on a throwaway, seeded database.
+
+URL benchmarks (manage.py bench_urls) drive every intake_form page through
+the test client and record, per scenario, the queries per request, p50/p95/max
+latency and peak Python memory (tracemalloc, measured on a separate request so
+it doesn't skew the timings).
+
+The SQLite concurrency benchmark (manage.py bench_sqlite) runs reader and
+writer threads against one database file under each SQLITE_PROFILES entry.
+
+Page weight (manage.py bench_page_weight) is the bytes each page sends: its
+HTML and the static assets it links, on a first and on a repeat visit.
+"""
+import gzip
+import random
+import re
+import statistics
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from itertools import islice
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, close_old_connections, connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from .compression import brotli
+from .dashboard import keyset_page
+from .loaders import load_case_graph
+from .models import ClinicalHistory, Pet, PetParent, VetUpload
+from .sample_data import sample_intake_post
+from .submission import parse_intake_submission
+from .synthetic import generate_batch, missing_indexes, shared_blobs
+
+SEED_BATCH = 500
+
+
+# ═══════════════════════════════════════════════════════
+# DATABASE & SEEDING
+# ═══════════════════════════════════════════════════════
+
+@contextmanager
+def bench_database(sqlite_path=None, keepdb=False):
+    """
+    Run against a separate database built the way the test runner builds
+    one (migrated, empty). With keepdb it survives for the next run, seeded
+    cases included. `sqlite_path` puts a SQLite benchmark database in a file
+    instead of memory.
+    """
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_name, old_test_name = connection.settings_dict['NAME'], test_settings.get('NAME')
+    if sqlite_path and connection.vendor == 'sqlite':
+        test_settings['NAME'] = str(sqlite_path)
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        test_settings['NAME'] = old_test_name
+
+
+def seed_cases(count, seed=0):
+    """Top the database up to `count` synthetic cases (see synthetic.py); returns the number created"""
+    blobs = shared_blobs()
+    todo = missing_indexes(seed, count)
+    created = 0
+    while batch := list(islice(todo, SEED_BATCH)):
+        created += generate_batch(seed, batch, blobs=blobs)[0]
+    return created
+
+
+# ═══════════════════════════════════════════════════════
+# SCENARIOS
+# Each returns (method, path, data) for one request; setup work done
+# here (picking a pet, creating the upload to delete) is not timed.
+# ═══════════════════════════════════════════════════════
+
+def vet_form_post(pet, notes):
+    """The vet form as the page would post it back, with only the notes edited"""
+    post = {'additional_notes': notes}
+    history = ClinicalHistory.objects.filter(pet=pet).first()
+    conditions = list(history.conditions.all()) if history else []
+    post['cond_id[]'] = [c.pk for c in conditions]
+    post['cond_disease[]'] = [c.condition_disease for c in conditions]
+    post['cond_symptoms[]'] = [c.clinical_symptoms for c in conditions]
+    post['cond_medication[]'] = [c.medication_name for c in conditions]
+    post['cond_dose[]'] = [c.dose_frequency for c in conditions]
+    post['cond_length[]'] = [c.treatment_length for c in conditions]
+    medications = list(pet.long_term_medications.all())
+    post['med_id[]'] = [m.pk for m in medications]
+    post['med_name[]'] = [m.medication_name for m in medications]
+    post['med_dose[]'] = [m.dose for m in medications]
+    post['med_frequency[]'] = [m.frequency for m in medications]
+    return post
+
+
+class Scenarios:
+    """Request builders, sharing a seeded random pick of pets"""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.pet_ids = list(Pet.objects.values_list('pk', flat=True))
+        self.counter = 0
+
+    def pet(self):
+        return Pet.objects.get(pk=self.rng.choice(self.pet_ids))
+
+    def intake_form_get(self):
+        return 'get', reverse('intake_form'), None
+
+    def intake_form_post(self):
+        self.counter += 1
+        post = sample_intake_post(index=self.counter, rng=self.rng)
+        post['parent_email'] = f'bench-post-{time.time_ns()}@example.com'
+        return 'post', reverse('intake_form'), post
+
+    def case_list(self):
+        return 'get', reverse('case_list'), None
+
+    def case_list_search(self):
+        return 'get', reverse('case_list'), {'q': self.rng.choice(['Bruno', 'Luna', 'Labrador', 'Owner 1'])}
+
+    def case_detail(self):
+        return 'get', reverse('case_detail', args=[self.pet().pk]), None
+
+    def case_pdf(self):
+        return 'get', reverse('case_pdf', args=[self.pet().pk]), None
+
+    def vet_form_get(self):
+        return 'get', reverse('vet_form', args=[self.pet().pk]), None
+
+    def vet_form_post(self):
+        pet = self.pet()
+        return 'post', reverse('vet_form', args=[pet.pk]), vet_form_post(pet, f'Reviewed {time.time_ns()}')
+
+    def delete_vet_upload(self):
+        upload = VetUpload.objects.create(
+            pet=self.pet(), category='blood_work', original_filename='cbc.pdf',
+            file=SimpleUploadedFile('cbc.pdf', b'%PDF-1.4 ' + str(time.time_ns()).encode()),
+        )
+        return 'post', reverse('delete_vet_upload', args=[upload.pk]), None
+
+
+SCENARIOS = [
+    'intake_form_get', 'intake_form_post', 'case_list', 'case_list_search', 'case_detail', 'case_pdf',
+    'vet_form_get', 'vet_form_post', 'delete_vet_upload',
+]
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+def run_scenario(client, build, requests):
+    """Time `requests` requests built by `build`; returns the stats dict"""
+    timings, queries, statuses = [], [], set()
+    for _ in range(requests):
+        method, path, data = build()
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = getattr(client, method)(path, data)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(len(ctx.captured_queries))
+        statuses.add(response.status_code)
+
+    method, path, data = build()
+    tracemalloc.start()
+    try:
+        getattr(client, method)(path, data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'requests': requests,
+        'status': sorted(statuses),
+        'queries': statistics.median(queries),
+        'queries_max': max(queries),
+        'p50_ms': round(_percentile(timings, 50), 2),
+        'p95_ms': round(_percentile(timings, 95), 2),
+        'max_ms': round(max(timings), 2),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(requests=30, scenarios=None, seed=0):
+    """Run each scenario against the current database; returns {scenario: stats}"""
+    scenario = Scenarios(random.Random(seed))
+    client = Client()
+    results = {}
+    for name in scenarios or SCENARIOS:
+        cache.clear()
+        results[name] = run_scenario(client, getattr(scenario, name), requests)
+    return results
+
+
+# ═══════════════════════════════════════════════════════
+# SQLITE CONCURRENCY
+# ═══════════════════════════════════════════════════════
+
+# name: (SQLITE_PRAGMAS, transaction_mode, CONN_MAX_AGE). 'stock' is plain
+# SQLite as Django opens it; 'tuned' is whatever settings configure.
+SQLITE_PROFILES = {
+    'stock': ({'journal_mode': 'DELETE', 'synchronous': 'FULL', 'busy_timeout': 5000, 'mmap_size': 0,
+               'cache_size': -2000, 'temp_store': 'DEFAULT'}, 'DEFERRED', 0),
+    'tuned': (None, None, None),
+}
+
+
+@contextmanager
+def sqlite_profile(name):
+    """Open every new connection with the profile's pragmas and options"""
+    pragmas, transaction_mode, conn_max_age = SQLITE_PROFILES[name]
+    db = connection.settings_dict
+    saved = db.get('OPTIONS', {}), db.get('CONN_MAX_AGE', 0)
+    if transaction_mode is not None:
+        db['OPTIONS'] = {**saved[0], 'transaction_mode': transaction_mode}
+    if conn_max_age is not None:
+        db['CONN_MAX_AGE'] = conn_max_age
+    overrides = override_settings(SQLITE_PRAGMAS=pragmas) if pragmas is not None else override_settings()
+    connection.close()
+    try:
+        with overrides:
+            yield
+    finally:
+        connection.close()
+        db['OPTIONS'], db['CONN_MAX_AGE'] = saved
+
+
+def _write_case(rng, index):
+    post = sample_intake_post(index=index, rng=rng)
+    post['parent_email'] = f'bench-sqlite-{time.time_ns()}-{index}@example.com'
+    parse_intake_submission(post).save()
+
+
+def _read_cases(rng, pet_ids):
+    list(keyset_page(PetParent.objects.prefetch_related('pets'))[0])
+    load_case_graph(rng.choice(pet_ids))
+
+
+def _load_thread(op, seconds, seed, results):
+    """Run `op` back to back for `seconds`, each call like one request (own connection unless reused)"""
+    rng = random.Random(seed)
+    timings, locked = [], 0
+    deadline = time.perf_counter() + seconds
+    try:
+        while (start := time.perf_counter()) < deadline:
+            try:
+                op(rng)
+                timings.append((time.perf_counter() - start) * 1000)
+            except OperationalError as exc:
+                if 'locked' not in str(exc):
+                    raise
+                locked += 1
+            close_old_connections()
+    finally:
+        connections.close_all()
+    results.append((timings, locked))
+
+
+def _summary(results, seconds):
+    timings = [t for thread_timings, _ in results for t in thread_timings]
+    return {
+        'ops_per_s': round(len(timings) / seconds, 1),
+        'p50_ms': round(_percentile(timings, 50), 2) if timings else None,
+        'p95_ms': round(_percentile(timings, 95), 2) if timings else None,
+        'locked_errors': sum(locked for _, locked in results),
+    }
+
+
+def run_sqlite_concurrency(readers=4, writers=2, seconds=5, seed=0):
+    """Concurrent case writes and dashboard/case reads for `seconds`; returns {'reads': ..., 'writes': ...}"""
+    pet_ids = list(Pet.objects.values_list('pk', flat=True))
+    counter = iter(range(10 ** 9))
+    lock = threading.Lock()
+
+    def write(rng):
+        with lock:
+            index = next(counter)
+        _write_case(rng, index)
+
+    reads, writes = [], []
+    threads = [threading.Thread(target=_load_thread, args=(write, seconds, seed + i, writes))
+               for i in range(writers)]
+    threads += [threading.Thread(target=_load_thread, args=(lambda rng: _read_cases(rng, pet_ids), seconds,
+                                                            seed + writers + i, reads))
+                for i in range(readers)]
+    connection.close()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {'reads': _summary(reads, seconds), 'writes': _summary(writes, seconds)}
+
+
+# ═══════════════════════════════════════════════════════
+# PAGE WEIGHT
+# Measured through the test client, so with whatever the middleware sends:
+# run it against collectstatic output with DEBUG off (bench_page_weight does).
+# ═══════════════════════════════════════════════════════
+
+PAGE_WEIGHT_PAGES = ['intake_form', 'success', 'case_list', 'case_detail', 'case_pdf', 'vet_form']
+CASE_PAGES = {'case_detail', 'case_pdf', 'vet_form'}
+ASSET_LINK = re.compile(r'<(?:link|script)\b[^>]*?\b(?:href|src)="([^"]+)"')
+BROWSER_ACCEPT_ENCODING = 'gzip, deflate, br'
+# STORAGES as settings.py picks them with DEBUG off
+PRODUCTION_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
+
+
+def _body(response):
+    return b''.join(response.streaming_content) if response.streaming else response.content
+
+
+def _decoded(response, body):
+    coding = response.get('Content-Encoding')
+    if coding == 'gzip':
+        return gzip.decompress(body)
+    if coding == 'br':
+        return brotli.decompress(body)
+    return body
+
+
+def page_weight(client, path):
+    """Bytes on the wire for one page and the assets it links"""
+    response = client.get(path, HTTP_ACCEPT_ENCODING=BROWSER_ACCEPT_ENCODING)
+    html = _body(response)
+    assets = []
+    for url in ASSET_LINK.findall(_decoded(response, html).decode(errors='replace')):
+        if not url.startswith(settings.STATIC_URL):
+            continue
+        asset = client.get(url, HTTP_ACCEPT_ENCODING=BROWSER_ACCEPT_ENCODING)
+        assets.append({
+            'url': url,
+            'status': asset.status_code,
+            'bytes': len(_body(asset)),
+            'encoding': asset.get('Content-Encoding', 'identity'),
+            'immutable': 'immutable' in asset.get('Cache-Control', ''),
+        })
+    return {
+        'status': response.status_code,
+        'html_bytes': len(html),
+        'html_encoding': response.get('Content-Encoding', 'identity'),
+        'assets': assets,
+        'first_visit_bytes': len(html) + sum(a['bytes'] for a in assets),
+        # Immutable assets come from the browser cache without a request
+        'repeat_visit_bytes': len(html) + sum(a['bytes'] for a in assets if not a['immutable']),
+    }
+
+
+def run_page_weight(pages=None):
+    """page_weight() for each page (case pages use the first case); returns {page: stats}"""
+    pet = Pet.objects.order_by('pk').first()
+    client = Client()
+    results = {}
+    for name in pages or PAGE_WEIGHT_PAGES:
+        if name in CASE_PAGES:
+            if pet is None:
+                continue
+            path = reverse(name, args=[pet.pk])
+        else:
+            path = reverse(name)
+        results[name] = page_weight(client, path)
+    return results
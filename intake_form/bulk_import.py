@@ -0,0 +1,140 @@
+"""
+Bulk import of historical intakes (manage.py import_cases).
+
+Each record uses the intake form's field names, so a row goes through the
+same builders as a live submission:
+
+    JSONL  one object per line; list values for multi-value fields
+           {"parent_name": "Asha", "pet_name": "Bruno", "food_preferences": ["raw", "kibble"]}
+    CSV    one row per case with a header row; repeat a column for each value
+           of a multi-value field (food_preferences,food_preferences)
+
+Files are read as a stream and handed out in batches; each batch is saved by
+save_case_graphs() with one INSERT per table.
+"""
+import csv
+import json
+from django.db import IntegrityError
+from django.utils.datastructures import MultiValueDict
+from .models import PetParent
+from .submission import parse_intake_submission, save_case_graphs, validate_intake
+
+# Saves of a whole batch before falling back to one case at a time, when other
+# workers keep taking its emails first
+BATCH_ATTEMPTS = 3
+
+# ═══════════════════════════════════════════════════════
+# READERS
+# Each yields (line number, MultiValueDict) without loading the file.
+# ═══════════════════════════════════════════════════════
+
+def _as_list(value):
+    if value is None:
+        return []
+    values = value if isinstance(value, list) else [value]
+    return ['' if v is None else str(v) for v in values]
+
+
+def read_jsonl(f):
+    for line_no, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield line_no, ValueError(f'Not valid JSON: {exc}')
+            continue
+        if not isinstance(record, dict):
+            yield line_no, ValueError('Expected a JSON object')
+            continue
+        yield line_no, MultiValueDict({key: _as_list(value) for key, value in record.items()})
+
+
+def read_csv(f):
+    reader = csv.reader(f)
+    header = next(reader, [])
+    for row in reader:
+        if not any(row):
+            continue
+        record = MultiValueDict()
+        for key, value in zip(header, row):
+            if key:
+                record.appendlist(key, value)
+        yield reader.line_num, record
+
+
+READERS = {'jsonl': read_jsonl, 'csv': read_csv}
+
+
+def batches(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ═══════════════════════════════════════════════════════
+# WRITING (runs in worker processes, see import_worker.py)
+# ═══════════════════════════════════════════════════════
+
+def _new_cases(valid):
+    """(line number, graph) for records whose email isn't taken; (cases, skipped, duplicate errors)"""
+    emails = {graph.parent.email for _, graph in valid}
+    existing = set(PetParent.objects.filter(email__in=emails).values_list('email', flat=True))
+    cases, seen, skipped, duplicates = [], set(), 0, []
+    for line_no, graph in valid:
+        email = graph.parent.email
+        if email in existing:
+            skipped += 1
+        elif email in seen:
+            duplicates.append((line_no, f'Duplicate email {email} earlier in the file'))
+        else:
+            seen.add(email)
+            cases.append((line_no, graph))
+    return cases, skipped, duplicates
+
+
+def import_batch(batch):
+    """
+    Validate and save one batch. Returns (saved, skipped, errors): skipped
+    counts cases whose email is already in the database (re-runs are safe),
+    errors is a list of (line number, message).
+    """
+    errors = []
+    valid = []
+    records = []
+    for line_no, record in batch:
+        if isinstance(record, Exception):
+            errors.append((line_no, str(record)))
+            continue
+        graph, problems = validate_intake(record)
+        if problems:
+            errors.append((line_no, ' '.join(problems)))
+        else:
+            valid.append((line_no, graph))
+            records.append((line_no, record))
+
+    for _ in range(BATCH_ATTEMPTS):
+        cases, skipped, duplicates = _new_cases(valid)
+        try:
+            save_case_graphs([graph for _, graph in cases])
+            return len(cases), skipped, errors + duplicates
+        except IntegrityError:
+            # Another worker saved one of these emails meanwhile. The rolled-back
+            # instances still carry their pks, so rebuild them and look again.
+            valid = [(line_no, parse_intake_submission(record)) for line_no, record in records]
+
+    # Still losing races: one case at a time, so a conflict fails only its own row
+    cases, skipped, duplicates = _new_cases(valid)
+    saved = 0
+    for line_no, graph in cases:
+        try:
+            save_case_graphs([graph])
+            saved += 1
+        except IntegrityError as exc:
+            duplicates.append((line_no, f'Saved by another import meanwhile ({exc})'))
+    return saved, skipped, errors + duplicates
@@ -0,0 +1,110 @@
+"""
+Case pages: rendered HTML cached per case version, and conditional GET.
+
+Every case page carries an ETag and Last-Modified taken from CaseVersion
+(one small query, no rendering), plus the page's template and static build,
+so a deploy also invalidates. A nutritionist reopening a case that hasn't
+changed gets a 304 and their browser's copy.
+"""
+import functools
+import hashlib
+import os
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import caches
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.template.loader import get_template
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from .metrics import CACHE_REQUESTS
+from .models import CaseVersion
+
+CACHE_ALIAS = 'default'
+
+
+def cache_stats():
+    """{page: {'hits': n, 'misses': n}} for this process"""
+    stats = {}
+    for (page, outcome), n in CACHE_REQUESTS.collect().items():
+        stats.setdefault(page, {'hits': 0, 'misses': 0})[outcome] = n
+    return stats
+
+
+def case_page_key(page, pet_id, version):
+    return f'case-page:{page}:{pet_id}:{version}'
+
+
+def page_revision(page):
+    """What a page's HTML depends on besides the data: its template and the static build"""
+    template = get_template(f'intake_form/{page}.html')
+    try:
+        mtime = os.stat(template.origin.name).st_mtime_ns
+    except (OSError, TypeError):
+        mtime = 0
+    manifest = getattr(staticfiles_storage, 'manifest_hash', '')
+    return hashlib.sha256(f'{mtime}:{manifest}'.encode()).hexdigest()[:12]
+
+
+def conditional_page(request, etag, changed_at, render):
+    """
+    304 if the browser's copy is current, else render(); the validators go on
+    both. Responses are private (patient data) and always revalidated.
+    """
+    last_modified = int(changed_at.timestamp()) if changed_at else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = render()
+    if request.method in ('GET', 'HEAD') and response.status_code in (200, 304):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def cached_case_page(page):
+    """
+    Cache a case view's rendered HTML per pet and CaseVersion, and answer
+    conditional GETs from the version alone.
+
+    Saving anything on the case bumps its version (see signals.py), so stale
+    pages are simply never looked up again and age out of the LRU cache. The
+    version lives in the database, so this stays correct across processes.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, pk, *args, **kwargs):
+            stamp = CaseVersion.objects.filter(pet_id=pk).values_list('version', 'changed_at').first()
+            if stamp is None:
+                return view(request, pk, *args, **kwargs)
+            version, changed_at = stamp
+
+            def render():
+                cache = caches[CACHE_ALIAS]
+                key = case_page_key(page, pk, version)
+                content = cache.get(key)
+                if content is not None:
+                    CACHE_REQUESTS.inc(page=page, outcome='hits')
+                    return HttpResponse(content)
+
+                CACHE_REQUESTS.inc(page=page, outcome='misses')
+                response = view(request, pk, *args, **kwargs)
+                if response.status_code == 200 and not response.streaming:
+                    cache.set(key, response.content)
+                return response
+
+            etag = f'"{page}-{pk}-{version}-{page_revision(page)}"'
+            return conditional_page(request, etag, changed_at, render)
+        return wrapper
+    return decorator
+
+
+def conditional_case_list(view):
+    """ETag/Last-Modified for the dashboard: any case added, changed or deleted changes them"""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        stamp = CaseVersion.objects.aggregate(cases=Count('pk'), changed_at=Max('changed_at'))
+        latest = stamp['changed_at'].timestamp() if stamp['changed_at'] else 0
+        etag = f'"case_list-{stamp["cases"]}-{latest:.6f}-{page_revision("case_list")}"'
+        return conditional_page(request, etag, stamp['changed_at'], lambda: view(request, *args, **kwargs))
+    return wrapper
@@ -0,0 +1,272 @@
+"""
+Server-side PDFs of a case: layout (mirrors case_pdf.html), a thread pool that
+renders them off the request thread, and an artifact store keyed by CaseVersion
+so a PDF is only ever rendered once per version of a case.
+"""
+import re
+import threading
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+from . import background
+from .loaders import load_case_graph, uploads_by_category
+from .models import CaseVersion
+from .pdf import PdfDocument
+
+ARTIFACT_DIR = 'case_pdfs'
+ARTIFACT_FILE = re.compile(r'v(\d+)\.pdf')
+
+
+def _yes_no(flag, detail=''):
+    if not flag:
+        return 'No'
+    return f'Yes: {detail}' if detail else 'Yes'
+
+
+def _date(value, fmt='%d %b %Y'):
+    return timezone.localtime(value).strftime(fmt) if value else '-'
+
+
+# ═══════════════════════════════════════════════════════
+# LAYOUT
+# ═══════════════════════════════════════════════════════
+
+def build_case_document(pet):
+    """Lay out a case loaded with loaders.case_graph_queryset()"""
+    owner = pet.owner
+    doc = PdfDocument(title=f'{owner.case_id} - {pet.name}', footer=f'Poshtik NutriVet - Case {owner.case_id}')
+    doc.title_block('Poshtik NutriVet - Diet History Form', 'Canine Clinical Nutrition Service')
+    doc.field('Case', f'{owner.case_id}  ({_date(owner.created_at)})')
+    doc.field('Pet', f'{pet.name} ({pet.get_species_display()}) - {pet.breed}, {pet.dob_age}')
+
+    doc.heading('1. Owner & Pet')
+    doc.field('Owner', f'{owner.name} | {owner.email} | {owner.phone}')
+    doc.field('Sex / Neutered', pet.get_sex_display() + (' (Neutered)' if pet.neutered else ''))
+    weight = f'{pet.current_weight_kg} kg' if pet.current_weight_kg else '-'
+    doc.field('Weight', f'{weight} | Body: {pet.get_body_condition_display()}')
+    doc.field('Goals', pet.consultation_goals)
+
+    doc.heading('2. Household')
+    h = getattr(pet, 'household', None)
+    if h:
+        doc.field('Avoid', h.food_ingredients_to_avoid)
+        doc.field('Special Food', h.can_arrange_special_food)
+        doc.field('Feeds', h.who_feeds + (f' ({h.feeder_name})' if h.feeder_name else ''))
+        doc.field('Other Pets', _yes_no(h.other_pets, h.other_pets_details))
+        doc.field('Housing', h.pet_housed)
+    else:
+        doc.note('No data')
+
+    doc.heading('3. Feeding')
+    f = getattr(pet, 'feeding', None)
+    if f:
+        doc.field('Availability', f'{f.food_availability} | {f.meals_per_day or "-"} meals/day')
+        doc.field('Appetite', f'{f.good_appetite or "-"} | Recently: {f.appetite_recently or "-"}')
+        doc.field('Unmonitored', _yes_no(f.unmonitored_food_access, f.unmonitored_sources))
+    else:
+        doc.note('No data')
+
+    doc.heading('4. Preferences')
+    fp = getattr(pet, 'food_preferences', None)
+    if fp:
+        doc.field('Food Prefs', fp.current_food_preferences)
+        doc.field('Treat Prefs', fp.current_treat_preferences)
+        doc.field('Refuses', _yes_no(fp.refuses_food, fp.refused_food_details))
+
+    doc.heading('5. Diet History')
+    diets = pet.commercial_diet.all()
+    if diets:
+        doc.table(['Type', 'Brand', 'Product', 'Amount/day', 'Since'],
+                  [[d.diet_type, d.brand, d.product_details, d.amount_per_day, d.fed_since] for d in diets])
+    homemade = pet.homemade_diet.all()
+    if homemade:
+        doc.table(['Ingredient', 'Raw qty/day', 'Preparation', 'Times/day', 'Since'],
+                  [[d.ingredient_food_item, d.raw_quantity_per_day, d.preparation_method,
+                    d.feed_frequency_per_day, d.fed_since] for d in homemade])
+    supplements = pet.supplements.all()
+    if supplements:
+        doc.table(['Supplement', 'Form', 'Amount', 'Per day', 'Since'],
+                  [[s.brand_name, s.form, s.amount, s.per_day, s.fed_since] for s in supplements])
+
+    doc.heading('6. Fitness')
+    fa = getattr(pet, 'fitness', None)
+    if fa:
+        doc.field('Activity Level', fa.get_activity_level_display())
+        doc.field('Exercise', f'{fa.exercise_duration or "-"} | Types: {fa.exercise_types or "-"}')
+        doc.field('Fenced Yard', f'{"Yes" if fa.fenced_yard_access else "No"} | {fa.urban_rural or "-"}')
+    else:
+        doc.note('No data')
+    activities = pet.activity_details.all()
+    if activities:
+        doc.table(['Activity', 'Duration / distance', 'Per week'],
+                  [[a.get_activity_type_display(), a.duration_distance, a.frequency_per_week] for a in activities])
+
+    doc.heading('7. Medical')
+    m = getattr(pet, 'medical_history', None)
+    if m:
+        weight_change = 'No'
+        if m.weight_change:
+            weight_change = f'{m.weight_change_type} {m.weight_change_amount_kg}kg / {m.weight_change_period}'
+        doc.field('Weight Change', weight_change)
+        vomiting = 'None'
+        if m.vomiting_per_day:
+            vomiting = f'{m.vomiting_per_day}/day' + (f' ({m.vomiting_colour})' if m.vomiting_colour else '')
+        doc.field('Vomiting', vomiting)
+        doc.field('Urination', m.urination_direction if m.urination_changed else 'Normal')
+        doc.field('Drinking', m.drinking_direction if m.drinking_changed else 'Normal')
+        stool = 'Normal'
+        if m.stool_quality_changed:
+            stool = 'Changed' + (f', {m.poops_per_day}/day' if m.poops_per_day else '')
+        doc.field('Stool', stool)
+    else:
+        doc.note('No data')
+    reactions = pet.adverse_reactions.all()
+    if reactions:
+        doc.table(['Brand', 'Product / medication', 'Since', 'Reaction'],
+                  [[r.brand, r.product_ingredient_medication, r.fed_since, r.reaction_symptoms] for r in reactions])
+    chronic = getattr(pet, 'chronic_condition', None)
+    if chronic and chronic.has_chronic:
+        doc.field('Chronic Conditions', chronic.details)
+
+    doc.heading('8. Vaccination')
+    v = getattr(pet, 'vaccination_status', None)
+    if v:
+        doc.field('Yearly Vaccines', 'Yes' if v.yearly_vaccinations else 'No')
+        doc.field('Deworming', 'Yes' if v.deworming else 'No')
+        doc.field('Tick/Flea', f'Topical: {v.topical_tick_flea or "-"} | Oral: {v.oral_tick_flea or "-"}')
+    else:
+        doc.note('No data')
+    pv = getattr(pet, 'primary_vet', None)
+    if pv:
+        doc.field('Primary Vet', f'{pv.vet_name} | {pv.practice_name_location} | {pv.clinic_phone}')
+
+    doc.heading('9. Consent')
+    consent = getattr(owner, 'consent', None)
+    if consent:
+        doc.field('Agreed', f'{"Yes" if consent.agreed else "No"} - {_date(consent.date_signed, "%d %b %Y %H:%M")}')
+
+    doc.heading('10. Clinical History (Vet)')
+    ch = getattr(pet, 'clinical_history', None)
+    if ch:
+        conditions = ch.conditions.all()
+        if conditions:
+            doc.table(['Condition', 'Symptoms', 'Medication', 'Dose / frequency', 'Length'],
+                      [[c.condition_disease, c.clinical_symptoms, c.medication_name, c.dose_frequency,
+                        c.treatment_length] for c in conditions])
+        if ch.additional_notes:
+            doc.field('Additional Notes', ch.additional_notes)
+    else:
+        doc.note('No clinical history data from vet')
+    medications = pet.long_term_medications.all()
+    if medications:
+        doc.table(['Medication', 'Dose', 'Frequency'],
+                  [[lm.medication_name, lm.dose, lm.frequency] for lm in medications])
+    surgeries = pet.surgical_history.all()
+    if surgeries:
+        doc.table(['Surgery', 'Date'], [[s.surgery_name, s.date_performed] for s in surgeries])
+    imaging = pet.diagnostic_imaging.all()
+    if imaging:
+        doc.table(['Imaging', 'Date'], [[im.imaging_type, im.date_performed] for im in imaging])
+
+    uploads = uploads_by_category(pet)
+    for category, label in [('blood_work', 'Blood Work Reports'), ('diagnostic_imaging', 'Imaging Reports')]:
+        if uploads[category]:
+            doc.table([label, 'Uploaded'],
+                      [[u.original_filename, _date(u.uploaded_at)] for u in uploads[category]])
+    return doc
+
+
+def render_case_pdf(pet):
+    return build_case_document(pet).render()
+
+
+def case_pdf_filename(pet):
+    return get_valid_filename(f'{pet.owner.case_id}-{pet.name}.pdf')
+
+
+# ═══════════════════════════════════════════════════════
+# ARTIFACT STORE (default_storage, one file per case version)
+# ═══════════════════════════════════════════════════════
+
+def artifact_name(pet_id, version):
+    return f'{ARTIFACT_DIR}/{pet_id}/v{version}.pdf'
+
+
+def current_version(pet_id):
+    return CaseVersion.objects.filter(pet_id=pet_id).values_list('version', flat=True).first()
+
+
+def current_artifact(pet_id):
+    """(storage name, exists) for the case's current version, or (None, False) if there is no such case"""
+    version = current_version(pet_id)
+    if version is None:
+        return None, False
+    name = artifact_name(pet_id, version)
+    return name, default_storage.exists(name)
+
+
+def render_artifact(pet_id):
+    """Render the current version of a case into the store (if needed); returns its storage name"""
+    # Read the version before the graph: an edit in between then yields a newer
+    # PDF under the older version's name, never a stale PDF under a newer one.
+    version = current_version(pet_id)
+    if version is None:
+        return None
+    name = artifact_name(pet_id, version)
+    if default_storage.exists(name):
+        return name
+    content = render_case_pdf(load_case_graph(pet_id))
+    saved = default_storage.save(name, ContentFile(content))
+    if saved != name:
+        # Another process stored this version first
+        default_storage.delete(saved)
+    _delete_versions_before(pet_id, version)
+    return name
+
+
+def _delete_versions_before(pet_id, version):
+    # Strictly older only: a slower render of an old version finishing after a
+    # newer one must not delete the newer PDF
+    directory = f'{ARTIFACT_DIR}/{pet_id}'
+    try:
+        _, files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for filename in files:
+        match = ARTIFACT_FILE.fullmatch(filename)
+        if match and int(match[1]) < version:
+            default_storage.delete(f'{directory}/{filename}')
+
+
+# ═══════════════════════════════════════════════════════
+# WORKER POOL
+# ═══════════════════════════════════════════════════════
+
+_in_flight = {}
+_in_flight_lock = threading.RLock()
+
+
+def _render_and_release(pet_id):
+    try:
+        return render_artifact(pet_id)
+    finally:
+        with _in_flight_lock:
+            _in_flight.pop(pet_id, None)
+
+
+def submit_render(pet_id):
+    """
+    Queue a case for rendering; returns a Future resolving to the storage name.
+
+    Requests for a case already being rendered share its Future. With
+    CASE_PDF_WORKERS = 0 the PDF is rendered inline (see background.submit).
+    """
+    with _in_flight_lock:
+        future = _in_flight.get(pet_id)
+        if future is None:
+            future = background.submit('case-pdf', settings.CASE_PDF_WORKERS, _render_and_release, pet_id)
+            if not future.done():
+                _in_flight[pet_id] = future
+    return future
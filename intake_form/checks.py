@@ -0,0 +1,25 @@
+from django.core.checks import Tags, Warning, register
+from django.db import connections
+from django.db.utils import DatabaseError
+from .dashboard import SEARCH_TABLE, missing_search_triggers
+
+
+@register(Tags.database)
+def check_case_search_triggers(app_configs, databases=None, **kwargs):
+    """The dashboard's FTS index is only current while its triggers exist (see dashboard.py)"""
+    problems = []
+    for alias in databases or ():
+        if connections[alias].vendor != 'sqlite':
+            continue
+        try:
+            missing = missing_search_triggers(alias)
+        except DatabaseError:
+            continue  # not migrated yet
+        if missing:
+            problems.append(Warning(
+                f'{SEARCH_TABLE} is missing triggers on database {alias!r}: {", ".join(missing)}. '
+                'Case search results will go stale.',
+                hint='Run `manage.py rebuild_case_search` (a migration rebuilt intake_form_pet/petparent).',
+                id='intake_form.W001',
+            ))
+    return problems
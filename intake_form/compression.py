@@ -0,0 +1,119 @@
+"""
+Response compression for text responses (CompressionMiddleware).
+
+Brotli when the browser takes it and the brotli package is installed, gzip
+otherwise. Responses under COMPRESSION_MIN_BYTES aren't worth it; streamed
+ones (CSV exports) are compressed as they stream. As in Django's
+GZipMiddleware, gzip output carries random padding against BREACH, and a
+strong ETag is weakened because the bytes sent are no longer the ones it
+names.
+"""
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = {'application/json', 'application/javascript', 'application/xml', 'image/svg+xml'}
+# Padding added to gzip output (see django.middleware.gzip)
+MAX_RANDOM_BYTES = 100
+
+
+def compressible(response):
+    if response.has_header('Content-Encoding') or response.status_code in (204, 304):
+        return False
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    if not (content_type.startswith('text/') or content_type in COMPRESSIBLE_TYPES):
+        return False
+    return response.streaming or len(response.content) >= settings.COMPRESSION_MIN_BYTES
+
+
+def accepted_encodings(header):
+    """Accept-Encoding -> the codings the browser takes ('q=0' refuses one)"""
+    codings = set()
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        params = params.strip()
+        refused = False
+        if params.startswith('q='):
+            try:
+                refused = float(params[2:]) == 0
+            except ValueError:
+                pass
+        if coding.strip() and not refused:
+            codings.add(coding.strip().lower())
+    return codings
+
+
+def negotiate(accept_encoding):
+    """The coding to send for this Accept-Encoding header, or None"""
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def _brotli_sequence(sequence):
+    compressor = brotli.Compressor(quality=5)
+    for item in sequence:
+        if chunk := compressor.process(item):
+            yield chunk
+    yield compressor.finish()
+
+
+async def _brotli_async(sequence):
+    compressor = brotli.Compressor(quality=5)
+    async for item in sequence:
+        if chunk := compressor.process(item):
+            yield chunk
+    yield compressor.finish()
+
+
+async def _gzip_async(sequence):
+    # As GZipMiddleware does: one gzip member per chunk, which decoders join
+    async for item in sequence:
+        yield compress_string(item, max_random_bytes=MAX_RANDOM_BYTES)
+
+
+def compress(response, coding):
+    """Compress `response` in place; False where it wouldn't get smaller"""
+    if response.streaming:
+        if response.is_async:
+            wrap = _brotli_async if coding == 'br' else _gzip_async
+            response.streaming_content = wrap(response.streaming_content)
+        elif coding == 'br':
+            response.streaming_content = _brotli_sequence(response.streaming_content)
+        else:
+            response.streaming_content = compress_sequence(response.streaming_content,
+                                                           max_random_bytes=MAX_RANDOM_BYTES)
+        del response['Content-Length']
+    else:
+        if coding == 'br':
+            compressed = brotli.compress(response.content, quality=5)
+        else:
+            compressed = compress_string(response.content, max_random_bytes=MAX_RANDOM_BYTES)
+        if len(compressed) >= len(response.content):
+            return False
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = 'W/' + etag
+    response['Content-Encoding'] = coding
+    return True
+
+
+def compress_response(request, response):
+    if not compressible(response):
+        return response
+    patch_vary_headers(response, ['Accept-Encoding'])
+    coding = negotiate(request.headers.get('Accept-Encoding', ''))
+    if coding:
+        compress(response, coding)
+    return response
@@ -0,0 +1,138 @@
+import base64
+from datetime import datetime
+from django.db import connections, transaction
+from django.db.models import Q, Exists, OuterRef
+from django.db.models.expressions import RawSQL
+from .models import Pet
+
+CASES_PER_PAGE = 50
+
+# SQLite FTS5 table kept in sync by triggers (migration 0008)
+SEARCH_TABLE = 'intake_form_casesearch'
+# The trigram tokenizer cannot match anything shorter than this
+MIN_FTS_QUERY = 3
+
+
+# ═══════════════════════════════════════════════════════
+# SEARCH
+# ═══════════════════════════════════════════════════════
+
+def fts_available(using='default'):
+    return connections[using].vendor == 'sqlite' and _fts_table_exists(using)
+
+
+# Aliases known to have the search table. Only found tables are remembered: a
+# process started before `migrate` looks again rather than never using FTS.
+_fts_aliases = set()
+
+
+def _fts_table_exists(alias):
+    if alias not in _fts_aliases:
+        with connections[alias].cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [SEARCH_TABLE])
+            if cursor.fetchone() is None:
+                return False
+        _fts_aliases.add(alias)
+    return True
+
+
+def search_cases(parents, q):
+    """Filter a PetParent queryset by owner name, case ID, email or pet name"""
+    if len(q) >= MIN_FTS_QUERY and fts_available(parents.db):
+        phrase = '"' + q.replace('"', '""') + '"'
+        return parents.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [phrase]
+        ))
+    return parents.filter(
+        Q(name__icontains=q) |
+        Q(case_id__icontains=q) |
+        Q(email__icontains=q) |
+        Exists(Pet.objects.filter(owner=OuterRef('pk'), name__icontains=q))
+    )
+
+
+# What migration 0008 creates, as it should exist now. SQLite drops a table's
+# triggers when Django rebuilds the table (most AlterFields on SQLite), after
+# which the index silently goes stale: the intake_form.W001 check notices and
+# `manage.py rebuild_case_search` recreates it from these statements.
+SEARCH_TRIGGERS = {
+    'intake_form_casesearch_parent_ai': """AFTER INSERT ON intake_form_petparent BEGIN
+        INSERT INTO intake_form_casesearch(rowid, name, case_id, email, pet_names)
+        VALUES (new.id, new.name, new.case_id, new.email, '');
+    END""",
+    'intake_form_casesearch_parent_au': """AFTER UPDATE ON intake_form_petparent BEGIN
+        UPDATE intake_form_casesearch SET name = new.name, case_id = new.case_id, email = new.email
+        WHERE rowid = new.id;
+    END""",
+    'intake_form_casesearch_parent_ad': """AFTER DELETE ON intake_form_petparent BEGIN
+        DELETE FROM intake_form_casesearch WHERE rowid = old.id;
+    END""",
+}
+for _event, _owners in [('INSERT', 'new.owner_id'),
+                        ('UPDATE', 'new.owner_id, old.owner_id'),
+                        ('DELETE', 'old.owner_id')]:
+    SEARCH_TRIGGERS[f'intake_form_casesearch_pet_a{_event[0].lower()}'] = f"""AFTER {_event} ON intake_form_pet BEGIN
+        UPDATE intake_form_casesearch SET pet_names = COALESCE(
+            (SELECT group_concat(name, ' ') FROM intake_form_pet
+             WHERE owner_id = intake_form_casesearch.rowid), '')
+        WHERE rowid IN ({_owners});
+    END"""
+
+
+def missing_search_triggers(using='default'):
+    """Names of the search index triggers absent from an SQLite database"""
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name IN "
+                       "('intake_form_petparent', 'intake_form_pet')")
+        present = {name for name, in cursor.fetchall()}
+    return sorted(set(SEARCH_TRIGGERS) - present)
+
+
+def rebuild_search_index(using='default'):
+    """Drop and recreate the search table and its triggers, refilled from the cases; returns rows indexed"""
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        for name in SEARCH_TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+        cursor.execute(f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+                       f"name, case_id, email, pet_names, tokenize='trigram')")
+        cursor.execute(f"""INSERT INTO {SEARCH_TABLE}(rowid, name, case_id, email, pet_names)
+            SELECT p.id, p.name, p.case_id, p.email,
+                   COALESCE((SELECT group_concat(name, ' ') FROM intake_form_pet WHERE owner_id = p.id), '')
+            FROM intake_form_petparent p""")
+        rows = cursor.rowcount
+        for name, body in SEARCH_TRIGGERS.items():
+            cursor.execute(f'CREATE TRIGGER {name} {body}')
+    return rows
+
+
+# ═══════════════════════════════════════════════════════
+# KEYSET PAGINATION over (created_at, id), newest first
+# ═══════════════════════════════════════════════════════
+
+def encode_cursor(parent):
+    raw = f'{parent.created_at.isoformat()}|{parent.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(created_at, id) from a cursor, or None if missing/garbled"""
+    if not cursor:
+        return None
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def keyset_page(parents, cursor=None, size=CASES_PER_PAGE):
+    """One page of parents after `cursor`, plus the cursor for the next page"""
+    parents = parents.order_by('-created_at', '-pk')
+    position = decode_cursor(cursor)
+    if position:
+        created_at, pk = position
+        parents = parents.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+    page = list(parents[:size + 1])
+    next_cursor = encode_cursor(page[size - 1]) if len(page) > size else None
+    return page[:size], next_cursor
@@ -0,0 +1,58 @@
+"""
+SQLite tuning, applied to every new connection (connection_created).
+
+    journal_mode=WAL      readers no longer block the writer, nor it them
+    synchronous=NORMAL    in WAL mode commits stay durable across app
+                          crashes; only a power cut can lose the last few
+    busy_timeout          wait for a lock instead of failing "database is
+                          locked" straight away
+    mmap_size, cache_size read hot pages from memory instead of read() calls
+    temp_store=MEMORY     sorts and temp indexes stay off disk
+
+SQLITE_PRAGMAS in settings overrides these per pragma (None leaves SQLite's
+own default). They go with the DATABASES options CONN_MAX_AGE (reuse a
+connection, and its warm page cache, across requests) and transaction_mode
+IMMEDIATE (a transaction takes the write lock when it starts, so two
+transactions can't deadlock upgrading from read to write, which no busy
+timeout can resolve).
+"""
+from django.conf import settings
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -32000,
+    'temp_store': 'MEMORY',
+}
+
+
+def sqlite_pragmas():
+    """DEFAULT_PRAGMAS with SQLITE_PRAGMAS applied"""
+    pragmas = {**DEFAULT_PRAGMAS, **getattr(settings, 'SQLITE_PRAGMAS', {})}
+    return {name: value for name, value in pragmas.items() if value is not None}
+
+
+def apply_pragmas(connection, pragmas):
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def current_pragmas(connection, names=DEFAULT_PRAGMAS):
+    """What a connection actually runs with, e.g. {'journal_mode': 'wal', ...}"""
+    pragmas = {}
+    with connection.cursor() as cursor:
+        for name in names:
+            cursor.execute(f'PRAGMA {name}')
+            row = cursor.fetchone()
+            # None where it doesn't apply (mmap_size of an in-memory database)
+            pragmas[name] = row[0] if row else None
+    return pragmas
+
+
+def tune_sqlite(sender, connection, **kwargs):
+    """connection_created receiver (see apps.py)"""
+    if connection.vendor == 'sqlite':
+        apply_pragmas(connection, sqlite_pragmas())
@@ -0,0 +1,136 @@
+"""
+Draft intake cases, saved step by step.
+
+The form autosaves each step it has changed as a delta: the step's answers,
+exactly as the form would post them. Saving writes just those DraftSection
+rows (one upsert), so a dropped connection costs at most the last few
+seconds of typing. Submitting turns the saved answers into a case the same
+way a full POST would (validate_intake, then CaseGraph.save) without the
+browser sending them again, and is idempotent: a retried submit returns the
+case the first one created.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import QueryDict
+from django.utils import timezone
+from .models import DraftCase, DraftSection, PetParent
+from .submission import validate_intake
+
+# The form's steps, in order (data-section in form.html)
+DRAFT_SECTIONS = [
+    'owner_pet', 'household', 'feeding', 'preferences', 'diet_history',
+    'fitness', 'medical', 'vaccination_vet', 'consent',
+]
+DUPLICATE_EMAIL = 'A case already exists for this email address.'
+
+
+class DraftError(Exception):
+    """A draft request that cannot be accepted; `status` is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400, errors=()):
+        super().__init__(message)
+        self.status = status
+        self.errors = list(errors)
+
+
+def clean_sections(sections):
+    """{section: {field: value or [values]}} -> the same with every value a list of strings"""
+    if not isinstance(sections, dict) or not sections:
+        raise DraftError('Send {"sections": {section: {field: [values]}}}')
+    cleaned, fields = {}, 0
+    for name, answers in sections.items():
+        if name not in DRAFT_SECTIONS:
+            raise DraftError(f'Unknown section {name!r}')
+        if not isinstance(answers, dict):
+            raise DraftError(f'Answers for {name!r} must be an object')
+        cleaned[name] = {}
+        for field, values in answers.items():
+            values = values if isinstance(values, list) else [values]
+            if not all(isinstance(value, str) for value in values):
+                raise DraftError(f'{name}.{field}: answers must be strings')
+            cleaned[name][field] = values
+            fields += 1
+    if settings.DATA_UPLOAD_MAX_NUMBER_FIELDS and fields > settings.DATA_UPLOAD_MAX_NUMBER_FIELDS:
+        raise DraftError('Too many fields')
+    return cleaned
+
+
+def _open_draft(draft_id):
+    # Locked, so a submit cannot land between this check and the write after it
+    submitted = DraftCase.objects.select_for_update().filter(pk=draft_id).values_list('submitted_at', flat=True)
+    if not submitted:
+        raise DraftError('No such draft', status=404)
+    if submitted[0] is not None:
+        raise DraftError('This draft has already been submitted', status=409)
+
+
+def save_sections(draft_id, sections):
+    """Replace the given sections' answers (the others are untouched); returns their names"""
+    sections = clean_sections(sections)
+    with transaction.atomic():
+        _open_draft(draft_id)
+        DraftSection.objects.bulk_create(
+            [DraftSection(draft_id=draft_id, name=name, answers=answers) for name, answers in sections.items()],
+            update_conflicts=True, unique_fields=['draft', 'name'], update_fields=['answers', 'updated_at'],
+        )
+    return list(sections)
+
+
+def draft_answers(draft):
+    """Every saved answer as one QueryDict, as if the whole form had been posted"""
+    post = QueryDict(mutable=True)
+    saved = {section.name: section.answers for section in draft.sections.all()}
+    for name in DRAFT_SECTIONS:
+        for field, values in saved.get(name, {}).items():
+            # An empty list would read as [] rather than the builders' defaults
+            if values:
+                post.setlist(field, values)
+    return post
+
+
+def submit_draft(draft_id):
+    """Create the case from a draft's saved answers; returns (PetParent, created)"""
+    with transaction.atomic():
+        try:
+            draft = DraftCase.objects.select_for_update().get(pk=draft_id)
+        except DraftCase.DoesNotExist:
+            raise DraftError('No such draft', status=404)
+        if draft.submitted_at is not None:
+            if draft.case is None:
+                raise DraftError('The case for this draft has been deleted', status=410)
+            return draft.case, False
+
+        graph, errors = validate_intake(draft_answers(draft))
+        if errors:
+            raise DraftError('The form is incomplete', errors=errors)
+        if PetParent.objects.filter(email=graph.parent.email).exists():
+            raise DraftError(DUPLICATE_EMAIL, errors=[DUPLICATE_EMAIL])
+        try:
+            draft.case = graph.save()
+        except IntegrityError:
+            # Another submission took the email since the check above; any
+            # other constraint failure is a bug, not the user's to fix
+            if not PetParent.objects.filter(email=graph.parent.email).exists():
+                raise
+            raise DraftError(DUPLICATE_EMAIL, errors=[DUPLICATE_EMAIL])
+        draft.submitted_at = timezone.now()
+        draft.save(update_fields=['case', 'submitted_at'])
+    return draft.case, True
+
+
+def draft_state(draft):
+    """What the form needs to resume a draft (JSON-ready)"""
+    return {
+        'id': str(draft.id),
+        'sections': {section.name: section.answers for section in draft.sections.all()},
+        'case_id': draft.case.case_id if draft.case else None,
+        'submitted': draft.submitted_at is not None,
+    }
+
+
+def purge_drafts(max_age_days=None):
+    """Delete drafts started more than INTAKE_DRAFT_MAX_AGE_DAYS ago; returns how many"""
+    days = settings.INTAKE_DRAFT_MAX_AGE_DAYS if max_age_days is None else max_age_days
+    cutoff = timezone.now() - timedelta(days=days)
+    return DraftCase.objects.filter(created_at__lt=cutoff).delete()[1].get(DraftCase._meta.label, 0)
@@ -0,0 +1,151 @@
+"""
+Streaming cohort exports for research.
+
+    cases            one wide row per pet: the pet plus every one-to-one
+                     section, columns named by ORM path (medical_history__stool_types)
+    <related name>   one long table per repeating section (commercial_diet,
+                     long_term_medications, ...), keyed by pet_id and case_id
+
+Each table is one values_list() query read with .iterator(), and rows are
+written out as they arrive, so memory stays flat however many cases there
+are. Owner contact details are left out; case_id links rows back to a case.
+"""
+import csv
+from io import StringIO
+from .models import Pet, PetParent, ClinicalCondition
+from .loaders import pet_child_models
+
+CHUNK_SIZE = 2000
+# Flush streamed CSV roughly this often
+STREAM_BUFFER = 64 * 1024
+
+
+def _data_fields(model):
+    return [f for f in model._meta.concrete_fields if not f.is_relation and not f.primary_key]
+
+
+class Table:
+    """One export table: (header, ORM path, model field) per column"""
+
+    def __init__(self, name, model, columns, order_by):
+        self.name = name
+        self.model = model
+        self.columns = columns
+        self.order_by = order_by
+
+    @property
+    def headers(self):
+        return [header for header, _, _ in self.columns]
+
+    def rows(self, chunk_size=CHUNK_SIZE):
+        paths = [path for _, path, _ in self.columns]
+        return self.model.objects.order_by(*self.order_by).values_list(*paths).iterator(chunk_size=chunk_size)
+
+
+def _key_columns(pet_path):
+    """pet_id and case_id, reached from the table's model via `pet_path` ('' for Pet itself)"""
+    owner = f'{pet_path}__owner' if pet_path else 'owner'
+    return [
+        ('pet_id', pet_path or 'id', Pet._meta.pk),
+        ('case_id', f'{owner}__case_id', PetParent._meta.get_field('case_id')),
+    ]
+
+
+def _cases_table():
+    columns = _key_columns('') + [(f.name, f.name, f) for f in _data_fields(Pet)]
+    sections = [m for m in pet_child_models() if m._meta.get_field('pet').one_to_one]
+    for model in sorted(sections, key=lambda m: m._meta.get_field('pet').related_query_name()):
+        prefix = model._meta.get_field('pet').related_query_name()
+        columns += [(f'{prefix}__{f.name}', f'{prefix}__{f.name}', f) for f in _data_fields(model)]
+    return Table('cases', Pet, columns, ['pk'])
+
+
+def _long_table(name, model, pet_path):
+    columns = _key_columns(pet_path) + [(f.name, f.name, f) for f in _data_fields(model)]
+    return Table(name, model, columns, [pet_path, 'pk'])
+
+
+def tables():
+    """Every export table, by name"""
+    result = {'cases': _cases_table()}
+    for model in pet_child_models():
+        pet_field = model._meta.get_field('pet')
+        if not pet_field.one_to_one:
+            name = pet_field.related_query_name()
+            result[name] = _long_table(name, model, 'pet')
+    # Hangs off the clinical history rather than the pet
+    result['clinical_conditions'] = _long_table('clinical_conditions', ClinicalCondition, 'clinical_history__pet')
+    return dict(sorted(result.items()))
+
+
+# ═══════════════════════════════════════════════════════
+# WRITERS
+# ═══════════════════════════════════════════════════════
+
+def stream_csv(table, chunk_size=CHUNK_SIZE):
+    """CSV text in ~64 KiB pieces, for StreamingHttpResponse"""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(table.headers)
+    for row in table.rows(chunk_size):
+        writer.writerow(row)
+        if buffer.tell() >= STREAM_BUFFER:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def write_csv(table, f, chunk_size=CHUNK_SIZE):
+    """Write a table to an open text file; returns the number of rows"""
+    writer = csv.writer(f)
+    writer.writerow(table.headers)
+    count = 0
+    for row in table.rows(chunk_size):
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def _arrow_type(pa, field):
+    kind = field.get_internal_type()
+    if kind == 'BooleanField':
+        return pa.bool_()
+    if kind.endswith('IntegerField') or kind.endswith('AutoField'):
+        return pa.int64()
+    if kind == 'DecimalField':
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if kind == 'FloatField':
+        return pa.float64()
+    if kind == 'DateTimeField':
+        return pa.timestamp('us', tz='UTC')
+    if kind == 'DateField':
+        return pa.date32()
+    return pa.string()
+
+
+def write_parquet(table, path, chunk_size=CHUNK_SIZE):
+    """Columnar copy of a table, one row group per chunk; returns the number of rows (needs pyarrow)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    def row_group(rows):
+        columns = zip(*rows)
+        return pa.Table.from_arrays(
+            [pa.array(values, type=column.type) for values, column in zip(columns, schema)], schema=schema
+        )
+
+    schema = pa.schema([(header, _arrow_type(pa, field)) for header, _, field in table.columns])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        chunk = []
+        for row in table.rows(chunk_size):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                writer.write_table(row_group(chunk))
+                count += len(chunk)
+                chunk = []
+        if chunk:
+            writer.write_table(row_group(chunk))
+            count += len(chunk)
+    return count
@@ -0,0 +1,18 @@
+"""
+Process-pool entry points for import_cases.
+
+Spawned workers unpickle these before Django is configured, so nothing that
+touches models is imported at module level.
+"""
+
+
+def init_worker():
+    import django
+    from django.db import connections
+    django.setup()
+    connections.close_all()
+
+
+def import_batch(batch):
+    from .bulk_import import import_batch
+    return import_batch(batch)
@@ -0,0 +1,154 @@
+"""
+Per-request SQL and timing instrumentation (RequestTimingMiddleware).
+
+Each request runs with a QueryRecorder, which counts queries, adds up their
+time and spots duplicates: the same SQL with the same parameters run more
+than once in one request, the usual sign of a query inside a loop. The
+totals go out as a Server-Timing header and into a rolling window per view,
+served as JSON by request_metrics_view.
+
+The recorder is found through a ContextVar by record_queries, an execute
+wrapper on every connection (see apps.py). Connections are per thread,
+but the context follows the request into sync_to_async calls, so under ASGI
+the queries are counted whichever thread runs them. Background threads (PDF
+renders, upload processing, the journal consumer) start without the
+request's context and are not counted against the request that queued them;
+neither are queries made while a streaming response is being read.
+"""
+import statistics
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+
+# Per-request SQL kept for the duplicate report, truncated
+SQL_PREVIEW = 200
+
+_recorder = ContextVar('query_recorder', default=None)
+
+
+class QueryRecorder:
+    """execute_wrapper hook: counts queries, SQL time and repeats for one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+            self.statements[(sql, repr(params))] += 1
+
+    @property
+    def duplicates(self):
+        """Repeated executions beyond the first, across all statements"""
+        return sum(n - 1 for n in self.statements.values())
+
+    def duplicate_sql(self):
+        """{sql: repeats} for statements run more than once"""
+        repeated = Counter()
+        for (sql, _), n in self.statements.items():
+            if n > 1:
+                repeated[sql[:SQL_PREVIEW]] += n - 1
+        return repeated
+
+
+def record_queries(execute, sql, params, many, context):
+    """execute_wrapper installed on every connection: feeds the current request's recorder"""
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def watch_request_queries(sender, connection, **kwargs):
+    """connection_created receiver (see apps.py): install record_queries on every connection"""
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_queries)
+
+
+@contextmanager
+def recording(recorder):
+    """Count the queries of this block (and the sync_to_async calls it makes) in `recorder`"""
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+def server_timing(recorder, view_seconds, total_seconds):
+    """Server-Timing header value (durations in ms)"""
+    return ', '.join([
+        f'db;dur={recorder.seconds * 1000:.2f};desc="{recorder.count} queries, {recorder.duplicates} duplicate"',
+        f'view;dur={view_seconds * 1000:.2f}',
+        f'total;dur={total_seconds * 1000:.2f}',
+    ])
+
+
+# ═══════════════════════════════════════════════════════
+# ROLLING METRICS
+# ═══════════════════════════════════════════════════════
+
+class RequestMetrics:
+    """The last REQUEST_METRICS_WINDOW requests per view, for this process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+
+    def record(self, view, status, recorder, view_seconds, total_seconds):
+        sample = (status, recorder.count, recorder.seconds, recorder.duplicates,
+                  recorder.duplicate_sql(), view_seconds, total_seconds)
+        with self.lock:
+            window = self.samples.get(view)
+            if window is None:
+                window = self.samples[view] = deque(maxlen=settings.REQUEST_METRICS_WINDOW)
+            window.append(sample)
+
+    def clear(self):
+        with self.lock:
+            self.samples.clear()
+
+    def snapshot(self):
+        """{view: summary} over each view's window; times in ms"""
+        with self.lock:
+            windows = {view: list(window) for view, window in self.samples.items()}
+        return {view: _summarize(samples) for view, samples in sorted(windows.items())}
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+def _summarize(samples):
+    statuses = Counter(str(s[0]) for s in samples)
+    queries = [s[1] for s in samples]
+    sql = [s[2] for s in samples]
+    totals = sorted(s[6] for s in samples)
+    repeated = Counter()
+    for s in samples:
+        repeated.update(s[4])
+    return {
+        'requests': len(samples),
+        'status': dict(statuses),
+        'queries_avg': round(statistics.mean(queries), 1),
+        'queries_max': max(queries),
+        'sql_ms_avg': _ms(statistics.mean(sql)),
+        'duplicate_queries_avg': round(statistics.mean(s[3] for s in samples), 1),
+        'view_ms_avg': _ms(statistics.mean(s[5] for s in samples)),
+        'total_ms_p50': _ms(totals[len(totals) // 2]),
+        'total_ms_p95': _ms(totals[min(len(totals) - 1, int(0.95 * len(totals)))]),
+        'total_ms_max': _ms(totals[-1]),
+        'top_duplicates': [{'sql': sql, 'repeats': n} for sql, n in repeated.most_common(5)],
+    }
+
+
+request_metrics = RequestMetrics()
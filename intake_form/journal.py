@@ -0,0 +1,466 @@
+"""
+Write-behind intake submissions.
+
+The async intake view hands out a case ID, appends the submission to a local
+append-only journal (one JSON line, fsynced) and returns. A background
+consumer drains the journal into the database in batches: one transaction per
+batch instead of one per submission, off the request path.
+
+Each web process drains on its own: after every append, and on its first
+request for whatever a previous process left queued, so no separate consumer
+has to run. `manage.py drain_intake_journal --follow` is an optional
+standalone one.
+
+An email address is reserved when its submission is journaled: enqueue()
+refuses an address that already has a case or a pending entry, so two
+submissions cannot both be told they succeeded. Pending addresses are listed
+in intake.emails alongside the journal; each process keeps them in memory
+and reads only what other processes appended since. Under the append lock
+enqueue() touches no database: the case lookup runs before it, and case IDs
+come from a block of INTAKE_JOURNAL_CASE_ID_BLOCK reserved ahead of time (IDs
+left in a block when a process exits are never used).
+
+The consumer's position is kept in a checkpoint file next to the journal.
+Replaying after a crash is safe: entries whose case ID is already in the
+database are skipped. Entries that cannot be saved are moved to a rejects
+file so they never block the rest; a database that stays locked ends the
+drain early and it is tried again later. Once everything is drained the
+journal is truncated.
+
+Files under INTAKE_JOURNAL_DIR:
+    intake.journal     pending submissions (JSON lines)
+    intake.emails      their email addresses: a generation line, then JSON strings
+    intake.checkpoint  byte offset the consumer has drained up to
+    intake.rejected    entries that failed to save, with the error
+    append.lock        held briefly while appending or truncating
+    drain.lock         held by the one consumer draining
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import OperationalError, transaction
+from django.utils import timezone
+from django.utils.datastructures import MultiValueDict
+from . import background
+from .metrics import JOURNAL_RETRIES, SUBMISSIONS, is_locked_error
+from .models import CaseIdSequence, PetParent
+from .submission import parse_intake_submission
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Form fields that are not part of the case
+SKIPPED_FIELDS = {'csrfmiddlewaretoken'}
+# Retries of a batch that hit "database is locked", with backoff
+LOCKED_RETRIES = 3
+# Seconds before a drain that gave up on a locked database runs again
+LOCKED_DRAIN_DELAY = 5
+
+_locks = {'append': threading.Lock(), 'drain': threading.Lock()}
+_schedule_lock = threading.Lock()
+_drain_scheduled = False
+LEFTOVERS_UID = 'intake_journal_leftovers'
+
+# This process's copy of intake.emails, and how far into which generation of
+# the file it has read
+_index = {'generation': None, 'offset': 0, 'emails': set()}
+# Case IDs reserved for this process, and whether a refill is on its way
+_case_ids = deque()
+_case_ids_lock = threading.Lock()
+_refilling = False
+
+
+class DuplicateEmail(ValueError):
+    """The address already has a case, or a submission waiting in the journal"""
+
+
+def _path(name):
+    return Path(settings.INTAKE_JOURNAL_DIR) / name
+
+
+@contextmanager
+def _locked(name):
+    """Hold the named lock across threads and (where flock exists) processes"""
+    with _locks[name]:
+        directory = Path(settings.INTAKE_JOURNAL_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(directory / f'{name}.lock', 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _append_line(name, record):
+    data = (json.dumps(record, separators=(',', ':')) + '\n').encode()
+    fd = os.open(_path(name), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+    try:
+        os.write(fd, data)
+        if settings.INTAKE_JOURNAL_FSYNC:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# ═══════════════════════════════════════════════════════
+# PRODUCER
+# ═══════════════════════════════════════════════════════
+
+def post_to_dict(post):
+    return {key: post.getlist(key) for key in post if key not in SKIPPED_FIELDS}
+
+
+def _entry(case_id, post):
+    return {
+        'id': uuid.uuid4().hex,
+        'case_id': case_id,
+        'received_at': timezone.now().isoformat(),
+        'post': post_to_dict(post),
+    }
+
+
+def _email(post):
+    return post.get('parent_email', '')
+
+
+def _journal(entry, email):
+    """Append an entry and index its email; the caller holds the append lock"""
+    if _index_generation() is None:
+        _start_index()
+    # The email first: a crash in between reserves it for nothing, never the reverse
+    _append_line('intake.emails', email)
+    _append_line('intake.journal', entry)
+
+
+def append(case_id, post):
+    """Durably record one submission; returns its journal entry"""
+    entry = _entry(case_id, post)
+    with _locked('append'):
+        _journal(entry, _email(post))
+    return entry
+
+
+# ═══════════════════════════════════════════════════════
+# PENDING EMAILS (intake.emails)
+# ═══════════════════════════════════════════════════════
+
+def _index_generation():
+    try:
+        with open(_path('intake.emails'), 'rb') as f:
+            return f.readline().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _start_index():
+    """A new, empty generation of intake.emails (under the append lock)"""
+    tmp = _path('intake.emails.tmp')
+    tmp.write_bytes(uuid.uuid4().hex.encode() + b'\n')
+    os.replace(tmp, _path('intake.emails'))
+
+
+def _pending_emails():
+    """Emails with an entry still in the journal, reading only what was appended since the last call"""
+    try:
+        f = open(_path('intake.emails'), 'rb')
+    except FileNotFoundError:
+        _index.update(generation=None, offset=0, emails=set())
+        return _index['emails']
+    with f:
+        generation = f.readline()
+        if generation.strip() != _index['generation']:
+            # Truncated after a drain (or new): start over
+            _index.update(generation=generation.strip(), offset=len(generation), emails=set())
+        f.seek(_index['offset'])
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            _index['offset'] += len(line)
+            try:
+                _index['emails'].add(json.loads(line))
+            except ValueError:
+                pass
+    return _index['emails']
+
+
+# ═══════════════════════════════════════════════════════
+# CASE ID BLOCKS
+# ═══════════════════════════════════════════════════════
+
+def _take_case_id():
+    """The next reserved case ID; reserves a block only when none is left"""
+    prefix = f'{CaseIdSequence.PREFIX}-{timezone.now().year}-'
+    with _case_ids_lock:
+        if _case_ids and not _case_ids[0].startswith(prefix):
+            _case_ids.clear()  # reserved last year
+        if not _case_ids:
+            _case_ids.extend(CaseIdSequence.next_case_ids(settings.INTAKE_JOURNAL_CASE_ID_BLOCK))
+        case_id = _case_ids.popleft()
+        low = len(_case_ids) <= settings.INTAKE_JOURNAL_CASE_ID_BLOCK // 2
+    if low:
+        schedule_refill()
+    return case_id
+
+
+def _give_back(case_id):
+    with _case_ids_lock:
+        _case_ids.appendleft(case_id)
+
+
+def schedule_refill():
+    """Reserve the next block of case IDs in the background, before this one runs out"""
+    global _refilling
+    with _case_ids_lock:
+        if _refilling:
+            return None
+        _refilling = True
+    return background.submit('intake-case-ids', min(settings.INTAKE_JOURNAL_WORKERS, 1), _refill)
+
+
+def _refill():
+    global _refilling
+    try:
+        block = CaseIdSequence.next_case_ids(settings.INTAKE_JOURNAL_CASE_ID_BLOCK)
+        with _case_ids_lock:
+            _case_ids.extend(block)
+    finally:
+        with _case_ids_lock:
+            _refilling = False
+
+
+def _reset_after_fork():
+    # A forked worker must not hand out the parent's reserved IDs too
+    global _case_ids_lock, _refilling
+    _case_ids.clear()
+    _case_ids_lock = threading.Lock()
+    _refilling = False
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+# ═══════════════════════════════════════════════════════
+# ENQUEUE
+# ═══════════════════════════════════════════════════════
+
+def enqueue(post):
+    """
+    Reserve the submission's email, give it a case ID and append it, then make
+    sure a drain is coming; returns the entry. Raises DuplicateEmail instead
+    if the address is taken.
+    """
+    email = _email(post)
+    generation = _index_generation()
+    taken = PetParent.objects.filter(email=email).exists()
+    case_id = _take_case_id()
+    try:
+        with _locked('append'):
+            pending = _pending_emails()
+            if not taken and _index['generation'] != generation:
+                # Drained and truncated since the lookup: those entries are in the database now
+                taken = PetParent.objects.filter(email=email).exists()
+            if taken or email in pending:
+                raise DuplicateEmail(email)
+            entry = _entry(case_id, post)
+            _journal(entry, email)
+    except BaseException:
+        _give_back(case_id)
+        raise
+    schedule_drain()
+    return entry
+
+
+def schedule_drain():
+    """
+    Queue a drain unless one is already waiting to start. Submissions that
+    arrive meanwhile are picked up by that drain, so bursts become batches.
+    """
+    global _drain_scheduled
+    with _schedule_lock:
+        if _drain_scheduled:
+            return None
+        _drain_scheduled = True
+    return background.submit('intake-journal', settings.INTAKE_JOURNAL_WORKERS, _scheduled_drain)
+
+
+def drain_leftovers(**kwargs):
+    """
+    request_started, once per process: drain what an earlier process left
+    queued, and reserve this process's first block of case IDs
+    """
+    request_started.disconnect(dispatch_uid=LEFTOVERS_UID)
+    schedule_refill()
+    journal = _path('intake.journal')
+    if journal.exists() and journal.stat().st_size > _read_checkpoint():
+        schedule_drain()
+
+
+def _scheduled_drain():
+    global _drain_scheduled
+    with _schedule_lock:
+        _drain_scheduled = False
+    try:
+        return drain()
+    except Exception:
+        logger.exception('Draining the intake journal failed; entries stay queued')
+        raise
+
+
+# ═══════════════════════════════════════════════════════
+# CONSUMER
+# ═══════════════════════════════════════════════════════
+
+def _read_checkpoint():
+    try:
+        return int(_path('intake.checkpoint').read_text() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def _write_checkpoint(offset):
+    tmp = _path('intake.checkpoint.tmp')
+    tmp.write_text(str(offset))
+    os.replace(tmp, _path('intake.checkpoint'))
+
+
+def read_entries(offset, limit):
+    """
+    Up to `limit` complete entries from byte `offset`, with the offset after
+    each one. A trailing line without its newline is still being written.
+    """
+    entries = []
+    try:
+        f = open(_path('intake.journal'), 'rb')
+    except FileNotFoundError:
+        return entries
+    with f:
+        f.seek(offset)
+        while len(entries) < limit:
+            line = f.readline()
+            if not line.endswith(b'\n'):
+                break
+            offset += len(line)
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                entry = {'raw': line.decode(errors='replace')}
+            entries.append((entry, offset))
+    return entries
+
+
+def pending_count():
+    return len(read_entries(_read_checkpoint(), float('inf')))
+
+
+def _save_entry(entry):
+    graph = parse_intake_submission(MultiValueDict(entry['post']))
+    graph.parent.case_id = entry['case_id']
+    return graph.save()
+
+
+def _reject(entry, error):
+    logger.error('Rejected journaled intake %s: %s', entry.get('case_id'), error)
+    SUBMISSIONS.inc(source='journal', outcome='rejected')
+    _append_line('intake.rejected', {**entry, 'error': str(error)})
+
+
+class _StillLocked(Exception):
+    """The database stayed locked through every retry; the drain stops and is tried again later"""
+
+
+def _save_batch(entries, attempt=0):
+    """
+    Save entries in one transaction; if that fails, one by one so a bad entry
+    only rejects itself. A locked database is retried, never a rejection.
+    """
+    try:
+        with transaction.atomic():
+            for entry in entries:
+                _save_entry(entry)
+        SUBMISSIONS.inc(len(entries), source='journal', outcome='saved')
+        return len(entries)
+    except OperationalError as exc:
+        if not is_locked_error(exc):
+            # Not contention: like any other failure, narrow it down to the entry
+            return _save_each(entries, exc)
+        if attempt >= LOCKED_RETRIES:
+            raise _StillLocked() from exc
+        JOURNAL_RETRIES.inc()
+        time.sleep(0.05 * 2 ** attempt)
+        return _save_batch(entries, attempt + 1)
+    except Exception as exc:
+        return _save_each(entries, exc)
+
+
+def _save_each(entries, error):
+    if len(entries) == 1:
+        _reject(entries[0], error)
+        return 0
+    return sum(_save_batch([entry]) for entry in entries)
+
+
+def drain(batch_size=None):
+    """
+    Write every complete journal entry into the database; returns the number
+    of cases saved. Appends carry on while a drain runs. If the database stays
+    locked the drain stops where it got to and another is scheduled.
+    """
+    batch_size = batch_size or settings.INTAKE_JOURNAL_BATCH_SIZE
+    with _locked('drain'):
+        saved, offset = _drain_from(_read_checkpoint(), batch_size)
+        with _locked('append'):
+            journal = _path('intake.journal')
+            if offset and journal.exists() and journal.stat().st_size == offset:
+                # Fully drained and no append in progress: start the journal over
+                journal.write_bytes(b'')
+                _write_checkpoint(0)
+                _start_index()
+    return saved
+
+
+def _drain_from(offset, batch_size):
+    """Drain batches from `offset`, moving the checkpoint after each; returns (saved, offset)"""
+    saved = 0
+    while batch := read_entries(offset, batch_size):
+        entries = [entry for entry, _ in batch if 'case_id' in entry and 'post' in entry]
+        # Already saved: replayed after a crash between commit and checkpoint
+        done = set(PetParent.objects.filter(
+            case_id__in=[e['case_id'] for e in entries]
+        ).values_list('case_id', flat=True))
+        todo = [e for e in entries if e['case_id'] not in done]
+        if todo:
+            try:
+                saved += _save_batch(todo)
+            except _StillLocked:
+                # Back off: the batch stays queued behind the checkpoint
+                logger.warning('Database still locked; journaled intakes stay queued, retrying in %ss',
+                               LOCKED_DRAIN_DELAY)
+                _retry_later()
+                break
+        for entry, _ in batch:
+            if 'case_id' not in entry or 'post' not in entry:
+                _reject(entry, 'Malformed journal line')
+        offset = batch[-1][1]
+        _write_checkpoint(offset)
+    return saved, offset
+
+
+def _retry_later():
+    timer = threading.Timer(LOCKED_DRAIN_DELAY, schedule_drain)
+    timer.daemon = True
+    timer.start()
@@ -0,0 +1,72 @@
+from django.apps import apps
+from .models import Pet, VetUpload, CaseVersion, UploadSession, MultiSelectChoice
+
+# One-to-one sections rendered on the case pages, fetched in the pet query via JOINs
+CASE_SELECT_RELATED = [
+    'owner',
+    'owner__consent',
+    'household',
+    'feeding',
+    'food_preferences',
+    'treat_plan_preferences',
+    'advice_source',
+    'diet_preferences',
+    'fitness',
+    'rehabilitation',
+    'medical_history',
+    'chronic_condition',
+    'vaccination_status',
+    'primary_vet',
+    'clinical_history',
+]
+
+# Dynamic tables, one query each regardless of row count
+CASE_PREFETCH_RELATED = [
+    'brands_to_avoid',
+    'commercial_diet',
+    'homemade_diet',
+    'commercial_treats',
+    'homemade_treats',
+    'supplements',
+    'recent_diet_changes',
+    'food_storage',
+    'activity_details',
+    'adverse_reactions',
+    'clinical_history__conditions',
+    'long_term_medications',
+    'surgical_history',
+    'diagnostic_imaging',
+    'vet_uploads',
+]
+
+# 1 query for the pet and its one-to-ones + 1 per prefetched table
+CASE_GRAPH_QUERIES = 1 + len(CASE_PREFETCH_RELATED)
+
+
+def case_graph_queryset():
+    """Pets with the whole case graph loaded up front"""
+    return Pet.objects.select_related(*CASE_SELECT_RELATED).prefetch_related(*CASE_PREFETCH_RELATED)
+
+
+def load_case_graph(pet_id):
+    """Load one case in CASE_GRAPH_QUERIES queries; raises Pet.DoesNotExist"""
+    return case_graph_queryset().get(pk=pet_id)
+
+
+def uploads_by_category(pet):
+    """Split the pet's prefetched vet uploads by category without another query"""
+    grouped = {category: [] for category, _ in VetUpload.CATEGORY_CHOICES}
+    for upload in pet.vet_uploads.all():
+        grouped.setdefault(upload.category, []).append(upload)
+    return grouped
+
+
+def pet_child_models():
+    """Every model with a `pet` FK/one-to-one, i.e. each section of a case"""
+    for model in apps.get_app_config('intake_form').get_models():
+        # Bookkeeping and derived data, not shown on the case pages
+        if model in (CaseVersion, UploadSession, MultiSelectChoice):
+            continue
+        field = next((f for f in model._meta.concrete_fields if f.name == 'pet'), None)
+        if field is not None and field.related_model is Pet:
+            yield model
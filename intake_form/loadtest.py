@@ -0,0 +1,176 @@
+"""
+HTTP load test for the intake POST (manage.py loadtest_intake).
+
+Each virtual user keeps its own cookie jar: it loads the form once for a CSRF
+token, then posts payloads back to back. Payloads are full form submissions
+with every repeated [] field, either generated by sample_intake_post() or
+replayed from a JSONL file (the import_cases format). Only the POST is timed;
+the success page is then fetched untimed to read the case ID, so duplicate
+case IDs can be counted.
+
+A share of payloads can deliberately reuse an earlier email
+(duplicate_rate) to see how the endpoint answers unique-email collisions.
+"""
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+from http.cookiejar import CookieJar
+from itertools import count
+from .bulk_import import read_jsonl
+from .sample_data import sample_intake_post
+
+CSRF_RE = re.compile(rb'name="csrfmiddlewaretoken" value="([^"]+)"')
+CASE_ID_RE = re.compile(rb'PNV-\d{4}-\d+')
+HISTOGRAM_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def with_emails(posts, seed=0, duplicate_rate=0.0):
+    """
+    Give each payload a fresh email, except a `duplicate_rate` share that
+    reuse an earlier one. Yields (payload, reuses an earlier email).
+    """
+    rng = random.Random(seed)
+    run = time.time_ns()
+    emails = []
+    for i, post in enumerate(posts):
+        post = post.copy()
+        duplicate = bool(emails) and rng.random() < duplicate_rate
+        post['parent_email'] = rng.choice(emails) if duplicate else f'loadtest-{run}-{i}@example.com'
+        if not duplicate:
+            emails.append(post['parent_email'])
+        yield post, duplicate
+
+
+def generated_posts(seed=0):
+    rng = random.Random(seed)
+    for i in count():
+        yield sample_intake_post(index=i, rng=random.Random(rng.random()))
+
+
+def replayed_posts(path):
+    """Submissions from a JSONL file (import_cases format), cycled; read lazily each pass"""
+    while True:
+        replayed = 0
+        with open(path, encoding='utf-8') as f:
+            for _, post in read_jsonl(f):
+                if not isinstance(post, Exception):
+                    replayed += 1
+                    yield post
+        if not replayed:
+            return
+
+
+class LoadTest:
+    """Shared state of one run; workers pull payloads and record results under one lock"""
+
+    def __init__(self, url, payloads, total, timeout=30):
+        self.url = url
+        self.payloads = payloads
+        self.remaining = total
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.outcomes = Counter()
+        self.case_ids = Counter()
+        self.duplicates_sent = Counter()
+
+    def _next(self):
+        with self.lock:
+            if self.remaining <= 0:
+                return None
+            self.remaining -= 1
+            return next(self.payloads, None)
+
+    def _record(self, outcome, elapsed_ms, duplicate, case_id=None):
+        with self.lock:
+            self.outcomes[outcome] += 1
+            self.latencies.append(elapsed_ms)
+            if duplicate:
+                self.duplicates_sent[outcome] += 1
+            if case_id:
+                self.case_ids[case_id] += 1
+
+    def worker(self):
+        jar = CookieJar()
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar), _NoRedirect)
+        try:
+            with opener.open(self.url, timeout=self.timeout) as response:
+                token = CSRF_RE.search(response.read())
+        except (urllib.error.URLError, OSError):
+            token = None
+        token = token.group(1).decode() if token else ''
+
+        while (item := self._next()) is not None:
+            post, duplicate = item
+            data = [(k, v) for k in post for v in post.getlist(k)] + [('csrfmiddlewaretoken', token)]
+            request = urllib.request.Request(
+                self.url, data=urllib.parse.urlencode(data).encode(), headers={'Referer': self.url},
+            )
+            start = time.perf_counter()
+            try:
+                response = opener.open(request, timeout=self.timeout)
+                status, location = response.status, None
+                response.read()
+            except urllib.error.HTTPError as exc:
+                status, location = exc.code, exc.headers.get('Location')
+                exc.read()
+            except (urllib.error.URLError, OSError):
+                self._record('connection_error', (time.perf_counter() - start) * 1000, duplicate)
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+
+            if status in (301, 302, 303) and location:
+                case_id = None
+                try:
+                    with opener.open(urllib.parse.urljoin(self.url, location), timeout=self.timeout) as page:
+                        match = CASE_ID_RE.search(page.read())
+                        case_id = match.group().decode() if match else None
+                except (urllib.error.URLError, OSError):
+                    pass
+                self._record('ok', elapsed, duplicate, case_id)
+            else:
+                self._record(f'http_{status}', elapsed, duplicate)
+
+    def run(self, concurrency):
+        start = time.perf_counter()
+        threads = [threading.Thread(target=self.worker, daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.report(time.perf_counter() - start, concurrency)
+
+    def report(self, elapsed, concurrency):
+        latencies = sorted(self.latencies)
+        total = len(latencies)
+
+        def pct(p):
+            return round(latencies[min(total - 1, int(p / 100 * total))], 2) if total else None
+
+        buckets = Counter()
+        for ms in latencies:
+            buckets[next((f'<={b}ms' for b in HISTOGRAM_MS if ms <= b), f'>{HISTOGRAM_MS[-1]}ms')] += 1
+        errors = total - self.outcomes['ok']
+        return {
+            'url': self.url,
+            'concurrency': concurrency,
+            'requests': total,
+            'seconds': round(elapsed, 2),
+            'throughput_rps': round(total / elapsed, 1) if elapsed else 0,
+            'error_rate': round(errors / total, 4) if total else 0,
+            'outcomes': dict(self.outcomes),
+            'duplicate_emails_sent': dict(self.duplicates_sent),
+            'case_id_collisions': sum(n - 1 for n in self.case_ids.values() if n > 1),
+            'latency_ms': {'p50': pct(50), 'p90': pct(90), 'p99': pct(99), 'max': pct(100)},
+            'histogram': {label: buckets[label] for label in [f'<={b}ms' for b in HISTOGRAM_MS] + [f'>{HISTOGRAM_MS[-1]}ms']},
+        }
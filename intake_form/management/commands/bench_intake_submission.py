@@ -0,0 +1,48 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from intake_form.models import PetParent
+from intake_form.sample_data import sample_intake_post
+from intake_form.submission import parse_intake_submission
+
+
+def save_row_by_row(graph):
+    """The old write path: one autocommitted INSERT per row"""
+    graph.parent.save()
+    graph.pet.owner = graph.parent
+    graph.pet.save()
+    for row in graph.rows:
+        row.pet = graph.pet
+        row.save()
+    graph.consent.pet_parent = graph.parent
+    graph.consent.save()
+    return graph.parent
+
+
+class Command(BaseCommand):
+    help = 'Compare round-trips and wall time per intake submission: row-by-row vs. batched transaction'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--submissions', type=int, default=50)
+        parser.add_argument('--rows', type=int, default=3, help='Rows per dynamic table')
+
+    def handle(self, *args, **options):
+        count = options['submissions']
+        results = {}
+        for label, write in [('row-by-row', save_row_by_row), ('batched', lambda g: g.save())]:
+            created = []
+            queries = 0
+            start = time.perf_counter()
+            for i in range(count):
+                post = sample_intake_post(index=i, rows=options['rows'])
+                post['parent_email'] = f'bench-{label}-{i}@example.com'
+                with CaptureQueriesContext(connection) as ctx:
+                    created.append(write(parse_intake_submission(post)).pk)
+                queries += len(ctx.captured_queries)
+            elapsed = time.perf_counter() - start
+            PetParent.objects.filter(pk__in=created).delete()
+            results[label] = (queries / count, elapsed / count * 1000)
+
+        for label, (q, ms) in results.items():
+            self.stdout.write(f'{label:>12}: {q:6.1f} queries/submission  {ms:8.2f} ms/submission')
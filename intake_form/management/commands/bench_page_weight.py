@@ -0,0 +1,49 @@
+import json
+import tempfile
+from pathlib import Path
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from intake_form.benchmarks import PAGE_WEIGHT_PAGES, PRODUCTION_STORAGES, bench_database, run_page_weight, seed_cases
+
+
+def kib(n):
+    return f'{n / 1024:.1f}'
+
+
+class Command(BaseCommand):
+    help = 'Bytes each intake_form page sends (HTML + static assets), first and repeat visit, after collectstatic'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', nargs='+', choices=PAGE_WEIGHT_PAGES, help='Default: all')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Also write the results as JSON')
+
+    def handle(self, *args, **options):
+        media = tempfile.TemporaryDirectory()
+        static = tempfile.TemporaryDirectory()
+        # A fresh build of this tree's assets, served the way production serves them
+        overrides = override_settings(
+            STORAGES=PRODUCTION_STORAGES, STATIC_ROOT=static.name, MEDIA_ROOT=media.name, DEBUG=False,
+            ALLOWED_HOSTS=['testserver'],
+            CASE_PDF_WORKERS=0, VET_UPLOAD_WORKERS=0,
+        )
+        with media, static, overrides, bench_database():
+            call_command('collectstatic', interactive=False, verbosity=0)
+            seed_cases(1, options['seed'])
+            results = run_page_weight(options['pages'])
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2) + '\n')
+
+        self.stdout.write(f'{"page":<12} {"status":>6} {"html KiB":>9} {"assets":>6} {"asset KiB":>9} '
+                          f'{"first KiB":>9} {"repeat KiB":>10}')
+        for name, r in results.items():
+            asset_bytes = sum(a['bytes'] for a in r['assets'])
+            self.stdout.write(f'{name:<12} {r["status"]:>6} {kib(r["html_bytes"]):>9} {len(r["assets"]):>6} '
+                              f'{kib(asset_bytes):>9} {kib(r["first_visit_bytes"]):>9} '
+                              f'{kib(r["repeat_visit_bytes"]):>10}')
+            if options['verbosity'] > 1:
+                for a in r['assets']:
+                    cached = 'immutable' if a['immutable'] else 'revalidated'
+                    self.stdout.write(f'    {a["url"]}  {kib(a["bytes"])} KiB {a["encoding"]}, {cached}')
@@ -0,0 +1,56 @@
+import json
+import tempfile
+import time
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from intake_form.benchmarks import SQLITE_PROFILES, bench_database, run_sqlite_concurrency, seed_cases, sqlite_profile
+from intake_form.db_tuning import current_pragmas
+
+
+class Command(BaseCommand):
+    help = 'Concurrent readers and writers on one SQLite file, stock settings vs. tuned (db_tuning.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cases', type=int, default=1000, help='Cases to seed before the run')
+        parser.add_argument('--readers', type=int, default=4, help='Reader threads (dashboard page + case graph)')
+        parser.add_argument('--writers', type=int, default=2, help='Writer threads (intake submissions)')
+        parser.add_argument('--seconds', type=float, default=5, help='Run length per profile')
+        parser.add_argument('--profiles', nargs='+', choices=SQLITE_PROFILES, default=list(SQLITE_PROFILES))
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Also write the results as JSON')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('bench_sqlite needs a SQLite database')
+        results = {}
+        media = tempfile.TemporaryDirectory()
+        directory = tempfile.TemporaryDirectory()
+        with media, directory, override_settings(MEDIA_ROOT=media.name, CASE_PDF_WORKERS=0, VET_UPLOAD_WORKERS=0):
+            # One seeded file, so every profile starts from the same data
+            with bench_database(Path(directory.name) / 'bench.sqlite3', keepdb=True):
+                start = time.perf_counter()
+                created = seed_cases(options['cases'], options['seed'])
+                self.stdout.write(f'Seeded {created} cases in {time.perf_counter() - start:.1f}s')
+                for name in options['profiles']:
+                    with sqlite_profile(name):
+                        pragmas = current_pragmas(connection)
+                        results[name] = run_sqlite_concurrency(
+                            options['readers'], options['writers'], options['seconds'], options['seed'],
+                        )
+                    results[name]['pragmas'] = pragmas
+                    self.stdout.write(f'{name}: {pragmas}')
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2) + '\n')
+
+        self.stdout.write(
+            f'{options["readers"]} readers, {options["writers"]} writers, {options["seconds"]}s per profile\n'
+            f'{"profile":<8} {"":<6} {"ops/s":>8} {"p50 ms":>9} {"p95 ms":>9} {"locked":>7}'
+        )
+        for name, result in results.items():
+            for kind in ['reads', 'writes']:
+                r = result[kind]
+                self.stdout.write(f'{name:<8} {kind:<6} {r["ops_per_s"]:>8} {r["p50_ms"] or "-":>9} '
+                                  f'{r["p95_ms"] or "-":>9} {r["locked_errors"]:>7}')
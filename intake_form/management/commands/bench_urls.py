@@ -0,0 +1,81 @@
+import json
+import platform
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.utils import timezone
+from intake_form.benchmarks import SCENARIOS, bench_database, run_benchmarks, seed_cases
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Benchmark every intake_form page on a seeded database: queries, p50/p95 latency, peak memory (JSON)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cases', type=int, default=1000, help='Cases to seed (e.g. 1000, 10000, 100000)')
+        parser.add_argument('--requests', type=int, default=30, help='Timed requests per scenario')
+        parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, help='Default: all')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--db', help='SQLite file for the benchmark database (default: in memory)')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the seeded database for the next run')
+        parser.add_argument('--output', help='JSON results file (default: bench_results/<commit>-<cases>.json)')
+        parser.add_argument('--compare', help='Earlier results file to print the change against')
+
+    def handle(self, *args, **options):
+        if options['keepdb'] and not options['db']:
+            raise CommandError('--keepdb needs --db (an in-memory database cannot be kept)')
+        baseline = None
+        if options['compare']:
+            try:
+                baseline = json.loads(Path(options['compare']).read_text())['results']
+            except (OSError, ValueError, KeyError) as exc:
+                raise CommandError(f'Cannot read {options["compare"]}: {exc}')
+
+        media = tempfile.TemporaryDirectory()
+        # Background pools run inline: the timings then include the work a request triggers
+        overrides = override_settings(
+            MEDIA_ROOT=media.name, ALLOWED_HOSTS=['testserver'], CASE_PDF_WORKERS=0, VET_UPLOAD_WORKERS=0,
+        )
+        with media, overrides, bench_database(options['db'], options['keepdb']):
+            start = time.perf_counter()
+            created = seed_cases(options['cases'], options['seed'])
+            self.stdout.write(f'Seeded {created} cases in {time.perf_counter() - start:.1f}s')
+            results = run_benchmarks(options['requests'], options['scenarios'], options['seed'])
+
+        commit = git_commit()
+        report = {
+            'commit': commit,
+            'created_at': timezone.now().isoformat(),
+            'cases': options['cases'],
+            'requests': options['requests'],
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': settings.DATABASES['default']['ENGINE'].rsplit('.', 1)[-1],
+            'results': results,
+        }
+        output = Path(options['output'] or Path(settings.BASE_DIR) / 'bench_results' / f'{commit or "local"}-{options["cases"]}.json')
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2) + '\n')
+
+        self.stdout.write(f'{"scenario":<18} {"queries":>8} {"p50 ms":>9} {"p95 ms":>9} {"peak KiB":>9}')
+        for name, r in results.items():
+            line = f'{name:<18} {r["queries"]:>8} {r["p50_ms"]:>9.2f} {r["p95_ms"]:>9.2f} {r["peak_kib"]:>9.1f}'
+            before = (baseline or {}).get(name)
+            if before:
+                line += f'   ({r["queries"] - before["queries"]:+} queries, {r["p50_ms"] - before["p50_ms"]:+.2f} ms p50)'
+            self.stdout.write(line)
+        self.stdout.write(f'Results written to {output}')
@@ -0,0 +1,33 @@
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from intake_form.models import VetUpload
+from intake_form.storage import BLOB_DIR, blob_name, blob_storage, hash_content
+
+
+class Command(BaseCommand):
+    help = 'Move vet uploads stored before content addressing into shared blobs'
+
+    def handle(self, *args, **options):
+        moved = missing = freed = 0
+        legacy = VetUpload.objects.exclude(file='').exclude(file__startswith=f'{BLOB_DIR}/')
+        for upload in legacy.iterator():
+            old = upload.file.name
+            if not blob_storage.exists(old):
+                self.stderr.write(f'Missing file for upload {upload.pk}: {old}')
+                missing += 1
+                continue
+            size = blob_storage.size(old)
+            with blob_storage.open(old, 'rb') as f:
+                content = File(f, name=old)
+                content.sha256 = hash_content(content)
+                duplicate = blob_storage.exists(blob_name(content.sha256, old))
+                with transaction.atomic():
+                    # Saving takes this upload's reference to the blob
+                    name = blob_storage.save(old, content)
+                    VetUpload.objects.filter(pk=upload.pk).update(file=name, sha256=content.sha256, size=size)
+            blob_storage.delete(old)
+            moved += 1
+            if duplicate:
+                freed += size
+        self.stdout.write(f'{moved} uploads moved into blobs, {missing} missing, {freed} bytes freed by duplicates')
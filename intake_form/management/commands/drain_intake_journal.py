@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from intake_form import journal
+
+
+class Command(BaseCommand):
+    help = 'Save journaled intake submissions into the database now, or keep doing so (web processes also drain on their own)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--follow', action='store_true', help='Keep polling the journal instead of exiting')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds between polls with --follow')
+        parser.add_argument('--batch-size', type=int, help='Entries per transaction (default: INTAKE_JOURNAL_BATCH_SIZE)')
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.perf_counter()
+            saved = journal.drain(options['batch_size'])
+            if saved or not options['follow']:
+                self.stdout.write(f'{saved} cases saved in {time.perf_counter() - start:.2f}s')
+            if not options['follow']:
+                return
+            time.sleep(options['interval'])
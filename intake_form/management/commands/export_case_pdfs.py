@@ -0,0 +1,50 @@
+import shutil
+import time
+from concurrent.futures import as_completed
+from pathlib import Path
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from intake_form.case_pdf import case_pdf_filename, submit_render
+from intake_form.models import Pet
+
+
+class Command(BaseCommand):
+    help = 'Render case PDFs in the background pool and copy them into a folder (e.g. a referral packet)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('pet_ids', nargs='*', type=int, help='Pets to export (default: every case)')
+        parser.add_argument('--output', required=True, help='Folder to copy the PDFs into')
+
+    def handle(self, *args, **options):
+        pets = Pet.objects.select_related('owner').order_by('pk')
+        if options['pet_ids']:
+            pets = pets.filter(pk__in=options['pet_ids'])
+        filenames = {pet.pk: case_pdf_filename(pet) for pet in pets}
+        missing = set(options['pet_ids']) - set(filenames)
+        if missing:
+            raise CommandError(f'No such pet: {", ".join(map(str, sorted(missing)))}')
+
+        output = Path(options['output'])
+        output.mkdir(parents=True, exist_ok=True)
+
+        start = time.perf_counter()
+        futures = {submit_render(pet_id): pet_id for pet_id in filenames}
+        failed = []
+        for future in as_completed(futures):
+            pet_id = futures[future]
+            try:
+                name = future.result()
+            except Exception as exc:
+                name, reason = None, exc
+            else:
+                reason = 'no case version'
+            if name is None:
+                # One case that cannot be rendered must not cost the rest of the export
+                self.stderr.write(f'Pet {pet_id}: skipped ({reason})')
+                failed.append(pet_id)
+                continue
+            with default_storage.open(name, 'rb') as src, open(output / filenames[pet_id], 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+        self.stdout.write(f'{len(futures) - len(failed)} PDFs in {time.perf_counter() - start:.2f}s -> {output}')
+        if failed:
+            raise CommandError(f'Not exported: {", ".join(map(str, sorted(failed)))}')
@@ -0,0 +1,38 @@
+import time
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from intake_form.export import CHUNK_SIZE, tables, write_csv, write_parquet
+
+
+class Command(BaseCommand):
+    help = 'Export every case as research tables (wide cases table plus one long table per repeating section)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', required=True, help='Folder to write the tables into')
+        parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+        parser.add_argument('--tables', nargs='+', help='Only these tables (default: all)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows fetched per round-trip')
+
+    def handle(self, *args, **options):
+        available = tables()
+        names = options['tables'] or list(available)
+        unknown = set(names) - set(available)
+        if unknown:
+            raise CommandError(f'Unknown table(s): {", ".join(sorted(unknown))}. Choose from: {", ".join(available)}')
+        if options['format'] == 'parquet':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise CommandError('Parquet export needs pyarrow (pip install pyarrow)')
+
+        output = Path(options['output'])
+        output.mkdir(parents=True, exist_ok=True)
+        for name in names:
+            start = time.perf_counter()
+            path = output / f'{name}.{options["format"]}'
+            if options['format'] == 'csv':
+                with open(path, 'w', newline='', encoding='utf-8') as f:
+                    count = write_csv(available[name], f, options['chunk_size'])
+            else:
+                count = write_parquet(available[name], path, options['chunk_size'])
+            self.stdout.write(f'{name}: {count} rows in {time.perf_counter() - start:.2f}s -> {path}')
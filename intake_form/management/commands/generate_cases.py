@@ -0,0 +1,35 @@
+import time
+from itertools import islice
+from django.core.management.base import BaseCommand
+from intake_form.synthetic import generate_batch, missing_indexes, shared_blobs
+
+
+class Command(BaseCommand):
+    help = 'Generate fully populated synthetic cases (deterministic per --seed) for load tests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cases', type=int, default=1000, help='Total synthetic cases wanted for this seed')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=500, help='Cases per transaction')
+        parser.add_argument('--max-rows', type=int, default=3, help='Upper bound of rows per repeating section')
+        parser.add_argument('--vet-share', type=float, default=0.5, help='Fraction of cases with a clinical history')
+        parser.add_argument('--no-uploads', action='store_true', help="Don't create vet uploads (or blob files)")
+
+    def handle(self, *args, **options):
+        blobs = None if options['no_uploads'] else shared_blobs()
+        todo = missing_indexes(options['seed'], options['cases'])
+        cases = rows = 0
+        start = time.perf_counter()
+        while batch := list(islice(todo, options['batch_size'])):
+            created, child_rows = generate_batch(
+                options['seed'], batch, max_rows=options['max_rows'], vet_share=options['vet_share'], blobs=blobs,
+            )
+            cases += created
+            rows += child_rows
+            if options['verbosity'] >= 2:
+                self.stdout.write(f'  {cases} cases, {rows} child rows')
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'{cases} cases, {rows} child rows in {elapsed:.1f}s '
+            f'({rows / elapsed if elapsed else 0:.0f} rows/s)'
+        )
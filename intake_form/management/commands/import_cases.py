@@ -0,0 +1,66 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from intake_form import import_worker
+from intake_form.bulk_import import READERS, batches, import_batch
+
+
+class Command(BaseCommand):
+    help = 'Import historical intakes from a JSONL or CSV file (intake form field names; see bulk_import.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=sorted(READERS), help='Default: from the file extension')
+        parser.add_argument('--batch-size', type=int, default=500, help='Cases per transaction')
+        parser.add_argument('--workers', type=int, default=2, help='Writer processes (0: import in this process)')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        fmt = options['format'] or path.suffix.lstrip('.').lower()
+        if fmt not in READERS:
+            raise CommandError(f'Unknown format {fmt!r}; pass --format {"/".join(sorted(READERS))}')
+        if not path.exists():
+            raise CommandError(f'No such file: {path}')
+
+        self.verbosity = options['verbosity']
+        self.saved = self.skipped = self.failed = 0
+        start = time.perf_counter()
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            work = batches(READERS[fmt](f), options['batch_size'])
+            if options['workers'] <= 0:
+                for batch in work:
+                    self.report(import_batch(batch))
+            else:
+                self.run_pool(work, options['workers'])
+
+        elapsed = time.perf_counter() - start
+        total = self.saved + self.skipped + self.failed
+        self.stdout.write(
+            f'{total} rows: {self.saved} imported, {self.skipped} already present, {self.failed} failed '
+            f'in {elapsed:.2f}s ({total / elapsed if elapsed else 0:.0f} rows/s)'
+        )
+
+    def run_pool(self, work, workers):
+        # At most two batches queued per worker, so memory stays flat however big the file is
+        with ProcessPoolExecutor(workers, mp_context=get_context('spawn'), initializer=import_worker.init_worker) as pool:
+            pending = set()
+            for batch in work:
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self.report(future.result())
+                pending.add(pool.submit(import_worker.import_batch, batch))
+            for future in wait(pending).done:
+                self.report(future.result())
+
+    def report(self, result):
+        saved, skipped, errors = result
+        self.saved += saved
+        self.skipped += skipped
+        self.failed += len(errors)
+        for line_no, message in errors:
+            self.stderr.write(f'Line {line_no}: {message}')
+        if self.verbosity >= 2:
+            self.stdout.write(f'  {self.saved} imported so far')
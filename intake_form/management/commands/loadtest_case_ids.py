@@ -0,0 +1,49 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from intake_form.models import PetParent
+
+
+class Command(BaseCommand):
+    help = 'Create cases from parallel submitters and check that every case ID is unique'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--per-worker', type=int, default=50)
+
+    def handle(self, *args, **options):
+        workers, per_worker = options['workers'], options['per_worker']
+        run = f'{time.time_ns()}'
+
+        def submitter(worker):
+            created = []
+            try:
+                for i in range(per_worker):
+                    parent = PetParent.objects.create(
+                        name=f'Load test {worker}-{i}',
+                        email=f'loadtest-{run}-{worker}-{i}@example.com',
+                        phone='0000000000',
+                    )
+                    created.append(parent.case_id)
+            finally:
+                connection.close()
+            return created
+
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                case_ids = [case_id for ids in pool.map(submitter, range(workers)) for case_id in ids]
+            elapsed = time.perf_counter() - start
+        finally:
+            # Every row of this run, including those of a worker that failed part way
+            PetParent.objects.filter(email__startswith=f'loadtest-{run}-').delete()
+
+        collisions = len(case_ids) - len(set(case_ids))
+        self.stdout.write(
+            f'{len(case_ids)} cases from {workers} workers in {elapsed:.2f}s '
+            f'({len(case_ids) / elapsed:.0f}/s), {collisions} collisions, '
+            f'range {min(case_ids)} .. {max(case_ids)}'
+        )
+        if collisions or len(case_ids) != workers * per_worker:
+            raise CommandError('Case ID allocation produced collisions or failed submissions')
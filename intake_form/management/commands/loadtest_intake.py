@@ -0,0 +1,73 @@
+import json
+import threading
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+from django.urls import reverse
+from intake_form.loadtest import LoadTest, generated_posts, replayed_posts, with_emails
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Load-test the intake form POST over HTTP: throughput, error rate, collisions and a latency histogram'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Intake form URL of a running server, e.g. http://127.0.0.1:8000/intake/')
+        parser.add_argument('--serve', action='store_true',
+                            help='Start a threaded server in this process (against the configured database) instead')
+        parser.add_argument('--async-endpoint', action='store_true', help='With --serve: target the write-behind view')
+        parser.add_argument('--concurrency', type=int, default=8, help='Virtual users')
+        parser.add_argument('--requests', type=int, default=200, help='POSTs in total')
+        parser.add_argument('--payloads', help='JSONL file of submissions to replay (default: generated)')
+        parser.add_argument('--duplicate-rate', type=float, default=0.0,
+                            help='Share of POSTs reusing an earlier email, to exercise unique collisions')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--output', help='Also write the report as JSON')
+
+    def handle(self, *args, **options):
+        if bool(options['url']) == options['serve']:
+            raise CommandError('Pass either --url or --serve')
+        if options['payloads'] and not Path(options['payloads']).exists():
+            raise CommandError(f'No such file: {options["payloads"]}')
+
+        server = None
+        url = options['url']
+        if options['serve']:
+            server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler)
+            server.set_app(get_internal_wsgi_application())
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            path = reverse('intake_form_async' if options['async_endpoint'] else 'intake_form')
+            url = f'http://127.0.0.1:{server.server_port}{path}'
+
+        posts = replayed_posts(options['payloads']) if options['payloads'] else generated_posts(options['seed'])
+        payloads = with_emails(posts, options['seed'], options['duplicate_rate'])
+        try:
+            report = LoadTest(url, payloads, options['requests'], options['timeout']).run(options['concurrency'])
+        finally:
+            if server:
+                server.shutdown()
+                server.server_close()
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2) + '\n')
+        self.print_report(report)
+
+    def print_report(self, report):
+        latency = report['latency_ms']
+        self.stdout.write(
+            f'{report["requests"]} POSTs to {report["url"]} with {report["concurrency"]} users '
+            f'in {report["seconds"]}s: {report["throughput_rps"]} req/s, error rate {report["error_rate"]:.2%}'
+        )
+        self.stdout.write(f'Outcomes: {report["outcomes"]}')
+        if report['duplicate_emails_sent']:
+            self.stdout.write(f'Duplicate-email POSTs answered: {report["duplicate_emails_sent"]}')
+        self.stdout.write(f'Case ID collisions: {report["case_id_collisions"]}')
+        self.stdout.write(f'Latency ms: p50 {latency["p50"]}  p90 {latency["p90"]}  p99 {latency["p99"]}  max {latency["max"]}')
+        widest = max(report['histogram'].values(), default=0) or 1
+        for label, n in report['histogram'].items():
+            self.stdout.write(f'  {label:>9} {n:>6} {"#" * round(40 * n / widest)}')
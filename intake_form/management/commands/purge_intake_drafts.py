@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from intake_form.drafts import purge_drafts
+
+
+class Command(BaseCommand):
+    help = 'Delete intake drafts (submitted or abandoned) older than INTAKE_DRAFT_MAX_AGE_DAYS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Age limit in days (default: INTAKE_DRAFT_MAX_AGE_DAYS)')
+
+    def handle(self, *args, **options):
+        deleted = purge_drafts(options['days'])
+        self.stdout.write(f'{deleted} drafts deleted')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from intake_form.uploads import purge_sessions
+
+
+class Command(BaseCommand):
+    help = 'Delete unfinished vet uploads idle for more than VET_UPLOAD_SESSION_MAX_AGE_DAYS, with their partial files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Age limit in days (default: VET_UPLOAD_SESSION_MAX_AGE_DAYS)')
+
+    def handle(self, *args, **options):
+        deleted = purge_sessions(options['days'])
+        self.stdout.write(f'{deleted} upload sessions deleted')
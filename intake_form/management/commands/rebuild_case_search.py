@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from intake_form.dashboard import missing_search_triggers, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Recreate the case search FTS table and its triggers (after a migration rebuilt pet/petparent)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--if-missing', action='store_true',
+                            help='Only rebuild when a trigger is missing')
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        if connections[alias].vendor != 'sqlite':
+            raise CommandError('The case search index is SQLite-only; other databases search with icontains')
+        if options['if_missing'] and not missing_search_triggers(alias):
+            self.stdout.write('Case search triggers are all present')
+            return
+        rows = rebuild_search_index(alias)
+        self.stdout.write(f'Case search rebuilt: {rows} cases indexed')
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from intake_form.multiselect import rebuild_choices
+
+
+class Command(BaseCommand):
+    help = 'Recreate the multi-select choice index from the case sections (e.g. after a queryset .update())'
+
+    def handle(self, *args, **options):
+        created = rebuild_choices()
+        self.stdout.write(f'{created} choices indexed')
@@ -0,0 +1,31 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from intake_form.routers import sync_sqlite_replica
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database onto the READ_REPLICA file (online backup)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--follow', action='store_true', help='Keep copying instead of exiting')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds between copies with --follow (keep below READ_REPLICA_STICKY_SECONDS)')
+
+    def handle(self, *args, **options):
+        if not settings.READ_REPLICA or settings.READ_REPLICA not in settings.DATABASES:
+            raise CommandError('Set READ_REPLICA to a DATABASES alias first (see settings.py)')
+        if options['follow'] and options['interval'] >= settings.READ_REPLICA_STICKY_SECONDS:
+            self.stderr.write('Warning: the interval is not below READ_REPLICA_STICKY_SECONDS, '
+                              'so a browser can read from the replica before its write reaches it')
+        while True:
+            start = time.perf_counter()
+            try:
+                pages = sync_sqlite_replica()
+            except ValueError as exc:
+                raise CommandError(exc)
+            if options['verbosity'] > 1 or not options['follow']:
+                self.stdout.write(f'Replica synced: {pages} pages in {time.perf_counter() - start:.2f}s')
+            if not options['follow']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,345 @@
+"""
+Prometheus metrics, served in the text exposition format at /metrics.
+
+Counters and histograms are sharded per thread: a request only ever writes
+to its own thread's dict, so recording takes no lock. A scrape adds the
+shards up.
+
+With several worker processes (gunicorn), point METRICS_DIR at a directory
+they share. Each process writes its totals to worker-<id>.json there every
+METRICS_FLUSH_SECONDS (and on exit), and a scrape of any worker sums every
+file, so the numbers cover the whole server whichever worker answers. The id
+is a uuid picked after fork, so a worker that reuses an exited one's PID
+starts a file of its own.
+
+A scrape also folds the files of exited workers (PID gone) into exited.json
+and removes them, so counters never go backwards and the directory holds one
+file per live worker. A worker whose PID has been reused is kept until that
+process exits too. Clearing the directory on deploy still resets the counts
+(Prometheus handles that as a restart).
+"""
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: exited workers' files are kept as they are
+    fcntl = None
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _shard(self):
+        shard = getattr(self._local, 'values', None)
+        if shard is None:
+            shard = self._local.values = {}
+            # Once per thread; a finished thread's shard keeps its counts
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _key(self, labels):
+        return tuple(str(labels[label]) for label in self.labels)
+
+    def reset(self):
+        # Also used right after fork(), when another thread may have held the lock
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def collect(self):
+        """{label values: value} summed over every thread"""
+        with self._shards_lock:
+            shards = list(self._shards)
+        totals = {}
+        for shard in shards:
+            for key, value in shard.copy().items():
+                totals[key] = self._add(totals.get(key), value)
+        return totals
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    @staticmethod
+    def _add(total, value):
+        return (total or 0) + value
+
+
+class Histogram(Metric):
+    """Observations in seconds (or bytes); per key: bucket counts, then sum, then count"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        counts = shard.get(key)
+        if counts is None:
+            counts = shard[key] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        counts[-2] += value
+        counts[-1] += 1
+
+    @staticmethod
+    def _add(total, value):
+        return list(value) if total is None else [a + b for a, b in zip(total, value)]
+
+
+REGISTRY = []
+
+SUBMISSIONS = Counter(
+    'nutrivet_intake_submissions_total', 'Intake submissions by source and outcome', ['source', 'outcome'],
+)
+REQUESTS = Counter(
+    'nutrivet_requests_total', 'Requests by view and status code', ['view', 'status'],
+)
+REQUEST_SECONDS = Histogram(
+    'nutrivet_request_duration_seconds', 'Request latency by view', ['view'],
+)
+UPLOAD_BYTES = Counter(
+    'nutrivet_upload_bytes_total', 'Vet upload bytes received, chunked or posted with the vet form', ['path'],
+)
+SQLITE_LOCKED = Counter(
+    'nutrivet_sqlite_locked_errors_total', 'Queries that failed with "database is locked"',
+)
+JOURNAL_RETRIES = Counter(
+    'nutrivet_journal_locked_retries_total', 'Intake journal batches retried after "database is locked"',
+)
+CACHE_REQUESTS = Counter(
+    'nutrivet_case_cache_requests_total', 'Rendered case page cache lookups', ['page', 'outcome'],
+)
+
+
+# ═══════════════════════════════════════════════════════
+# DATABASE HEALTH
+# ═══════════════════════════════════════════════════════
+
+def is_locked_error(exc):
+    return 'database is locked' in str(exc) or 'database table is locked' in str(exc)
+
+
+def count_locked_errors(execute, sql, params, many, context):
+    """execute_wrapper installed on every connection by watch_locked_errors"""
+    try:
+        return execute(sql, params, many, context)
+    except Exception as exc:
+        if is_locked_error(exc):
+            SQLITE_LOCKED.inc()
+        raise
+
+
+def watch_locked_errors(sender, connection, **kwargs):
+    """connection_created receiver (see apps.py); background threads' connections are counted too"""
+    if count_locked_errors not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_locked_errors)
+
+
+# ═══════════════════════════════════════════════════════
+# EXPOSITION & MULTI-PROCESS AGGREGATION
+# ═══════════════════════════════════════════════════════
+
+def snapshot():
+    """This process's totals: {name: [[label values, value], ...]}"""
+    return {metric.name: [[list(key), value] for key, value in metric.collect().items()] for metric in REGISTRY}
+
+
+_last_flush = time.monotonic()
+_flush_lock = threading.Lock()
+# This process's file in METRICS_DIR; picked again in a forked child
+_instance = uuid.uuid4().hex
+EXITED = 'exited.json'
+
+
+def _write_json(path, data):
+    tmp = path.with_name(f'.{path.name}.tmp')
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def flush():
+    """Write this process's totals to METRICS_DIR/worker-<id>.json (atomically)"""
+    directory = settings.METRICS_DIR
+    if not directory:
+        return
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    _write_json(directory / f'worker-{_instance}.json', {'pid': os.getpid(), 'metrics': snapshot()})
+
+
+def maybe_flush():
+    """Flush if METRICS_FLUSH_SECONDS have passed; cheap enough to call per request"""
+    global _last_flush
+    if not settings.METRICS_DIR or time.monotonic() - _last_flush < settings.METRICS_FLUSH_SECONDS:
+        return
+    # Whichever thread gets here first flushes; the rest move on
+    if _flush_lock.acquire(blocking=False):
+        try:
+            _last_flush = time.monotonic()
+            flush()
+        finally:
+            _flush_lock.release()
+
+
+def _merge(totals, data):
+    """Add a snapshot ({name: [[label values, value], ...]}) into totals"""
+    by_name = {metric.name: metric for metric in REGISTRY}
+    for name, samples in data.items():
+        if name not in by_name:
+            continue
+        merged = totals.setdefault(name, {})
+        for key, value in samples:
+            key = tuple(key)
+            merged[key] = by_name[name]._add(merged.get(key), value)
+    return totals
+
+
+def _exited(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except (OSError, TypeError):
+        pass  # someone else's process (or no PID recorded): not ours to judge
+    return False
+
+
+@contextmanager
+def _directory_locked(directory):
+    with open(directory / '.lock', 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _compact(directory, exited):
+    """
+    Fold exited workers' files into `exited` ({'absorbed': [file names],
+    'metrics': totals}); returns it. A file is recorded as absorbed before it
+    is removed, so a crash in between never counts it twice.
+    """
+    absorbed = {name for name in exited['absorbed'] if (directory / name).exists()}
+    totals = _merge({}, exited['metrics'])
+    changed = len(absorbed) != len(exited['absorbed'])
+    for path in directory.glob('worker-*.json'):
+        data = _read_json(path)
+        if path.name in absorbed or data is None or not _exited(data.get('pid')):
+            continue
+        _merge(totals, data['metrics'])
+        absorbed.add(path.name)
+        changed = True
+    exited = {'absorbed': sorted(absorbed),
+              'metrics': {name: [[list(key), value] for key, value in samples.items()]
+                          for name, samples in totals.items()}}
+    if changed:
+        _write_json(directory / EXITED, exited)
+        for name in absorbed:
+            (directory / name).unlink(missing_ok=True)
+    return exited
+
+
+def aggregate():
+    """{name: {label values: value}} over every process (or just this one)"""
+    if not settings.METRICS_DIR:
+        return {metric.name: metric.collect() for metric in REGISTRY}
+    flush()
+    directory = Path(settings.METRICS_DIR)
+    totals = {metric.name: {} for metric in REGISTRY}
+    # Locked: a scrape must not read between another's fold and its removals
+    with _directory_locked(directory):
+        exited = _read_json(directory / EXITED) or {'absorbed': [], 'metrics': {}}
+        if fcntl:
+            exited = _compact(directory, exited)
+        _merge(totals, exited['metrics'])
+        for path in directory.glob('worker-*.json'):
+            data = _read_json(path)
+            if path.name not in exited['absorbed'] and data is not None:
+                _merge(totals, data['metrics'])
+    return totals
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def exposition():
+    """All metrics in the Prometheus text format (version 0.0.4)"""
+    totals = aggregate()
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        for key, value in sorted(totals[metric.name].items()):
+            if metric.kind == 'histogram':
+                cumulative = 0
+                for bound, n in zip(metric.buckets, value[:-2]):
+                    cumulative += n
+                    lines.append(f'{metric.name}_bucket{_labels(metric.labels, key, [("le", bound)])} {cumulative}')
+                lines.append(f'{metric.name}_bucket{_labels(metric.labels, key, [("le", "+Inf")])} {value[-1]}')
+                lines.append(f'{metric.name}_sum{_labels(metric.labels, key)} {_number(value[-2])}')
+                lines.append(f'{metric.name}_count{_labels(metric.labels, key)} {value[-1]}')
+            else:
+                lines.append(f'{metric.name}{_labels(metric.labels, key)} {_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def _reset_after_fork():
+    # A forked worker starts from zero, in a file of its own; the parent
+    # reports its own counts
+    global _instance
+    _instance = uuid.uuid4().hex
+    for metric in REGISTRY:
+        metric.reset()
+
+
+atexit.register(lambda: settings.configured and flush())
+os.register_at_fork(after_in_child=_reset_after_fork)
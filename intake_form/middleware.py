@@ -0,0 +1,160 @@
+import time
+from contextlib import ExitStack
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+from .compression import compress_response
+from .instrumentation import QueryRecorder, recording, request_metrics, server_timing
+from .metrics import REQUESTS, REQUEST_SECONDS, maybe_flush
+from .routers import PINNED_COOKIE, use_replica
+
+
+class BothModesMiddleware:
+    """
+    Middleware that runs in the handler's own mode: sync under WSGI, async
+    under ASGI. Django would otherwise move every ASGI request onto a thread
+    and back around each sync-only middleware, async views included.
+
+    Subclasses write __call__ for sync and __acall__ for async; a sync
+    process_view is wrapped in a coroutine for the async chain.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            if hasattr(self, 'process_view'):
+                self.process_view = self._aprocess_view
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        return type(self).process_view(self, request, view_func, view_args, view_kwargs)
+
+
+class RequestTimingMiddleware(BothModesMiddleware):
+    """
+    Record queries, SQL time, duplicate queries and timings for every request
+    (see instrumentation.py), and count it for Prometheus. Listed first in MIDDLEWARE, so `total` covers
+    the whole middleware stack and `view` runs from URL resolution until the
+    response comes back out.
+    """
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        recorder, start = QueryRecorder(), time.perf_counter()
+        with recording(recorder):
+            response = self.get_response(request)
+        return self._record(request, response, recorder, start)
+
+    async def __acall__(self, request):
+        recorder, start = QueryRecorder(), time.perf_counter()
+        with recording(recorder):
+            response = await self.get_response(request)
+        return self._record(request, response, recorder, start)
+
+    def _record(self, request, response, recorder, start):
+        end = time.perf_counter()
+        view_seconds = end - getattr(request, '_view_started', end)
+        response['Server-Timing'] = server_timing(recorder, view_seconds, end - start)
+        if request.resolver_match:
+            view = request.resolver_match.view_name
+            request_metrics.record(view, response.status_code, recorder, view_seconds, end - start)
+            REQUESTS.inc(view=view, status=response.status_code)
+            REQUEST_SECONDS.observe(end - start, view=view)
+        maybe_flush()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._view_started = time.perf_counter()
+
+
+class ReplicaRoutingMiddleware(BothModesMiddleware):
+    """
+    Send reads of the READ_REPLICA_VIEWS to the replica, unless this browser
+    wrote something within READ_REPLICA_STICKY_SECONDS (see routers.py).
+    """
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        request.read_replica = False
+        with ExitStack() as request._replica_routing:
+            response = self.get_response(request)
+        return self._route(request, response)
+
+    async def __acall__(self, request):
+        request.read_replica = False
+        # use_replica() is a ContextVar: set in process_view, it holds for this
+        # task and the sync_to_async calls the view makes
+        with ExitStack() as request._replica_routing:
+            response = await self.get_response(request)
+        return self._route(request, response)
+
+    def _route(self, request, response):
+        if request.read_replica and response.streaming:
+            # Streamed exports query as they are read, after the view returned
+            response.streaming_content = _on_replica(response.streaming_content)
+        if (settings.READ_REPLICA and request.method not in ('GET', 'HEAD', 'OPTIONS')
+                and response.status_code < 400):
+            response.set_cookie(PINNED_COOKIE, '1', max_age=settings.READ_REPLICA_STICKY_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.read_replica = bool(
+            settings.READ_REPLICA
+            and request.method in ('GET', 'HEAD')
+            and request.resolver_match.view_name in settings.READ_REPLICA_VIEWS
+            and PINNED_COOKIE not in request.COOKIES
+        )
+        if request.read_replica:
+            # Until the response is back in __call__
+            request._replica_routing.enter_context(use_replica())
+
+
+class StaticFilesMiddleware(BothModesMiddleware, WhiteNoiseMiddleware):
+    """
+    WhiteNoise, serving collectstatic's output straight after
+    SecurityMiddleware; requests for anything else go on to the URLconf.
+    WhiteNoise's own middleware is sync-only, which would put every ASGI
+    request on a thread; under ASGI this looks the file up the same way and
+    lets the handler stream it.
+    """
+
+    def __init__(self, get_response):
+        WhiteNoiseMiddleware.__init__(self, get_response)
+        super().__init__(get_response)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return WhiteNoiseMiddleware.__call__(self, request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class CompressionMiddleware(BothModesMiddleware):
+    """gzip/brotli for text responses, streamed ones included (see compression.py)"""
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return compress_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return compress_response(request, await self.get_response(request))
+
+
+def _on_replica(content):
+    with use_replica():
+        yield from content
@@ -0,0 +1,20 @@
+# Generated by Django 6.0.2 on 2026-10-17 00:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intake_form', '0006_vetupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaseIdSequence',
+            fields=[
+                ('year', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 6.0.2 on 2026-10-17 00:43
+
+from django.db import migrations, models
+
+
+# Full-text search index for the case dashboard (SQLite FTS5, trigram tokenizer
+# so substring matches behave like the old icontains search). One row per
+# PetParent, rowid = parent id; triggers keep it in sync with parents and pets.
+# SQLite drops triggers when Django rebuilds a table, so a later migration that
+# remakes intake_form_petparent or intake_form_pet must recreate them
+# (`manage.py rebuild_case_search`; the intake_form.W001 check flags it).
+CREATE_CASE_SEARCH = [
+    """CREATE VIRTUAL TABLE intake_form_casesearch USING fts5(
+        name, case_id, email, pet_names, tokenize='trigram'
+    )""",
+    """INSERT INTO intake_form_casesearch(rowid, name, case_id, email, pet_names)
+        SELECT p.id, p.name, p.case_id, p.email,
+               COALESCE((SELECT group_concat(name, ' ') FROM intake_form_pet WHERE owner_id = p.id), '')
+        FROM intake_form_petparent p""",
+    """CREATE TRIGGER intake_form_casesearch_parent_ai AFTER INSERT ON intake_form_petparent BEGIN
+        INSERT INTO intake_form_casesearch(rowid, name, case_id, email, pet_names)
+        VALUES (new.id, new.name, new.case_id, new.email, '');
+    END""",
+    """CREATE TRIGGER intake_form_casesearch_parent_au AFTER UPDATE ON intake_form_petparent BEGIN
+        UPDATE intake_form_casesearch SET name = new.name, case_id = new.case_id, email = new.email
+        WHERE rowid = new.id;
+    END""",
+    """CREATE TRIGGER intake_form_casesearch_parent_ad AFTER DELETE ON intake_form_petparent BEGIN
+        DELETE FROM intake_form_casesearch WHERE rowid = old.id;
+    END""",
+]
+
+for event, owners in [('INSERT', 'new.owner_id'),
+                      ('UPDATE', 'new.owner_id, old.owner_id'),
+                      ('DELETE', 'old.owner_id')]:
+    CREATE_CASE_SEARCH.append(
+        f"""CREATE TRIGGER intake_form_casesearch_pet_a{event[0].lower()} AFTER {event} ON intake_form_pet BEGIN
+        UPDATE intake_form_casesearch SET pet_names = COALESCE(
+            (SELECT group_concat(name, ' ') FROM intake_form_pet
+             WHERE owner_id = intake_form_casesearch.rowid), '')
+        WHERE rowid IN ({owners});
+    END"""
+    )
+
+DROP_CASE_SEARCH = [
+    'DROP TRIGGER IF EXISTS intake_form_casesearch_parent_ai',
+    'DROP TRIGGER IF EXISTS intake_form_casesearch_parent_au',
+    'DROP TRIGGER IF EXISTS intake_form_casesearch_parent_ad',
+    'DROP TRIGGER IF EXISTS intake_form_casesearch_pet_ai',
+    'DROP TRIGGER IF EXISTS intake_form_casesearch_pet_au',
+    'DROP TRIGGER IF EXISTS intake_form_casesearch_pet_ad',
+    'DROP TABLE IF EXISTS intake_form_casesearch',
+]
+
+
+def _run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        # Other backends fall back to icontains search (see dashboard.search_cases)
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intake_form', '0007_caseidsequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['name'], name='pet_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='petparent',
+            index=models.Index(fields=['-created_at', '-id'], name='petparent_created_idx'),
+        ),
+        migrations.RunPython(_run_on_sqlite(CREATE_CASE_SEARCH), _run_on_sqlite(DROP_CASE_SEARCH)),
+    ]
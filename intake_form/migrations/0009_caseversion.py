@@ -0,0 +1,33 @@
+# Generated by Django 6.0.2 on 2026-10-17 00:45
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def create_versions(apps, schema_editor):
+    Pet = apps.get_model('intake_form', 'Pet')
+    CaseVersion = apps.get_model('intake_form', 'CaseVersion')
+    CaseVersion.objects.bulk_create(
+        [CaseVersion(pet_id=pk) for pk in Pet.objects.values_list('pk', flat=True)],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intake_form', '0008_case_dashboard_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaseVersion',
+            fields=[
+                ('pet', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='case_version', serialize=False, to='intake_form.pet')),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 6.0.2 on 2026-10-17 00:52
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intake_form', '0009_caseversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vetupload',
+            name='content_type',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='vetupload',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='vetupload',
+            name='sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='vetupload',
+            name='size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='vetupload',
+            name='thumbnail',
+            field=models.FileField(blank=True, upload_to='vet_uploads/thumbs/%Y/%m/'),
+        ),
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('category', models.CharField(choices=[('blood_work', 'Blood Work / Lab Reports'), ('diagnostic_imaging', 'Diagnostic Imaging Reports')], max_length=30)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('received', models.BigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('pet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='intake_form.pet')),
+                ('upload', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='session', to='intake_form.vetupload')),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.2 on 2026-10-17 01:05
+
+import intake_form.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intake_form', '0010_vet_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadBlob',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('size', models.BigIntegerField(blank=True, null=True)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='vetupload',
+            name='file',
+            field=models.FileField(storage=intake_form.storage.vet_upload_storage, upload_to='vet_uploads/%Y/%m/'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 6.0.2 on 2026-10-17 09:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Frozen copy of multiselect.MULTISELECT_FIELDS: (model, related_query_name, fields)
+SECTIONS = [
+    ('FeedingBehavior', 'feeding', [
+        'eating_behaviors', 'unmonitored_sources', 'bowl_type', 'bowl_material',
+        'water_bowl_type', 'water_bowl_material',
+    ]),
+    ('FoodPreferences', 'food_preferences', [
+        'current_food_preferences', 'current_treat_preferences', 'important_food_factors',
+    ]),
+    ('TreatPreferenceInPlan', 'treat_plan_preferences', ['preferences']),
+    ('AdviceSource', 'advice_source', ['sources']),
+    ('DietPlanPreferences', 'diet_preferences', ['preferences']),
+    ('FitnessActivity', 'fitness', ['exercise_types']),
+    ('RehabilitationTherapy', 'rehabilitation', ['therapy_types']),
+    ('MedicalHistory', 'medical_history', ['stool_types', 'medication_admin_method']),
+]
+
+
+def backfill_choices(apps, schema_editor):
+    MultiSelectChoice = apps.get_model('intake_form', 'MultiSelectChoice')
+    for model_name, query_name, fields in SECTIONS:
+        model = apps.get_model('intake_form', model_name)
+        batch = []
+        for row in model.objects.values('pet_id', *fields).iterator():
+            for field in fields:
+                seen = set()
+                for value in (row[field] or '').split('|', 1)[0].split(','):
+                    value = value.strip()[:100]
+                    if value and value not in seen:
+                        seen.add(value)
+                        batch.append(MultiSelectChoice(pet_id=row['pet_id'], field=f'{query_name}__{field}', value=value))
+        MultiSelectChoice.objects.bulk_create(batch, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intake_form', '0011_content_addressed_uploads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MultiSelectChoice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(max_length=60)),
+                ('value', models.CharField(max_length=100)),
+                ('pet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='choices', to='intake_form.pet')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['field', 'value'], name='multiselect_lookup_idx')],
+                'constraints': [models.UniqueConstraint(fields=('pet', 'field', 'value'), name='multiselect_choice_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_choices, migrations.RunPython.noop),
+    ]
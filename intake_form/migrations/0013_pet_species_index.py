@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-17 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intake_form', '0012_multiselect_choices'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['species', 'name'], name='pet_species_name_idx'),
+        ),
+    ]
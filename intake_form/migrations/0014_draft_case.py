@@ -0,0 +1,37 @@
+# Generated by Django 6.0.2 on 2026-10-17 16:40
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intake_form', '0013_pet_species_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DraftCase',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('submitted_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('case', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='draft', to='intake_form.petparent')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DraftSection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30)),
+                ('answers', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('draft', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sections', to='intake_form.draftcase')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('draft', 'name'), name='draft_section_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-17 09:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intake_form', '0014_draft_case'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='writer',
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,13 +1,62 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
 from django.utils import timezone
-import random
-import string
 import os
+import uuid
+from .storage import blob_sha256, vet_upload_storage
 
 # ═══════════════════════════════════════════════════════
 # CORE MODELS: Pet Parent & Pet
 # ═══════════════════════════════════════════════════════
 
+class CaseIdSequence(models.Model):
+    """Per-year counter backing PetParent.case_id (PNV-{year}-{n})"""
+    PREFIX = 'PNV'
+
+    year = models.PositiveIntegerField(primary_key=True)
+    last_value = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def format(cls, year, value):
+        return f"{cls.PREFIX}-{year}-{value:04d}"
+
+    @classmethod
+    def next_case_id(cls, year=None):
+        """
+        Hand out the next case ID for the year.
+
+        A single UPDATE bumps the counter, so concurrent writers serialise on
+        the row lock (SQLite: the database write lock) and never see the same
+        value. The year's row is created on first use.
+        """
+        return cls.next_case_ids(1, year)[0]
+
+    @classmethod
+    def next_case_ids(cls, count, year=None):
+        """Reserve `count` consecutive case IDs with one counter bump (bulk imports)"""
+        year = year or timezone.now().year
+        step = models.F('last_value') + count
+        with transaction.atomic():
+            if not cls.objects.filter(year=year).update(last_value=step):
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(year=year, last_value=cls._legacy_max(year) + count)
+                except IntegrityError:
+                    # Another writer created the row first
+                    cls.objects.filter(year=year).update(last_value=step)
+            value = cls.objects.filter(year=year).values_list('last_value', flat=True).get()
+        return [cls.format(year, n) for n in range(value - count + 1, value + 1)]
+
+    @classmethod
+    def _legacy_max(cls, year):
+        """Highest number already used for the year (older IDs were random)"""
+        prefix = f"{cls.PREFIX}-{year}-"
+        used = PetParent.objects.filter(case_id__startswith=prefix).values_list('case_id', flat=True)
+        return max((int(c[len(prefix):]) for c in used if c[len(prefix):].isdigit()), default=0)
+
+    def __str__(self):
+        return f"{self.year}: {self.last_value}"
+
+
 class PetParent(models.Model):
     """Pet owner/guardian information"""
     # Unique identifiers
@@ -30,9 +79,7 @@ class PetParent(models.Model):
     def save(self, *args, **kwargs):
         # Auto-generate case ID if not exists
         if not self.case_id:
-            year = timezone.now().year
-            random_num = ''.join(random.choices(string.digits, k=4))
-            self.case_id = f"PNV-{year}-{random_num}"
+            self.case_id = CaseIdSequence.next_case_id()
         super().save(*args, **kwargs)
     
     def __str__(self):
@@ -42,6 +89,10 @@ class PetParent(models.Model):
         verbose_name = "Pet Parent"
         verbose_name_plural = "Pet Parents"
         ordering = ['-created_at']
+        indexes = [
+            # Dashboard keyset pagination
+            models.Index(fields=['-created_at', '-id'], name='petparent_created_idx'),
+        ]
 
 
 class Pet(models.Model):
@@ -86,6 +137,48 @@ class Pet(models.Model):
     
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name'], name='pet_name_idx'),
+            # Admin species filter, in the default ordering
+            models.Index(fields=['species', 'name'], name='pet_species_name_idx'),
+        ]
+
+
+class CaseVersion(models.Model):
+    """Change stamp for a case, bumped whenever the pet or anything hanging off it is saved"""
+    pet = models.OneToOneField(Pet, on_delete=models.CASCADE, primary_key=True, related_name='case_version')
+
+    version = models.PositiveIntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def bump(cls, **pet_filter):
+        """Advance the stamp for the matching pets, e.g. bump(pet_id=1) or bump(pet__owner_id=2)"""
+        cls.objects.filter(**pet_filter).update(version=models.F('version') + 1, changed_at=timezone.now())
+
+    def __str__(self):
+        return f"Case version {self.version} - pet {self.pet_id}"
+
+
+class MultiSelectChoice(models.Model):
+    """
+    One ticked option of a multi-select question, e.g. ('medical_history__stool_types', 'soft').
+    Mirrors the comma-separated text columns so cohort filters are indexed lookups (see multiselect.py).
+    """
+    pet = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='choices')
+    field = models.CharField(max_length=60)
+    value = models.CharField(max_length=100)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['pet', 'field', 'value'], name='multiselect_choice_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['field', 'value'], name='multiselect_lookup_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.field}={self.value} - pet {self.pet_id}"
 
 
 # ═══════════════════════════════════════════════════════
@@ -611,6 +704,47 @@ class DiagnosticImaging(models.Model):
         return f"{self.imaging_type} - {self.pet.name}"
 
 
+class UploadBlob(models.Model):
+    """Reference count for a content-addressed file shared by VetUploads (see storage.py)"""
+    name = models.CharField(max_length=255, primary_key=True)
+    size = models.BigIntegerField(null=True, blank=True)
+    refcount = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def acquire(cls, name, size=None, count=1):
+        with transaction.atomic():
+            if cls.objects.filter(name=name).update(refcount=models.F('refcount') + count):
+                return
+            try:
+                with transaction.atomic():
+                    cls.objects.create(name=name, size=size, refcount=count)
+            except IntegrityError:
+                cls.objects.filter(name=name).update(refcount=models.F('refcount') + count)
+
+    @classmethod
+    def release(cls, name):
+        """Drop one reference; True if that was the last (see remove_if_unused)"""
+        with transaction.atomic():
+            cls.objects.filter(name=name, refcount__gt=0).update(refcount=models.F('refcount') - 1)
+            return cls.objects.filter(name=name, refcount=0).exists()
+
+    @classmethod
+    def remove_if_unused(cls, name, storage):
+        """
+        Delete the blob's row and then its file, if it still has no references.
+        An acquire() that got in first keeps both; one that comes after waits
+        for the row delete and then stores the file again.
+        """
+        with transaction.atomic():
+            deleted, _ = cls.objects.filter(name=name, refcount=0).delete()
+            if deleted and storage.exists(name):
+                storage.delete(name)
+        return bool(deleted)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
+
+
 class VetUpload(models.Model):
     """File uploads from the vet clinical form (lab reports, imaging reports)"""
     CATEGORY_CHOICES = [
@@ -620,10 +754,18 @@ class VetUpload(models.Model):
 
     pet = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='vet_uploads')
     category = models.CharField(max_length=30, choices=CATEGORY_CHOICES)
-    file = models.FileField(upload_to='vet_uploads/%Y/%m/')
+    # Content-addressed: identical files share one blob (upload_to only applies to older rows)
+    file = models.FileField(upload_to='vet_uploads/%Y/%m/', storage=vet_upload_storage)
     original_filename = models.CharField(max_length=255)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    # Filled in by background post-processing (see uploads.process_upload)
+    size = models.BigIntegerField(null=True, blank=True)
+    sha256 = models.CharField(max_length=64, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    thumbnail = models.FileField(upload_to='vet_uploads/thumbs/%Y/%m/', blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
     def __str__(self):
         return f"{self.get_category_display()} - {self.original_filename} ({self.pet.name})"
 
@@ -632,12 +774,44 @@ class VetUpload(models.Model):
         ext = os.path.splitext(self.original_filename)[1].lower()
         return ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.tiff']
 
-    def delete(self, *args, **kwargs):
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        stored = adding and self.file and not self.file._committed
+        with transaction.atomic():
+            if stored:
+                # Store the blob before the row so its hash can be saved with it;
+                # storing takes this upload's reference to the blob
+                self.file.save(self.file.name, self.file.file, save=False)
+            if adding and not self.sha256:
+                self.sha256 = blob_sha256(self.file.name)
+            super().save(*args, **kwargs)
+            if adding and not stored and blob_sha256(self.file.name):
+                UploadBlob.acquire(self.file.name, self.size)
+
+    def release_files(self):
+        """
+        Called after the row is deleted (also on cascades, see signals.py):
+        drop this upload's reference to its blob and remove whatever files
+        nothing else uses any more, once the transaction commits.
+        """
+        blobs, names = [], []
         if self.file:
-            storage = self.file.storage
-            if storage.exists(self.file.name):
-                storage.delete(self.file.name)
-        super().delete(*args, **kwargs)
+            name = self.file.name
+            if not blob_sha256(name):
+                names.append((self.file.storage, name))
+            elif UploadBlob.release(name):
+                blobs.append(name)
+        if self.thumbnail:
+            names.append((self.thumbnail.storage, self.thumbnail.name))
+
+        def remove():
+            for name in blobs:
+                # Re-checked: the blob may have been taken again since
+                UploadBlob.remove_if_unused(name, self.file.storage)
+            for storage, name in names:
+                if storage.exists(name):
+                    storage.delete(name)
+        transaction.on_commit(remove)
 
     class Meta:
         verbose_name = "Vet Upload"
@@ -645,6 +819,55 @@ class VetUpload(models.Model):
         ordering = ['category', '-uploaded_at']
 
 
+class UploadSession(models.Model):
+    """A resumable, chunked vet upload in progress (see uploads.py)"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    pet = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='upload_sessions')
+    category = models.CharField(max_length=30, choices=VetUpload.CATEGORY_CHOICES)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    # Lease held by the request writing the next chunk (see uploads._claim)
+    writer = models.UUIDField(null=True, blank=True, editable=False)
+    upload = models.OneToOneField(VetUpload, on_delete=models.SET_NULL, null=True, blank=True, related_name='session')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def complete(self):
+        return self.received >= self.size
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size} bytes)"
+
+
+class DraftCase(models.Model):
+    """An intake form being filled in, saved step by step until submitted (see drafts.py)"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    case = models.OneToOneField(PetParent, on_delete=models.SET_NULL, null=True, blank=True, related_name='draft')
+    submitted_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Draft {self.id} ({'submitted' if self.submitted_at else 'open'})"
+
+
+class DraftSection(models.Model):
+    """One form step's answers in a draft, as the form would post them: {field: [values]}"""
+    draft = models.ForeignKey(DraftCase, on_delete=models.CASCADE, related_name='sections')
+    name = models.CharField(max_length=30)
+    answers = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['draft', 'name'], name='draft_section_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} - draft {self.draft_id}"
+
+
 # ═══════════════════════════════════════════════════════
 # CONSENT & PREFERENCES
 # ═══════════════════════════════════════════════════════
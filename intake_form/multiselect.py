@@ -0,0 +1,142 @@
+"""
+Normalized multi-select answers.
+
+Checkbox questions are stored comma-joined on their section (what the pages
+display); MultiSelectChoice keeps one indexed row per ticked option so cohort
+queries ("all cats fed raw with soft stool") are index lookups instead of
+LIKE scans and Python-side splitting:
+
+    Pet.objects.filter(species='cat').filter(
+        has_choice('food_preferences__current_food_preferences', 'raw'),
+        has_choice('medical_history__stool_types', 'soft'),
+    )
+
+Field keys are the ORM path from Pet to the text column.
+
+The rows follow a section's save() and delete() (signals.py). A queryset
+.update() of a section's columns sends no signal and leaves them stale: run
+`manage.py rebuild_multiselect_choices` after one.
+"""
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+from .models import (
+    Pet, MultiSelectChoice, FeedingBehavior, FoodPreferences, TreatPreferenceInPlan,
+    AdviceSource, DietPlanPreferences, FitnessActivity, RehabilitationTherapy, MedicalHistory
+)
+
+MULTISELECT_FIELDS = {
+    FeedingBehavior: [
+        'eating_behaviors', 'unmonitored_sources', 'bowl_type', 'bowl_material',
+        'water_bowl_type', 'water_bowl_material',
+    ],
+    FoodPreferences: ['current_food_preferences', 'current_treat_preferences', 'important_food_factors'],
+    TreatPreferenceInPlan: ['preferences'],
+    AdviceSource: ['sources'],
+    DietPlanPreferences: ['preferences'],
+    FitnessActivity: ['exercise_types'],
+    RehabilitationTherapy: ['therapy_types'],
+    MedicalHistory: ['stool_types', 'medication_admin_method'],
+}
+
+VALUE_MAX_LENGTH = MultiSelectChoice._meta.get_field('value').max_length
+
+
+def field_key(model, field):
+    return f"{model._meta.get_field('pet').related_query_name()}__{field}"
+
+
+FIELD_KEYS = {field_key(model, field) for model, fields in MULTISELECT_FIELDS.items() for field in fields}
+
+
+def split_choices(text):
+    """'a,b|pill_pocket:...' -> ['a', 'b'] (details after '|' are free text, not options)"""
+    options = (text or '').split('|', 1)[0]
+    seen = []
+    for value in options.split(','):
+        value = value.strip()[:VALUE_MAX_LENGTH]
+        if value and value not in seen:
+            seen.append(value)
+    return seen
+
+
+def choice_rows(instance):
+    """Unsaved MultiSelectChoice rows for one section instance"""
+    model = type(instance)
+    return [
+        MultiSelectChoice(pet_id=instance.pet_id, field=field_key(model, field), value=value)
+        for field in MULTISELECT_FIELDS.get(model, [])
+        for value in split_choices(getattr(instance, field))
+    ]
+
+
+def clear_choices(instance):
+    """Delete the stored choices for one section instance (e.g. after it is deleted)"""
+    model = type(instance)
+    keys = [field_key(model, field) for field in MULTISELECT_FIELDS[model]]
+    MultiSelectChoice.objects.filter(pet_id=instance.pet_id, field__in=keys).delete()
+
+
+def sync_choices(instance):
+    """Replace the stored choices for one section instance (after it is saved)"""
+    clear_choices(instance)
+    MultiSelectChoice.objects.bulk_create(choice_rows(instance))
+
+
+def rebuild_choices(pets=None, batch_size=1000):
+    """Recreate every MultiSelectChoice row from the sections (optionally for a queryset of pets); returns how many"""
+    choices = MultiSelectChoice.objects.all()
+    if pets is not None:
+        choices = choices.filter(pet__in=pets)
+    created = 0
+    with transaction.atomic():
+        choices.delete()
+        for model in MULTISELECT_FIELDS:
+            sections = model.objects.all() if pets is None else model.objects.filter(pet__in=pets)
+            rows = [choice for section in sections.iterator() for choice in choice_rows(section)]
+            created += len(MultiSelectChoice.objects.bulk_create(rows, batch_size=batch_size))
+    return created
+
+
+# ═══════════════════════════════════════════════════════
+# QUERY HELPERS
+# ═══════════════════════════════════════════════════════
+
+def _check_key(field):
+    if field not in FIELD_KEYS:
+        raise ValueError(f'{field!r} is not a multi-select field; expected one of {sorted(FIELD_KEYS)}')
+
+
+def has_choice(field, *values):
+    """Q for pets that ticked any of `values` for `field`"""
+    _check_key(field)
+    return Q(Exists(MultiSelectChoice.objects.filter(pet=OuterRef('pk'), field=field, value__in=values)))
+
+
+def has_all_choices(field, *values):
+    """Q for pets that ticked every one of `values` for `field`"""
+    q = Q()
+    for value in values:
+        q &= has_choice(field, value)
+    return q
+
+
+def cohort(pets=None, **selections):
+    """
+    Pets matching every selection, e.g.
+    cohort(food_preferences__current_food_preferences='raw', medical_history__stool_types=['soft', 'loose'])
+    (a list means any of those options).
+    """
+    pets = Pet.objects.all() if pets is None else pets
+    for field, values in selections.items():
+        values = [values] if isinstance(values, str) else values
+        pets = pets.filter(has_choice(field, *values))
+    return pets
+
+
+def choice_counts(field, pets=None):
+    """{value: number of pets} for one multi-select field, optionally within a queryset of pets"""
+    _check_key(field)
+    choices = MultiSelectChoice.objects.filter(field=field)
+    if pets is not None:
+        choices = choices.filter(pet__in=pets)
+    return dict(choices.values_list('value').annotate(n=Count('pet_id')).order_by('-n', 'value'))
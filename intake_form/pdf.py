@@ -0,0 +1,199 @@
+"""
+Minimal PDF writer: text, headings, label/value rows and simple tables on A4
+pages, using the two built-in Helvetica fonts so no font files or third-party
+libraries are needed.
+"""
+import zlib
+
+PAGE_WIDTH, PAGE_HEIGHT = 595.28, 841.89
+MARGIN = 48
+LABEL_WIDTH = 130
+
+FONT_REGULAR, FONT_BOLD = 'F1', 'F2'
+BRAND_GREEN = (0.29, 0.48, 0.31)
+GREY = (0.4, 0.4, 0.4)
+BLACK = (0, 0, 0)
+
+# Helvetica advance widths (1/1000 em) for ASCII 32..126
+_HELVETICA_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+
+
+def text_width(text, size, bold=False):
+    units = sum(_HELVETICA_WIDTHS[ord(ch) - 32] if 32 <= ord(ch) < 127 else 556 for ch in text)
+    # Helvetica-Bold runs ~6% wider on average; close enough for wrapping
+    return units * size / 1000 * (1.06 if bold else 1)
+
+
+def wrap(text, width, size, bold=False):
+    """Split text into lines no wider than `width` points"""
+    lines = []
+    for paragraph in str(text).splitlines() or ['']:
+        line = ''
+        for word in paragraph.split(' '):
+            candidate = f'{line} {word}' if line else word
+            if text_width(candidate, size, bold) <= width:
+                line = candidate
+                continue
+            if line:
+                lines.append(line)
+            # Break words that are wider than the column on their own
+            while text_width(word, size, bold) > width and len(word) > 1:
+                cut = len(word) - 1
+                while cut > 1 and text_width(word[:cut], size, bold) > width:
+                    cut -= 1
+                lines.append(word[:cut])
+                word = word[cut:]
+            line = word
+        lines.append(line)
+    return lines
+
+
+def _pdf_string(text):
+    raw = str(text).encode('cp1252', 'replace')
+    return b'(' + raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+class PdfDocument:
+    """Flowing layout: each call appends below the previous one, adding pages as needed"""
+
+    def __init__(self, title='', footer=''):
+        self.title = title
+        self.footer = footer
+        self.pages = []
+        self._new_page()
+
+    # ── Low-level drawing ──
+
+    def _new_page(self):
+        self.ops = []
+        self.pages.append(self.ops)
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def _ensure_space(self, height):
+        if self.y - height < MARGIN + 20:
+            self._new_page()
+
+    def _text(self, x, y, text, size=10, bold=False, color=BLACK):
+        font = FONT_BOLD if bold else FONT_REGULAR
+        self.ops.append(
+            b'BT %.3f %.3f %.3f rg /%s %.1f Tf %.2f %.2f Td %s Tj ET'
+            % (*color, font.encode(), size, x, y, _pdf_string(text))
+        )
+
+    def _line(self, x1, y1, x2, y2, width=0.5, color=BLACK):
+        self.ops.append(b'%.3f %.3f %.3f RG %.2f w %.2f %.2f m %.2f %.2f l S' % (*color, width, x1, y1, x2, y2))
+
+    def _fill_rect(self, x, y, w, h, grey):
+        self.ops.append(b'%.3f g %.2f %.2f %.2f %.2f re f' % (grey, x, y, w, h))
+
+    # ── Layout ──
+
+    def title_block(self, title, subtitle=''):
+        size = 16
+        self._text((PAGE_WIDTH - text_width(title, size, True)) / 2, self.y - size, title, size, bold=True)
+        self.y -= size + 6
+        if subtitle:
+            self._text((PAGE_WIDTH - text_width(subtitle, 10)) / 2, self.y - 10, subtitle, 10, color=GREY)
+            self.y -= 16
+        self.y -= 8
+
+    def heading(self, text):
+        self._ensure_space(40)
+        self.y -= 18
+        self._text(MARGIN, self.y, text, 12, bold=True, color=BRAND_GREEN)
+        self.y -= 5
+        self._line(MARGIN, self.y, PAGE_WIDTH - MARGIN, self.y, 1.5, BRAND_GREEN)
+        self.y -= 6
+
+    def field(self, label, value, size=10):
+        value_x = MARGIN + LABEL_WIDTH
+        lines = wrap(value if value not in (None, '') else '-', PAGE_WIDTH - MARGIN - value_x, size)
+        leading = size * 1.35
+        self._ensure_space(leading * len(lines) + 4)
+        self._text(MARGIN, self.y - size, label, size - 1, color=GREY)
+        for line in lines:
+            self._text(value_x, self.y - size, line, size)
+            self.y -= leading
+        self.y -= 2
+        self._line(MARGIN, self.y, PAGE_WIDTH - MARGIN, self.y, 0.3, (0.85, 0.85, 0.85))
+        self.y -= 2
+
+    def note(self, text, size=9):
+        for line in wrap(text, PAGE_WIDTH - 2 * MARGIN, size):
+            self._ensure_space(size * 1.4)
+            self._text(MARGIN, self.y - size, line, size, color=GREY)
+            self.y -= size * 1.4
+
+    def table(self, headers, rows, size=9):
+        col_width = (PAGE_WIDTH - 2 * MARGIN) / len(headers)
+        leading = size * 1.3
+
+        def draw_row(cells, bold=False, shade=None):
+            wrapped = [wrap(cell if cell not in (None, '') else '-', col_width - 8, size, bold) for cell in cells]
+            height = leading * max(len(lines) for lines in wrapped) + 6
+            if self.y - height < MARGIN + 20:
+                self._new_page()
+                if not bold:
+                    draw_row(headers, bold=True, shade=0.94)
+            if shade is not None:
+                self._fill_rect(MARGIN, self.y - height, PAGE_WIDTH - 2 * MARGIN, height, shade)
+            for i, lines in enumerate(wrapped):
+                for n, line in enumerate(lines):
+                    self._text(MARGIN + i * col_width + 4, self.y - 3 - size - n * leading, line, size, bold=bold)
+            self.y -= height
+            self._line(MARGIN, self.y, PAGE_WIDTH - MARGIN, self.y, 0.3, (0.8, 0.8, 0.8))
+
+        self.y -= 4
+        draw_row(headers, bold=True, shade=0.94)
+        for row in rows:
+            draw_row([str(cell) for cell in row])
+        self.y -= 6
+
+    # ── Output ──
+
+    def render(self):
+        """The finished document as PDF bytes"""
+        objects = [
+            b'<< /Type /Catalog /Pages 2 0 R >>',
+            None,  # page tree, filled in once page object numbers are known
+            b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+            b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>',
+        ]
+        page_refs = []
+        total = len(self.pages)
+        for number, ops in enumerate(self.pages, start=1):
+            footer = f'{self.footer}  -  Page {number} of {total}' if self.footer else f'Page {number} of {total}'
+            ops = ops + [
+                b'BT 0.533 0.533 0.533 rg /F1 8.0 Tf %.2f %.2f Td %s Tj ET'
+                % ((PAGE_WIDTH - text_width(footer, 8)) / 2, MARGIN / 2, _pdf_string(footer))
+            ]
+            stream = zlib.compress(b'\n'.join(ops))
+            objects.append(b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (len(stream), stream))
+            objects.append(
+                b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] '
+                b'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>'
+                % (PAGE_WIDTH, PAGE_HEIGHT, len(objects))
+            )
+            page_refs.append(b'%d 0 R' % len(objects))
+        objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (b' '.join(page_refs), total)
+        objects.append(b'<< /Title %s /Producer (Poshtik NutriVet) >>' % _pdf_string(self.title))
+
+        out = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(out))
+            out += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+        xref = len(out)
+        out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+        out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+        out += b'trailer\n<< /Size %d /Root 1 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+            len(objects) + 1, len(objects), xref
+        )
+        return bytes(out)
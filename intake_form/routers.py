@@ -0,0 +1,76 @@
+"""
+Read-replica routing.
+
+With READ_REPLICA naming a DATABASES alias, GET requests to the reporting
+views in READ_REPLICA_VIEWS (the dashboard, case pages, PDFs, exports) read
+from the replica, so long reads stop holding up intake inserts on the
+primary. Everything else, and every write, stays on the primary.
+
+Read-your-writes: a successful POST/PATCH/DELETE sets a short-lived cookie
+that keeps that browser reading from the primary for
+READ_REPLICA_STICKY_SECONDS, long enough for the replica to catch up. For a
+SQLite replica kept fresh by `manage.py sync_replica --follow`, make that
+longer than the sync interval.
+
+Background threads (PDF renders, upload processing) always use the primary.
+
+A SQLite replica is a second database file, refreshed from the primary with
+SQLite's online backup API by sync_sqlite_replica(). A Postgres replica is
+kept by streaming replication instead; only the alias is needed here.
+"""
+import sqlite3
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+
+PINNED_COOKIE = 'nutrivet_primary'
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+@contextmanager
+def use_replica(enabled=True):
+    """Route reads in this block (this thread or task only) to the replica"""
+    token = _use_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if settings.READ_REPLICA and _use_replica.get():
+            return settings.READ_REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Not None: Django would then save an object read from the replica back to it
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary, schema included
+        return db != settings.READ_REPLICA
+
+
+def sync_sqlite_replica():
+    """
+    Copy the primary SQLite database over the READ_REPLICA file in one step
+    (under WAL the primary keeps taking writes meanwhile); returns the number
+    of pages copied. Replica readers wait out the copy on their busy timeout.
+    """
+    primary, replica = connections['default'].settings_dict, connections[settings.READ_REPLICA].settings_dict
+    if 'sqlite3' not in primary['ENGINE'] or 'sqlite3' not in replica['ENGINE']:
+        raise ValueError('sync_sqlite_replica copies a SQLite primary to a SQLite replica')
+    source = sqlite3.connect(primary['NAME'])
+    target = sqlite3.connect(replica['NAME'], timeout=60)
+    try:
+        source.backup(target)
+        return source.execute('PRAGMA page_count').fetchone()[0]
+    finally:
+        target.close()
+        source.close()
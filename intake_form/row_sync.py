@@ -0,0 +1,78 @@
+"""
+Diff-based saving for the dynamic tables on the vet form: compare the posted
+rows with what is stored and write only the difference, so unchanged rows keep
+their primary keys and an unchanged form costs no writes at all.
+"""
+from collections import defaultdict, namedtuple
+
+
+class RowSync(namedtuple('RowSync', 'created updated deleted')):
+
+    @property
+    def changed(self):
+        return bool(self.created or self.updated or self.deleted)
+
+
+def posted_rows(post, id_key, fields):
+    """
+    Rows from parallel `name[]` lists. `fields` maps model field -> POST key;
+    the first one is required (blank rows are skipped, as before). Each row
+    gets an 'id' from `id_key` when the page rendered it from an existing row.
+    """
+    columns = {field: post.getlist(key) for field, key in fields.items()}
+    ids = post.getlist(id_key)
+    required = next(iter(fields))
+    rows = []
+    for i, value in enumerate(columns[required]):
+        if not value.strip():
+            continue
+        row = {field: values[i] if i < len(values) else '' for field, values in columns.items()}
+        row_id = ids[i] if i < len(ids) else ''
+        row['id'] = int(row_id) if row_id.isdigit() else None
+        rows.append(row)
+    return rows
+
+
+def sync_rows(queryset, rows, fields, **parent):
+    """
+    Make `queryset` hold exactly `rows`, with one bulk_create, one bulk_update
+    and one delete at most. Rows whose id is one of the existing rows update it
+    in place; rows without one reuse an unclaimed existing row with identical
+    values (forms rendered before ids were posted), otherwise they are created.
+    Existing rows nobody claimed are deleted. Call inside a transaction.
+    """
+    existing = {obj.pk: obj for obj in queryset}
+    claimed, to_update, pending = set(), [], []
+
+    for row in rows:
+        obj = existing.get(row['id'])
+        if obj is None or obj.pk in claimed:
+            pending.append(row)
+            continue
+        claimed.add(obj.pk)
+        changed = [field for field in fields if getattr(obj, field) != row[field]]
+        for field in changed:
+            setattr(obj, field, row[field])
+        if changed:
+            to_update.append(obj)
+
+    by_values = defaultdict(list)
+    for pk, obj in existing.items():
+        if pk not in claimed:
+            by_values[tuple(getattr(obj, field) for field in fields)].append(pk)
+    to_create = []
+    for row in pending:
+        matches = by_values.get(tuple(row[field] for field in fields))
+        if matches:
+            claimed.add(matches.pop(0))
+        else:
+            to_create.append(queryset.model(**parent, **{field: row[field] for field in fields}))
+
+    stale = [pk for pk in existing if pk not in claimed]
+    if stale:
+        queryset.model.objects.filter(pk__in=stale).delete()
+    if to_update:
+        queryset.model.objects.bulk_update(to_update, list(fields))
+    if to_create:
+        queryset.model.objects.bulk_create(to_create)
+    return RowSync(len(to_create), len(to_update), len(stale))
@@ -0,0 +1,182 @@
+import random
+from django.http import QueryDict
+
+# Checkbox/radio values as they appear in form.html
+FEEDING_BEHAVIORS = ['eats_immediately', 'nibbles', 'returns_later', 'hand_fed', 'begs', 'table_scraps']
+BOWL_TYPES = ['standard', 'slow_feeder', 'elevated', 'tilted', 'anti_spill', 'puzzle']
+BOWL_MATERIALS = ['stainless_steel', 'ceramic', 'plastic', 'silicone']
+FOOD_PREFERENCES = ['canned', 'gravy', 'dry', 'homecooked', 'raw', 'commercial']
+TREAT_PREFERENCES = ['commercial_processed', 'dehydrated', 'raw_scraps', 'homemade', 'fresh_bones']
+FOOD_FACTORS = ['price', 'convenience', 'quality', 'skin_coat', 'dental', 'stool', 'palatability', 'allergies']
+TREAT_PLAN_PREFERENCES = ['commercial_store', 'dehydrated', 'raw_bone', 'homemade_cooked']
+ADVICE_SOURCES = ['veterinarian', 'breeder', 'pet_store', 'friend_family', 'book_magazine', 'internet']
+DIET_PLAN_PREFERENCES = ['dry_kibble_only', 'wet_canned_only', 'combo_dry_wet', 'only_homecooked', 'unsure']
+EXERCISE_TYPES = ['run', 'walk', 'fetch', 'pulling', 'agility', 'swimming']
+STOOL_TYPES = ['hard', 'soft', 'loose', 'blood', 'mucus']
+DIET_TYPES = ['dry_kibble', 'wet_canned', 'raw', 'dehydrated', 'fresh_frozen']
+
+PET_NAMES = ['Bruno', 'Luna', 'Coco', 'Simba', 'Max', 'Bella', 'Tiger', 'Milo', 'Daisy', 'Rocky']
+BREEDS = ['Labrador', 'Indie', 'Beagle', 'Shih Tzu', 'German Shepherd', 'Persian', 'Siamese', 'Golden Retriever']
+BRANDS = ['Royal Canin', 'Pedigree', 'Farmina', 'Drools', 'Hills', 'Orijen', 'Acana', 'Whiskas']
+INGREDIENTS = ['Chicken', 'Rice', 'Egg', 'Pumpkin', 'Fish', 'Paneer', 'Carrot', 'Oats']
+
+
+def _pick(rng, values, k_max=3):
+    return rng.sample(values, rng.randint(0, min(k_max, len(values))))
+
+
+def sample_intake_post(index=0, rng=None, rows=None, max_rows=3):
+    """
+    A realistic intake form submission as a mutable QueryDict.
+
+    `index` keeps the email unique; `rows` fixes the number of rows in each
+    dynamic table (random 0-`max_rows` if omitted).
+    """
+    rng = rng or random.Random(index)
+    n = (lambda: rows) if rows is not None else (lambda: rng.randint(0, max_rows))
+    post = QueryDict(mutable=True)
+
+    def put(key, value):
+        post[key] = str(value)
+
+    def put_list(key, values):
+        post.setlist(key, [str(v) for v in values])
+
+    # ── Owner & Pet ──
+    put('parent_name', f'Owner {index}')
+    put('parent_email', f'owner{index}@example.com')
+    put('parent_phone', f'98{index:08d}'[-10:])
+    put('parent_location', 'Bengaluru')
+    put('pet_name', rng.choice(PET_NAMES))
+    put('pet_age', f'{rng.randint(1, 14)} years')
+    put('pet_species', rng.choice(['dog', 'dog', 'dog', 'cat', 'other']))
+    put('pet_breed', rng.choice(BREEDS))
+    put('pet_colour', rng.choice(['Black', 'Brown', 'White', 'Golden']))
+    put('pet_sex', rng.choice(['male', 'female']))
+    put('pet_neutered', rng.choice(['yes', 'no']))
+    put('pet_weight', f'{rng.uniform(2, 45):.2f}')
+    put('pet_body_condition', rng.choice(['ideal', 'underweight', 'overweight']))
+    put('pet_consultation_goals', 'Weight management and a balanced home-cooked plan')
+
+    # ── Household ──
+    put('household_avoid_ingredients', rng.choice(['', 'Beef', 'Pork, onion']))
+    put('household_arrange_food', rng.choice(['yes', 'no', 'will_try']))
+    put('household_who_feeds', rng.choice(['one_person', 'varies']))
+    put('household_feeder_name', 'Asha')
+    put('household_other_pets', rng.choice(['yes', 'no']))
+    put('household_pet_housed', rng.choice(['indoors', 'outdoors', 'both']))
+
+    # ── Feeding ──
+    put('feeding_food_availability', rng.choice(['always', 'certain_times']))
+    put('feeding_meals_per_day', rng.randint(1, 4))
+    put_list('feeding_behaviors', _pick(rng, FEEDING_BEHAVIORS))
+    put('feeding_unmonitored', rng.choice(['yes', 'no']))
+    put_list('unmonitored_sources', _pick(rng, ['treats_neighbors', 'steals_bowls', 'garbage', 'prey'], 2))
+    put_list('bowl_types', _pick(rng, BOWL_TYPES, 2))
+    put_list('bowl_material', _pick(rng, BOWL_MATERIALS, 2))
+    put_list('water_bowl_types', _pick(rng, ['standard', 'non_spill', 'fountain'], 2))
+    put_list('water_bowl_material', _pick(rng, BOWL_MATERIALS, 2))
+    put('feeding_good_appetite', rng.choice(['yes', 'sometimes', 'no']))
+    put('feeding_appetite_recently', rng.choice(['increased', 'same', 'decreased']))
+
+    # ── Preferences ──
+    put_list('food_preferences', _pick(rng, FOOD_PREFERENCES))
+    put_list('treat_preferences', _pick(rng, TREAT_PREFERENCES))
+    put_list('food_factors', _pick(rng, FOOD_FACTORS))
+    put_list('treat_plan_preferences', _pick(rng, TREAT_PLAN_PREFERENCES))
+    put_list('advice_sources', _pick(rng, ADVICE_SOURCES))
+    brands = [rng.choice(BRANDS) for _ in range(n())]
+    put_list('avoid_brand_name[]', brands)
+    put_list('avoid_brand_reason[]', ['Loose stool'] * len(brands))
+    for st in ['dry', 'wet', 'raw', 'homecooked', 'dehydrated']:
+        if rng.random() < 0.5:
+            put(f'storage_{st}_location', 'Airtight container')
+            put(f'storage_{st}_period', '1 month')
+
+    # ── Diet History ──
+    k = n()
+    put_list('diet_type[]', [rng.choice(DIET_TYPES) for _ in range(k)])
+    put_list('diet_brand[]', [rng.choice(BRANDS) for _ in range(k)])
+    put_list('diet_product[]', ['Adult Maintenance'] * k)
+    put_list('diet_amount[]', [rng.randint(50, 400) for _ in range(k)])
+    put_list('diet_meals[]', [rng.randint(1, 3) for _ in range(k)])
+    put_list('diet_since[]', ['2023'] * k)
+    k = n()
+    put_list('hd_ingredient[]', [rng.choice(INGREDIENTS) for _ in range(k)])
+    put_list('hd_quantity[]', [rng.randint(20, 200) for _ in range(k)])
+    put_list('hd_preparation[]', ['Boiled'] * k)
+    put_list('hd_frequency[]', [rng.randint(1, 3) for _ in range(k)])
+    put_list('hd_since[]', ['2024'] * k)
+    k = n()
+    put_list('ct_type[]', ['Biscuit'] * k)
+    put_list('ct_brand[]', [rng.choice(BRANDS) for _ in range(k)])
+    put_list('ct_product[]', ['Dental stick'] * k)
+    put_list('ct_quantity[]', ['2'] * k)
+    put_list('ct_since[]', ['2024'] * k)
+    k = n()
+    put_list('treat_type_form[]', ['Cooked'] * k)
+    put_list('treat_ingredient[]', [rng.choice(INGREDIENTS) for _ in range(k)])
+    put_list('treat_preparation[]', ['Boiled'] * k)
+    put_list('treat_quantity[]', ['1 piece'] * k)
+    put_list('treat_since[]', ['2024'] * k)
+    k = n()
+    put('supplements_given', 'yes' if k else 'no')
+    put_list('supplement_brand[]', ['Omega-3'] * k)
+    put_list('supplement_form[]', ['Liquid'] * k)
+    put_list('supplement_amount[]', ['5ml'] * k)
+    put_list('supplement_per_day[]', [1] * k)
+    put_list('supplement_since[]', ['2024'] * k)
+    k = n()
+    put('diet_changed_2_3_months', 'yes' if k else 'no')
+    put_list('rdc_brand[]', [rng.choice(BRANDS) for _ in range(k)])
+    put_list('rdc_product[]', ['Puppy formula'] * k)
+    put_list('rdc_form[]', ['Dry'] * k)
+    put_list('rdc_amount[]', ['200g'] * k)
+    put_list('rdc_meals[]', [2] * k)
+    put_list('rdc_start[]', ['Jan 2025'] * k)
+    put_list('rdc_stop[]', ['Mar 2025'] * k)
+    put_list('rdc_reason[]', ['Outgrew'] * k)
+    put_list('diet_plan_preferences', _pick(rng, DIET_PLAN_PREFERENCES, 2))
+
+    # ── Fitness ──
+    put('activity_level', rng.choice(['very_active', 'high', 'moderate', 'average', 'hardly_moves']))
+    put('exercise_duration', '45 mins')
+    put('fenced_yard', rng.choice(['yes', 'no']))
+    put('urban_rural', rng.choice(['urban', 'rural', 'both']))
+    put('travel_buddy', rng.choice(['yes', 'no', 'sometimes']))
+    put_list('exercise_types', _pick(rng, EXERCISE_TYPES))
+    for act in rng.sample(EXERCISE_TYPES, min(n(), len(EXERCISE_TYPES))):
+        put(f'activity_{act}_duration', '30')
+        put(f'activity_{act}_frequency', '5')
+    put('receives_rehab', 'no')
+
+    # ── Medical ──
+    put('medical_weight_change', rng.choice(['yes', 'no']))
+    put('medical_weight_type', rng.choice(['gain', 'loss']))
+    put('medical_weight_amount', f'{rng.uniform(0.5, 5):.1f}')
+    put('medical_weight_period', '3 months')
+    put_list('medical_symptoms', _pick(rng, ['difficulty_chewing', 'difficulty_swallowing', 'excessive_salivation'], 1))
+    put('medical_stool_changed', rng.choice(['yes', 'no']))
+    put('medical_poops_per_day', rng.randint(1, 4))
+    put_list('medical_stool_types', _pick(rng, STOOL_TYPES, 2))
+    put_list('medication_admin', _pick(rng, ['directly_mouth', 'in_food', 'pill_pocket', 'in_treats'], 1))
+    k = n()
+    put('has_adverse_reactions', 'yes' if k else 'no')
+    put_list('ar_brand[]', [rng.choice(BRANDS) for _ in range(k)])
+    put_list('ar_product[]', [rng.choice(INGREDIENTS) for _ in range(k)])
+    put_list('ar_form[]', ['Food'] * k)
+    put_list('ar_since[]', ['2023'] * k)
+    put_list('ar_symptoms[]', ['Itching'] * k)
+    put('has_chronic_condition', rng.choice(['yes', 'no']))
+    put('vacc_yearly', 'yes')
+    put('vacc_deworming', 'yes')
+    put('vacc_topical_tick', rng.choice(['monthly', '3monthly', 'no']))
+    put('vacc_oral_tick', rng.choice(['monthly', '6monthly', 'no']))
+
+    # ── Primary Vet & Consent ──
+    put('vet_name', 'Dr. Rao')
+    put('vet_practice', 'City Vet Clinic, Indiranagar')
+    put('vet_phone', '0801234567')
+    put('vet_email', 'clinic@example.com')
+    put('consent_agreed', 'yes')
+    return post
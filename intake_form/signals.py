@@ -0,0 +1,78 @@
+from django.db.models.signals import post_save, post_delete
+from .loaders import pet_child_models
+from .models import PetParent, Pet, CaseVersion, ClinicalHistory, ClinicalCondition, ConsentForm, VetUpload
+from .multiselect import MULTISELECT_FIELDS, clear_choices, sync_choices
+
+
+def _deleting_whole_case(origin):
+    """True while a pet/owner delete cascades (CaseVersion goes with it)"""
+    model = getattr(origin, 'model', type(origin))
+    return model in (Pet, PetParent)
+
+
+def pet_saved(sender, instance, created, raw=False, **kwargs):
+    if created:
+        if not raw:
+            CaseVersion.objects.create(pet=instance)
+    else:
+        CaseVersion.bump(pet_id=instance.pk)
+
+
+def case_row_changed(sender, instance, origin=None, **kwargs):
+    if _deleting_whole_case(origin):
+        return
+    CaseVersion.bump(pet_id=instance.pet_id)
+
+
+def clinical_condition_changed(sender, instance, origin=None, **kwargs):
+    if _deleting_whole_case(origin):
+        return
+    pet_id = ClinicalHistory.objects.filter(pk=instance.clinical_history_id).values_list('pet_id', flat=True).first()
+    if pet_id:
+        CaseVersion.bump(pet_id=pet_id)
+
+
+def owner_changed(sender, instance, origin=None, created=False, **kwargs):
+    # A brand-new owner has no pets yet
+    if (created and sender is PetParent) or _deleting_whole_case(origin):
+        return
+    owner_id = instance.pet_parent_id if sender is ConsentForm else instance.pk
+    CaseVersion.bump(pet__owner_id=owner_id)
+
+
+def vet_upload_deleted(sender, instance, **kwargs):
+    instance.release_files()
+
+
+def multiselect_section_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        sync_choices(instance)
+
+
+def multiselect_section_deleted(sender, instance, origin=None, **kwargs):
+    # A deleted case takes its choices with it (CASCADE)
+    if not _deleting_whole_case(origin):
+        clear_choices(instance)
+
+
+def connect():
+    """
+    Keep CaseVersion current for every model shown on the case pages, the
+    multi-select choices in step with their sections, and blob refcounts
+    with vet uploads
+    """
+    post_save.connect(pet_saved, sender=Pet, dispatch_uid='case_version_pet')
+    for model in pet_child_models():
+        for signal in (post_save, post_delete):
+            signal.connect(case_row_changed, sender=model, dispatch_uid=f'case_version_{model.__name__}')
+    for signal in (post_save, post_delete):
+        signal.connect(clinical_condition_changed, sender=ClinicalCondition, dispatch_uid='case_version_condition')
+    for model in MULTISELECT_FIELDS:
+        post_save.connect(multiselect_section_saved, sender=model, dispatch_uid=f'multiselect_{model.__name__}')
+        post_delete.connect(multiselect_section_deleted, sender=model,
+                            dispatch_uid=f'multiselect_delete_{model.__name__}')
+    # Blob refcounts, for direct deletes and cascades alike
+    post_delete.connect(vet_upload_deleted, sender=VetUpload, dispatch_uid='vet_upload_release_files')
+    for model in (PetParent, ConsentForm):
+        for signal in (post_save, post_delete):
+            signal.connect(owner_changed, sender=model, dispatch_uid=f'case_version_{model.__name__}')
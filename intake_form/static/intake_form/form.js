@@ -0,0 +1,742 @@
+let dietCounter = 1;
+function addDietRow() {
+    dietCounter++;
+    const container = document.getElementById('diet-table-container');
+    const newEntry = document.createElement('div');
+    newEntry.className = 'diet-entry';
+    newEntry.style.cssText = 'background:#F5F8F5; border:1.5px solid #D9D4CC; border-radius:10px; padding:20px; margin-bottom:16px;';
+    newEntry.innerHTML = `
+        <div style="display:flex; justify-content:space-between; align-items:center; margin-bottom:16px;">
+            <strong style="color:#4A7A4F;">Food Item #${dietCounter}</strong>
+            <button type="button" onclick="this.closest('.diet-entry').remove()" style="background:#C0392B; color:white; border:none; padding:6px 12px; border-radius:6px; cursor:pointer; font-size:0.85rem;">Remove</button>
+        </div>
+
+        <div style="display:grid; grid-template-columns:1fr 1fr; gap:16px;">
+            <div class="form-group" style="margin-bottom:12px;">
+                <label style="font-size:0.85rem;">Diet Type</label>
+                <select name="diet_type[]" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;">
+                    <option value="">Select...</option>
+                    <option value="dry_kibble">Dry Kibble</option>
+                    <option value="wet_canned">Wet/Canned</option>
+                    <option value="raw">Raw</option>
+                    <option value="dehydrated">Dehydrated</option>
+                    <option value="fresh_frozen">Fresh/Freeze-dried</option>
+                </select>
+            </div>
+
+            <div class="form-group" style="margin-bottom:12px;">
+                <label style="font-size:0.85rem;">Brand</label>
+                <input type="text" name="diet_brand[]" placeholder="e.g., Royal Canin" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;">
+            </div>
+
+            <div class="form-group" style="margin-bottom:12px;">
+                <label style="font-size:0.85rem;">Product Details</label>
+                <input type="text" name="diet_product[]" placeholder="e.g., Adult Medium Breed" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;">
+            </div>
+
+            <div class="form-group" style="margin-bottom:12px;">
+                <label style="font-size:0.85rem;">Amount per day (gm)</label>
+                <input type="text" name="diet_amount[]" placeholder="e.g., 150gm" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;">
+            </div>
+
+            <div class="form-group" style="margin-bottom:12px;">
+                <label style="font-size:0.85rem;">Meals per day</label>
+                <input type="number" name="diet_meals[]" placeholder="e.g., 2" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;">
+            </div>
+
+            <div class="form-group" style="margin-bottom:12px;">
+                <label style="font-size:0.85rem;">Food Topper Details (if any)</label>
+                <input type="text" name="diet_topper[]" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;">
+            </div>
+            <div class="form-group" style="margin-bottom:12px;">
+                <label style="font-size:0.85rem;">Topper Amount per meal (gm)</label>
+                <input type="text" name="diet_topper_amount[]" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;">
+            </div>
+            <div class="form-group" style="margin-bottom:12px;">
+                <label style="font-size:0.85rem;">Fed since</label>
+                <input type="text" name="diet_since[]" placeholder="e.g., 6 months" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;">
+            </div>
+            <div class="form-group" style="margin-bottom:12px;">
+                <label style="font-size:0.85rem;">Reason (if stopped)</label>
+                <input type="text" name="diet_reason_stopped[]" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;">
+            </div>
+        </div>
+    `;
+    container.appendChild(newEntry);
+}
+let hdCounter = 1;
+function addHomemadeDietRow() {
+    hdCounter++;
+    const container = document.getElementById('hd-table-container');
+    const e = document.createElement('div');
+    e.className = 'hd-entry';
+    e.style.cssText = 'background:#F5F0FF; border:1.5px solid #C8B8E8; border-radius:10px; padding:20px; margin-bottom:16px;';
+    e.innerHTML = `<div style="display:flex; justify-content:space-between; align-items:center; margin-bottom:16px;"><strong style="color:#6B4FA0;">Homemade Item #${hdCounter}</strong><button type="button" onclick="this.closest('.hd-entry').remove()" style="background:#C0392B; color:white; border:none; padding:6px 12px; border-radius:6px; cursor:pointer; font-size:0.85rem;">Remove</button></div><div style="display:grid; grid-template-columns:1fr 1fr; gap:16px;"><div class="form-group" style="margin-bottom:12px;"><label style="font-size:0.85rem;">Ingredient/Food Item</label><input type="text" name="hd_ingredient[]" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div class="form-group" style="margin-bottom:12px;"><label style="font-size:0.85rem;">Raw Quantity per day (gm)</label><input type="text" name="hd_quantity[]" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div class="form-group" style="margin-bottom:12px;"><label style="font-size:0.85rem;">Preparation Method</label><input type="text" name="hd_preparation[]" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div class="form-group" style="margin-bottom:12px;"><label style="font-size:0.85rem;">Feed Frequency (per day)</label><input type="number" name="hd_frequency[]" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div class="form-group" style="margin-bottom:12px;"><label style="font-size:0.85rem;">Fed Since</label><input type="text" name="hd_since[]" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div class="form-group" style="margin-bottom:12px;"><label style="font-size:0.85rem;">Reason (if stopped)</label><input type="text" name="hd_reason_stopped[]" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;"></div></div>`;
+    container.appendChild(e);
+}
+
+let ctCounter = 1;
+function addCommercialTreatRow() {
+    ctCounter++;
+    const container = document.getElementById('ct-table-container');
+    const e = document.createElement('div');
+    e.className = 'ct-entry';
+    e.style.cssText = 'background:#FFF8E8; border:1.5px solid #E8D090; border-radius:10px; padding:20px; margin-bottom:16px;';
+    e.innerHTML = `<div style="display:flex; justify-content:space-between; align-items:center; margin-bottom:16px;"><strong style="color:#A08020;">Commercial Treat #${ctCounter}</strong><button type="button" onclick="this.closest('.ct-entry').remove()" style="background:#C0392B; color:white; border:none; padding:6px 12px; border-radius:6px; cursor:pointer; font-size:0.85rem;">Remove</button></div><div style="display:grid; grid-template-columns:1fr 1fr; gap:16px;"><div class="form-group" style="margin-bottom:12px;"><label style="font-size:0.85rem;">Treat Type</label><input type="text" name="ct_type[]" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div class="form-group" style="margin-bottom:12px;"><label style="font-size:0.85rem;">Brand</label><input type="text" name="ct_brand[]" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div class="form-group" style="margin-bottom:12px;"><label style="font-size:0.85rem;">Product Details</label><input type="text" name="ct_product[]" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div class="form-group" style="margin-bottom:12px;"><label style="font-size:0.85rem;">Quantity per day (gm)</label><input type="text" name="ct_quantity[]" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div class="form-group" style="margin-bottom:12px;"><label style="font-size:0.85rem;">Fed Since</label><input type="text" name="ct_since[]" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div class="form-group" style="margin-bottom:12px;"><label style="font-size:0.85rem;">Reason (if stopped)</label><input type="text" name="ct_reason_stopped[]" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;"></div></div>`;
+    container.appendChild(e);
+}
+
+let suppCounter = 1;
+function addSupplementRow() {
+    suppCounter++;
+    const container = document.getElementById('supplement-table-container');
+    const e = document.createElement('div');
+    e.className = 'supp-entry';
+    e.style.cssText = 'background:#F5F8F5; border:1.5px solid #B8D4B8; border-radius:10px; padding:16px; margin-bottom:12px;';
+    e.innerHTML = `<div style="display:flex; justify-content:space-between; align-items:center; margin-bottom:12px;"><strong style="color:#4A7A4F;">Supplement #${suppCounter}</strong><button type="button" onclick="this.closest('.supp-entry').remove()" style="background:#C0392B; color:white; border:none; padding:6px 12px; border-radius:6px; cursor:pointer; font-size:0.85rem;">Remove</button></div><div style="display:grid; grid-template-columns:1fr 1fr 1fr; gap:12px;"><div><label style="font-size:0.85rem;">Brand name</label><input type="text" name="supplement_brand[]" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div><label style="font-size:0.85rem;">Form</label><input type="text" name="supplement_form[]" placeholder="tablet/powder/liquid" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div><label style="font-size:0.85rem;">Amount</label><input type="text" name="supplement_amount[]" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div><label style="font-size:0.85rem;"># per day</label><input type="number" name="supplement_per_day[]" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div><label style="font-size:0.85rem;">Fed Since</label><input type="text" name="supplement_since[]" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;"></div></div>`;
+    container.appendChild(e);
+}
+
+let rdcCounter = 1;
+function addRdcRow() {
+    rdcCounter++;
+    const container = document.getElementById('rdc-table-container');
+    const e = document.createElement('div');
+    e.className = 'rdc-entry';
+    e.style.cssText = 'background:#F0F5FF; border:1.5px solid #B0C4E8; border-radius:10px; padding:16px; margin-bottom:12px;';
+    e.innerHTML = `<div style="display:flex; justify-content:space-between; align-items:center; margin-bottom:12px;"><strong style="color:#2060A0;">Change #${rdcCounter}</strong><button type="button" onclick="this.closest('.rdc-entry').remove()" style="background:#C0392B; color:white; border:none; padding:6px 12px; border-radius:6px; cursor:pointer; font-size:0.85rem;">Remove</button></div><div style="display:grid; grid-template-columns:1fr 1fr; gap:12px;"><div><label style="font-size:0.85rem;">Brand</label><input type="text" name="rdc_brand[]" style="width:100%; padding:8px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div><label style="font-size:0.85rem;">Product / Food Ingredient</label><input type="text" name="rdc_product[]" style="width:100%; padding:8px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div><label style="font-size:0.85rem;">Form / Type</label><input type="text" name="rdc_form[]" style="width:100%; padding:8px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div><label style="font-size:0.85rem;">Amount per day (gm)</label><input type="text" name="rdc_amount[]" style="width:100%; padding:8px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div><label style="font-size:0.85rem;"># of meals per day</label><input type="number" name="rdc_meals[]" style="width:100%; padding:8px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div><label style="font-size:0.85rem;">Start date</label><input type="text" name="rdc_start[]" style="width:100%; padding:8px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div><label style="font-size:0.85rem;">Stop date</label><input type="text" name="rdc_stop[]" style="width:100%; padding:8px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div><label style="font-size:0.85rem;">Reason stopped</label><input type="text" name="rdc_reason[]" style="width:100%; padding:8px; border:1.5px solid #D9D4CC; border-radius:8px;"></div></div>`;
+    container.appendChild(e);
+}
+
+function addBrandAvoidRow() {
+    const container = document.getElementById('brand-avoid-container');
+    const e = document.createElement('div');
+    e.className = 'brand-avoid-entry';
+    e.style.cssText = 'background:#FFF5F5; border:1.5px solid #E8C0B0; border-radius:10px; padding:16px; margin-bottom:12px;';
+    e.innerHTML = `<div style="display:grid; grid-template-columns:1fr 1fr auto; gap:12px; align-items:end;"><div><label style="font-size:0.85rem;">Brand Name</label><input type="text" name="avoid_brand_name[]" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div><label style="font-size:0.85rem;">Reason</label><input type="text" name="avoid_brand_reason[]" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><button type="button" onclick="this.closest('.brand-avoid-entry').remove()" style="background:#C0392B; color:white; border:none; padding:8px 12px; border-radius:6px; cursor:pointer; font-size:0.85rem; height:38px;">X</button></div>`;
+    container.appendChild(e);
+}
+
+let arCounter = 1;
+function addAdverseReactionRow() {
+    arCounter++;
+    const container = document.getElementById('ar-table-container');
+    const e = document.createElement('div');
+    e.className = 'ar-entry';
+    e.style.cssText = 'background:#FFF0F0; border:1.5px solid #E8B0B0; border-radius:10px; padding:16px; margin-bottom:12px;';
+    e.innerHTML = `<div style="display:flex; justify-content:space-between; align-items:center; margin-bottom:12px;"><strong style="color:#A02020;">Reaction #${arCounter}</strong><button type="button" onclick="this.closest('.ar-entry').remove()" style="background:#C0392B; color:white; border:none; padding:6px 12px; border-radius:6px; cursor:pointer; font-size:0.85rem;">Remove</button></div><div style="display:grid; grid-template-columns:1fr 1fr; gap:12px;"><div><label style="font-size:0.85rem;">Brand</label><input type="text" name="ar_brand[]" style="width:100%; padding:8px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div><label style="font-size:0.85rem;">Product/Food Ingredient/Medication</label><input type="text" name="ar_product[]" style="width:100%; padding:8px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div><label style="font-size:0.85rem;">Form/Type</label><input type="text" name="ar_form[]" style="width:100%; padding:8px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div><label style="font-size:0.85rem;">Fed Since</label><input type="text" name="ar_since[]" style="width:100%; padding:8px; border:1.5px solid #D9D4CC; border-radius:8px;"></div><div style="grid-column:span 2;"><label style="font-size:0.85rem;">Details of reaction/Symptoms</label><textarea name="ar_symptoms[]" style="width:100%; padding:8px; border:1.5px solid #D9D4CC; border-radius:8px; min-height:60px;"></textarea></div></div>`;
+    container.appendChild(e);
+}
+
+let treatCounter = 1;
+function addTreatRow() {
+    treatCounter++;
+    const container = document.getElementById('treat-table-container');
+    const newEntry = document.createElement('div');
+    newEntry.className = 'treat-entry';
+    newEntry.style.cssText = 'background:#FFF8F0; border:1.5px solid #E8D5B0; border-radius:10px; padding:20px; margin-bottom:16px;';
+    newEntry.innerHTML = `
+        <div style="display:flex; justify-content:space-between; align-items:center; margin-bottom:16px;">
+            <strong style="color:#A85E3F;">Treat #${treatCounter}</strong>
+            <button type="button" onclick="this.closest('.treat-entry').remove()" style="background:#C0392B; color:white; border:none; padding:6px 12px; border-radius:6px; cursor:pointer; font-size:0.85rem;">Remove</button>
+        </div>
+        <div style="display:grid; grid-template-columns:1fr 1fr; gap:16px;">
+            <div class="form-group" style="margin-bottom:12px;">
+                <label style="font-size:0.85rem;">Treat Type/Form</label>
+                <input type="text" name="treat_type_form[]" placeholder="e.g., biscuit, chunk" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;">
+            </div>
+            <div class="form-group" style="margin-bottom:12px;">
+                <label style="font-size:0.85rem;">Ingredient</label>
+                <input type="text" name="treat_ingredient[]" placeholder="e.g., chicken breast" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;">
+            </div>
+            <div class="form-group" style="margin-bottom:12px;">
+                <label style="font-size:0.85rem;">Preparation Method</label>
+                <input type="text" name="treat_preparation[]" placeholder="e.g., boiled" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;">
+            </div>
+            <div class="form-group" style="margin-bottom:12px;">
+                <label style="font-size:0.85rem;">Quantity per day (gm)</label>
+                <input type="text" name="treat_quantity[]" placeholder="e.g., 50gm" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;">
+            </div>
+            <div class="form-group" style="margin-bottom:12px;">
+                <label style="font-size:0.85rem;">Fed Since</label>
+                <input type="text" name="treat_since[]" placeholder="e.g., 6 months" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;">
+            </div>
+            <div class="form-group" style="margin-bottom:12px;">
+                <label style="font-size:0.85rem;">Reason (if stopped)</label>
+                <input type="text" name="treat_reason_stopped[]" style="width:100%; padding:10px; border:1.5px solid #D9D4CC; border-radius:8px;">
+            </div>
+        </div>
+    `;
+    container.appendChild(newEntry);
+}
+
+let currentStep = 1;
+
+// ── Validation Toggle ──────────────────────────────────
+var VALIDATION_ENABLED = !new URLSearchParams(window.location.search).has('novalidate');
+
+// Dev-tools floating toggle (add ?devtools to URL)
+if (new URLSearchParams(window.location.search).has('devtools')) {
+    var devBtn = document.createElement('button');
+    devBtn.textContent = 'Validation: ON';
+    devBtn.style.cssText = 'position:fixed;bottom:16px;right:16px;z-index:99999;padding:8px 16px;border-radius:8px;border:2px solid #5B8C5A;background:#fff;color:#5B8C5A;font-weight:700;font-size:13px;cursor:pointer;box-shadow:0 2px 8px rgba(0,0,0,.15);';
+    devBtn.onclick = function() {
+        VALIDATION_ENABLED = !VALIDATION_ENABLED;
+        devBtn.textContent = 'Validation: ' + (VALIDATION_ENABLED ? 'ON' : 'OFF');
+        devBtn.style.borderColor = VALIDATION_ENABLED ? '#5B8C5A' : '#c0392b';
+        devBtn.style.color = VALIDATION_ENABLED ? '#5B8C5A' : '#c0392b';
+    };
+    document.body.appendChild(devBtn);
+}
+
+// ── Step Labels ────────────────────────────────────────
+var STEP_LABELS = [
+    '', 'Owner & Pet', 'Health & Diet', 'Diet Details',
+    'Homemade Diet', 'Treats & Supplements', 'Brands to Avoid',
+    'Additional Info', 'Veterinarian', 'Consent & Submit'
+];
+
+// ── Required Fields Map ────────────────────────────────
+var STEP_REQUIRED_FIELDS = {
+    1: [
+        { name: 'parent_name', label: 'Parent/Owner Name', type: 'text' },
+        { name: 'parent_email', label: 'Email Address', type: 'email' },
+        { name: 'parent_phone', label: 'Phone Number', type: 'text' },
+        { name: 'pet_name', label: 'Pet Name', type: 'text' },
+        { name: 'pet_age', label: 'Pet Age', type: 'text' },
+        { name: 'pet_species', label: 'Species', type: 'select' },
+        { name: 'pet_breed', label: 'Breed', type: 'text' },
+        { name: 'pet_sex', label: 'Pet Sex', type: 'radio' },
+        { name: 'pet_weight', label: 'Body Weight', type: 'text' },
+        { name: 'pet_body_condition', label: 'Body Condition Score', type: 'radio' },
+        { name: 'pet_consultation_goals', label: 'Consultation Goals', type: 'text' }
+    ],
+    2: [], 3: [], 4: [], 5: [], 6: [], 7: [],
+    8: [
+        { name: 'vet_name', label: 'Veterinarian Name', type: 'text' },
+        { name: 'vet_practice', label: 'Practice / Clinic Name', type: 'text' },
+        { name: 'vet_phone', label: 'Vet Phone Number', type: 'text' },
+        { name: 'vet_email', label: 'Vet Email Address', type: 'email' }
+    ],
+    9: [
+        { name: 'consent_agreed', label: 'Consent Checkbox', type: 'checkbox' },
+        { name: 'consent_name', label: 'Full Name (Consent)', type: 'text' }
+    ]
+};
+
+// ── Mobile Step Indicator ──────────────────────────────
+function updateMobileStepIndicator(step) {
+    var numEl = document.getElementById('mobile-step-num');
+    var labelEl = document.getElementById('mobile-step-label');
+    var dotsEl = document.getElementById('mobile-step-dots');
+    if (!numEl || !labelEl || !dotsEl) return;
+
+    numEl.textContent = step;
+    labelEl.textContent = STEP_LABELS[step] || '';
+
+    dotsEl.innerHTML = '';
+    for (var i = 1; i <= 9; i++) {
+        var dot = document.createElement('span');
+        dot.className = 'step-mobile-dot' + (i === step ? ' active' : '') + (i < step ? ' completed' : '');
+        dotsEl.appendChild(dot);
+    }
+}
+
+// ── Validate Step ──────────────────────────────────────
+function validateStep(stepNum) {
+    var fields = STEP_REQUIRED_FIELDS[stepNum];
+    if (!fields || fields.length === 0) return [];
+
+    var missing = [];
+    var stepEl = document.getElementById('step-' + stepNum);
+
+    for (var i = 0; i < fields.length; i++) {
+        var f = fields[i];
+        var valid = false;
+
+        if (f.type === 'radio') {
+            var radios = stepEl.querySelectorAll('input[name="' + f.name + '"]');
+            for (var r = 0; r < radios.length; r++) {
+                if (radios[r].checked) { valid = true; break; }
+            }
+        } else if (f.type === 'checkbox') {
+            var cb = stepEl.querySelector('input[name="' + f.name + '"]');
+            valid = cb && cb.checked;
+        } else if (f.type === 'select') {
+            var sel = stepEl.querySelector('select[name="' + f.name + '"]');
+            valid = sel && sel.value && sel.value.trim() !== '';
+        } else {
+            var inp = stepEl.querySelector('[name="' + f.name + '"]');
+            valid = inp && inp.value && inp.value.trim() !== '';
+        }
+
+        if (!valid) {
+            var fieldEl = stepEl.querySelector('[name="' + f.name + '"]');
+            missing.push({ label: f.label, step: stepNum, fieldEl: fieldEl, name: f.name, type: f.type });
+        }
+    }
+    return missing;
+}
+
+// ── Show Step Errors ───────────────────────────────────
+function showStepErrors(stepNum, missingFields) {
+    clearStepErrors(stepNum);
+
+    var stepEl = document.getElementById('step-' + stepNum);
+    if (!stepEl) return;
+
+    // Create error banner
+    var banner = document.createElement('div');
+    banner.className = 'validation-errors';
+    banner.id = 'validation-errors-' + stepNum;
+    var title = document.createElement('strong');
+    title.textContent = 'Please fill in the following required fields:';
+    banner.appendChild(title);
+    var ul = document.createElement('ul');
+    ul.style.cssText = 'margin:8px 0 0 0; padding-left:20px;';
+    for (var i = 0; i < missingFields.length; i++) {
+        var li = document.createElement('li');
+        li.textContent = missingFields[i].label;
+        li.style.marginBottom = '2px';
+        ul.appendChild(li);
+    }
+    banner.appendChild(ul);
+
+    // Insert at top of step content
+    stepEl.insertBefore(banner, stepEl.firstChild);
+
+    // Highlight fields
+    for (var j = 0; j < missingFields.length; j++) {
+        var mf = missingFields[j];
+        if (mf.type === 'radio') {
+            // Highlight the radio group container
+            var radios = stepEl.querySelectorAll('input[name="' + mf.name + '"]');
+            for (var r = 0; r < radios.length; r++) {
+                var radioLabel = radios[r].closest('label') || radios[r].closest('.radio-group');
+                if (radioLabel) radioLabel.classList.add('field-error');
+            }
+        } else if (mf.fieldEl) {
+            mf.fieldEl.classList.add('field-error');
+        }
+    }
+
+    // Scroll to banner
+    banner.scrollIntoView({ behavior: 'smooth', block: 'start' });
+}
+
+// ── Clear Step Errors ──────────────────────────────────
+function clearStepErrors(stepNum) {
+    var banner = document.getElementById('validation-errors-' + stepNum);
+    if (banner) banner.remove();
+
+    var stepEl = document.getElementById('step-' + stepNum);
+    if (!stepEl) return;
+    var highlighted = stepEl.querySelectorAll('.field-error');
+    for (var i = 0; i < highlighted.length; i++) {
+        highlighted[i].classList.remove('field-error');
+    }
+}
+
+// ── Auto-clear field errors on input ───────────────────
+function setupFieldErrorClearListeners() {
+    document.addEventListener('input', function(e) {
+        if (e.target.classList.contains('field-error')) {
+            e.target.classList.remove('field-error');
+        }
+    });
+    document.addEventListener('change', function(e) {
+        var el = e.target;
+        if (el.classList.contains('field-error')) {
+            el.classList.remove('field-error');
+        }
+        // For radios, clear from all labels in the group
+        if (el.type === 'radio') {
+            var groupLabels = document.querySelectorAll('input[name="' + el.name + '"]');
+            for (var i = 0; i < groupLabels.length; i++) {
+                var lbl = groupLabels[i].closest('label') || groupLabels[i].closest('.radio-group');
+                if (lbl) lbl.classList.remove('field-error');
+            }
+        }
+        // For checkboxes
+        if (el.type === 'checkbox' && el.classList.contains('field-error')) {
+            el.classList.remove('field-error');
+        }
+    });
+}
+setupFieldErrorClearListeners();
+
+// ── Navigation Functions ───────────────────────────────
+function nextStep(step) {
+    // Validate current step before moving forward
+    if (VALIDATION_ENABLED) {
+        var missing = validateStep(currentStep);
+        if (missing.length > 0) {
+            showStepErrors(currentStep, missing);
+            return;
+        }
+        clearStepErrors(currentStep);
+    }
+
+    // Hide current step
+    document.getElementById('step-' + currentStep).classList.remove('active');
+
+    // Mark current as completed
+    document.querySelector('.step[data-step="' + currentStep + '"]').classList.add('completed');
+    document.querySelector('.step[data-step="' + currentStep + '"]').classList.remove('active');
+
+    // Show next step
+    currentStep = step;
+    document.getElementById('step-' + currentStep).classList.add('active');
+    document.querySelector('.step[data-step="' + currentStep + '"]').classList.add('active');
+
+    updateMobileStepIndicator(currentStep);
+    window.scrollTo({ top: 0, behavior: 'smooth' });
+}
+
+function prevStep(step) {
+    // Going back never blocks — no validation
+    document.getElementById('step-' + currentStep).classList.remove('active');
+    document.querySelector('.step[data-step="' + currentStep + '"]').classList.remove('active');
+
+    currentStep = step;
+    document.getElementById('step-' + currentStep).classList.add('active');
+    document.querySelector('.step[data-step="' + currentStep + '"]').classList.add('active');
+
+    updateMobileStepIndicator(currentStep);
+    window.scrollTo({ top: 0, behavior: 'smooth' });
+}
+
+function goToStep(step) {
+    if (step === currentStep) return;
+
+    // Going backward — always allowed
+    if (step < currentStep) {
+        goToStepDirect(step);
+        return;
+    }
+
+    // Going forward — validate each intermediate step
+    if (VALIDATION_ENABLED) {
+        for (var s = currentStep; s < step; s++) {
+            var missing = validateStep(s);
+            if (missing.length > 0) {
+                // Navigate to the failing step and show errors
+                goToStepDirect(s);
+                showStepErrors(s, missing);
+                return;
+            }
+        }
+    }
+
+    goToStepDirect(step);
+}
+
+// Non-validating direct navigation (used by modal + backward nav)
+function goToStepDirect(step) {
+    if (step === currentStep) return;
+
+    document.getElementById('step-' + currentStep).classList.remove('active');
+
+    for (var i = 1; i <= 9; i++) {
+        var indicator = document.querySelector('.step[data-step="' + i + '"]');
+        indicator.classList.remove('active', 'completed');
+        if (i < step) indicator.classList.add('completed');
+    }
+
+    currentStep = step;
+    document.getElementById('step-' + currentStep).classList.add('active');
+    document.querySelector('.step[data-step="' + currentStep + '"]').classList.add('active');
+
+    updateMobileStepIndicator(currentStep);
+    window.scrollTo({ top: 0, behavior: 'smooth' });
+}
+
+// ── Submit Handler ─────────────────────────────────────
+function submitForm() {
+    if (VALIDATION_ENABLED) {
+        var allMissing = [];
+        for (var s = 1; s <= 9; s++) {
+            var missing = validateStep(s);
+            for (var m = 0; m < missing.length; m++) {
+                allMissing.push(missing[m]);
+            }
+        }
+        if (allMissing.length > 0) {
+            showSubmitValidationModal(allMissing);
+            return;
+        }
+    }
+
+    // Strip required from hidden steps so browser doesn't block
+    var hiddenSteps = document.querySelectorAll('.form-step:not(.active)');
+    hiddenSteps.forEach(function(step) {
+        step.querySelectorAll('[required]').forEach(function(el) {
+            el.removeAttribute('required');
+        });
+    });
+
+    if (window.fetch && intakeForm.dataset.draftStart) {
+        submitDraft();
+        return;
+    }
+    intakeForm.submit();
+}
+
+// ── Submit Validation Modal ────────────────────────────
+function showSubmitValidationModal(allMissing) {
+    // Remove existing modal if any
+    var existing = document.getElementById('submit-validation-overlay');
+    if (existing) existing.remove();
+
+    // Group by step
+    var grouped = {};
+    for (var i = 0; i < allMissing.length; i++) {
+        var s = allMissing[i].step;
+        if (!grouped[s]) grouped[s] = [];
+        grouped[s].push(allMissing[i]);
+    }
+
+    // Build modal
+    var overlay = document.createElement('div');
+    overlay.className = 'submit-validation-overlay';
+    overlay.id = 'submit-validation-overlay';
+
+    var modal = document.createElement('div');
+    modal.className = 'submit-validation-modal';
+
+    var title = document.createElement('h3');
+    title.style.cssText = 'margin:0 0 8px 0; color:#c0392b; font-size:1.15rem;';
+    title.textContent = 'Required Fields Missing';
+    modal.appendChild(title);
+
+    var subtitle = document.createElement('p');
+    subtitle.style.cssText = 'margin:0 0 16px 0; color:#6B6B6B; font-size:0.9rem;';
+    subtitle.textContent = 'Please fill in all required fields before submitting. Click a step name to go there.';
+    modal.appendChild(subtitle);
+
+    var stepNums = Object.keys(grouped).sort(function(a, b) { return a - b; });
+    for (var si = 0; si < stepNums.length; si++) {
+        var stepNum = parseInt(stepNums[si]);
+        var fields = grouped[stepNum];
+
+        var stepLink = document.createElement('div');
+        stepLink.style.cssText = 'cursor:pointer; padding:6px 10px; margin:4px 0; background:#fdf2f2; border-radius:6px; border-left:3px solid #c0392b;';
+        stepLink.setAttribute('data-goto-step', stepNum);
+        stepLink.onmouseover = function() { this.style.background = '#fbe5e5'; };
+        stepLink.onmouseout = function() { this.style.background = '#fdf2f2'; };
+
+        var stepTitle = document.createElement('strong');
+        stepTitle.style.cssText = 'color:#5B8C5A; font-size:0.95rem;';
+        stepTitle.textContent = 'Step ' + stepNum + ' — ' + STEP_LABELS[stepNum];
+        stepLink.appendChild(stepTitle);
+
+        var fieldList = document.createElement('ul');
+        fieldList.style.cssText = 'margin:4px 0 0 0; padding-left:18px; font-size:0.88rem; color:#444;';
+        for (var fi = 0; fi < fields.length; fi++) {
+            var li = document.createElement('li');
+            li.textContent = fields[fi].label;
+            li.style.marginBottom = '1px';
+            fieldList.appendChild(li);
+        }
+        stepLink.appendChild(fieldList);
+
+        // Closure for click handler
+        (function(sn) {
+            stepLink.addEventListener('click', function() {
+                overlay.remove();
+                goToStepDirect(sn);
+                var stepMissing = validateStep(sn);
+                if (stepMissing.length > 0) showStepErrors(sn, stepMissing);
+            });
+        })(stepNum);
+
+        modal.appendChild(stepLink);
+    }
+
+    // Close button
+    var closeBtn = document.createElement('button');
+    closeBtn.type = 'button';
+    closeBtn.style.cssText = 'margin-top:16px; width:100%; padding:12px; border:none; border-radius:8px; background:#5B8C5A; color:#fff; font-size:1rem; font-weight:600; cursor:pointer;';
+    closeBtn.textContent = 'Close & Fix Fields';
+    closeBtn.onclick = function() {
+        overlay.remove();
+        var firstStep = parseInt(stepNums[0]);
+        goToStepDirect(firstStep);
+        var stepMissing = validateStep(firstStep);
+        if (stepMissing.length > 0) showStepErrors(firstStep, stepMissing);
+    };
+    modal.appendChild(closeBtn);
+
+    overlay.appendChild(modal);
+
+    // Click outside to close
+    overlay.addEventListener('click', function(e) {
+        if (e.target === overlay) overlay.remove();
+    });
+
+    document.body.appendChild(overlay);
+}
+
+// ── Draft Autosave (intake_form/drafts.py) ─────────────
+// Each step the owner changes is saved to a server-side draft a couple of
+// seconds later, so a dropped connection loses almost nothing and Submit
+// only has to ask the server to turn the saved answers into a case.
+var intakeForm = document.querySelector('form');
+var DRAFT_KEY = 'intake-draft';
+var AUTOSAVE_DELAY_MS = 2000;
+var draft = JSON.parse(localStorage.getItem(DRAFT_KEY) || 'null');
+var dirtySteps = {};
+var autosaveTimer = null;
+var restoringDraft = false;
+
+function draftRequest(method, url, body) {
+    return fetch(url, {
+        method: method,
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': intakeForm.querySelector('[name=csrfmiddlewaretoken]').value
+        },
+        body: body ? JSON.stringify(body) : undefined
+    }).then(function(r) {
+        return r.json().then(function(data) {
+            if (r.ok) return data;
+            var err = new Error(data.error || 'Request failed (' + r.status + ')');
+            err.status = r.status;
+            err.errors = data.errors || [];
+            throw err;
+        });
+    });
+}
+
+function forgetDraft() {
+    draft = null;
+    localStorage.removeItem(DRAFT_KEY);
+}
+
+function openDraft() {
+    if (draft) return Promise.resolve(draft);
+    return draftRequest('POST', intakeForm.dataset.draftStart).then(function(state) {
+        draft = {url: state.url, submit_url: state.submit_url};
+        localStorage.setItem(DRAFT_KEY, JSON.stringify(draft));
+        return draft;
+    });
+}
+
+// The step's answers as the form would post them: {name: [values]}
+function stepAnswers(stepEl) {
+    var answers = {};
+    stepEl.querySelectorAll('input[name], select[name], textarea[name]').forEach(function(el) {
+        if (el.type === 'file' || el.disabled) return;
+        if (!answers[el.name]) answers[el.name] = [];
+        if ((el.type === 'checkbox' || el.type === 'radio') && !el.checked) return;
+        answers[el.name].push(el.value);
+    });
+    return answers;
+}
+
+function saveDraft() {
+    clearTimeout(autosaveTimer);
+    if (Object.keys(dirtySteps).length === 0) return Promise.resolve();
+    // A new draft gets every step once, defaults included, as a full POST would
+    if (!draft) {
+        intakeForm.querySelectorAll('.form-step').forEach(function(el) { dirtySteps[el.id] = true; });
+    }
+    var steps = Object.keys(dirtySteps);
+    dirtySteps = {};
+    var sections = {};
+    steps.forEach(function(id) {
+        var stepEl = document.getElementById(id);
+        sections[stepEl.dataset.section] = stepAnswers(stepEl);
+    });
+    return openDraft().then(function(d) {
+        return draftRequest('PATCH', d.url, {sections: sections});
+    }).catch(function(err) {
+        // Offline or server trouble: send these steps again next time
+        steps.forEach(function(id) { dirtySteps[id] = true; });
+        if (err.status === 404 || err.status === 409) forgetDraft();
+        throw err;
+    });
+}
+
+function markStepChanged(e) {
+    var stepEl = e.target.closest && e.target.closest('.form-step');
+    if (restoringDraft || !stepEl) return;
+    dirtySteps[stepEl.id] = true;
+    clearTimeout(autosaveTimer);
+    autosaveTimer = setTimeout(function() { saveDraft().catch(function() {}); }, AUTOSAVE_DELAY_MS);
+}
+intakeForm.addEventListener('input', markStepChanged);
+intakeForm.addEventListener('change', markStepChanged);
+// Adding or removing table rows changes answers without an input event
+intakeForm.addEventListener('click', function(e) {
+    if (e.target.closest('button[type=button]')) markStepChanged(e);
+});
+document.addEventListener('visibilitychange', function() {
+    if (document.visibilityState === 'hidden') saveDraft().catch(function() {});
+});
+
+function submitDraft() {
+    // Only what autosave hasn't sent yet goes now; a failed submit can simply be retried
+    dirtySteps['step-' + currentStep] = true;
+    saveDraft().then(openDraft).then(function(d) {
+        return draftRequest('POST', d.submit_url);
+    }).then(function(result) {
+        forgetDraft();
+        window.location = result.redirect;
+    }).catch(function(err) {
+        if (err.errors && err.errors.length) {
+            alert(err.errors.join('\n'));
+        } else if (!err.status) {
+            alert('Could not reach the server. Your answers are kept - please press Submit again once you are back online.');
+        } else {
+            intakeForm.submit();
+        }
+    });
+}
+
+// Put answers ({name: [values]}) back into the fields under rootEl
+// (rows added beyond the form's own are not re-created)
+function fillAnswers(rootEl, answers) {
+    restoringDraft = true;
+    Object.keys(answers).forEach(function(name) {
+        var values = answers[name];
+        var next = 0;
+        rootEl.querySelectorAll('[name="' + CSS.escape(name) + '"]').forEach(function(el) {
+            if (el.type === 'checkbox' || el.type === 'radio') {
+                el.checked = values.indexOf(el.value) !== -1;
+                el.dispatchEvent(new Event('change', {bubbles: true}));
+            } else if (el.type !== 'file' && next < values.length) {
+                el.value = values[next++];
+                if (el.tagName === 'SELECT') el.dispatchEvent(new Event('change', {bubbles: true}));
+            }
+        });
+    });
+    restoringDraft = false;
+}
+
+function restoreAnswers(sections) {
+    Object.keys(sections).forEach(function(section) {
+        var stepEl = intakeForm.querySelector('.form-step[data-section="' + section + '"]');
+        if (stepEl) fillAnswers(stepEl, sections[section]);
+    });
+}
+
+// A submission the server refused comes back with what was posted
+var postedAnswers = document.getElementById('posted-answers');
+if (postedAnswers) {
+    document.addEventListener('DOMContentLoaded', function() {
+        fillAnswers(intakeForm, JSON.parse(postedAnswers.textContent));
+    });
+}
+
+if (draft && window.fetch && !postedAnswers) {
+    draftRequest('GET', draft.url).then(function(state) {
+        if (state.submitted) forgetDraft();
+        else restoreAnswers(state.sections);
+    }).catch(function(err) {
+        if (err.status === 404) forgetDraft();
+    });
+}
+
+// Initialize mobile indicator on page load
+updateMobileStepIndicator(1);
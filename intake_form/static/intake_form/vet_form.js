@@ -0,0 +1,259 @@
+/* ── Dynamic table rows ── */
+function addRow(tableId, idName, fieldNames) {
+    var tbody = document.getElementById(tableId).querySelector('tbody');
+    var tr = document.createElement('tr');
+    fieldNames.forEach(function(name, i) {
+        var td = document.createElement('td');
+        if (i === 0) {
+            // New rows post an empty id so ids stay aligned with the other columns
+            var id = document.createElement('input');
+            id.type = 'hidden';
+            id.name = idName;
+            td.appendChild(id);
+        }
+        var ta = document.createElement('textarea');
+        ta.name = name;
+        td.appendChild(ta);
+        tr.appendChild(td);
+    });
+    var td = document.createElement('td');
+    td.innerHTML = '<button type="button" class="btn-remove" onclick="this.closest(\'tr\').remove()">x</button>';
+    tr.appendChild(td);
+    tbody.appendChild(tr);
+}
+
+/* ── File upload zones ── */
+var fileStore = {};
+
+function formatSize(bytes) {
+    if (bytes < 1024) return bytes + ' B';
+    if (bytes < 1048576) return (bytes / 1024).toFixed(1) + ' KB';
+    return (bytes / 1048576).toFixed(1) + ' MB';
+}
+
+function getFileExt(name) {
+    var parts = name.split('.');
+    return parts.length > 1 ? parts.pop().toUpperCase() : 'FILE';
+}
+
+function renderChips(inputId) {
+    var container = document.getElementById('chips-' + inputId.replace('file-', ''));
+    var dt = fileStore[inputId];
+    container.innerHTML = '';
+    if (!dt || dt.files.length === 0) return;
+    for (var i = 0; i < dt.files.length; i++) {
+        var f = dt.files[i];
+        var chip = document.createElement('div');
+        chip.className = 'file-chip';
+        var ext = getFileExt(f.name);
+        var isImg = ['JPG','JPEG','PNG','GIF','BMP','WEBP','TIFF'].indexOf(ext) >= 0;
+        chip.innerHTML =
+            '<div class="file-icon" style="' + (isImg ? 'background:#e0f0e8;color:#4A7A4F' : 'background:#e0e8f0;color:#666') + '">' + ext + '</div>' +
+            '<div class="file-info"><div class="file-name">' + f.name + '</div><div class="file-size">' + formatSize(f.size) + '</div></div>' +
+            '<span class="file-remove" data-idx="' + i + '" data-input="' + inputId + '">&#10005;</span>';
+        container.appendChild(chip);
+    }
+    /* Remove-chip click handlers */
+    container.querySelectorAll('.file-remove').forEach(function(btn) {
+        btn.addEventListener('click', function() {
+            var idx = parseInt(this.getAttribute('data-idx'));
+            var iid = this.getAttribute('data-input');
+            removeFile(iid, idx);
+        });
+    });
+}
+
+function removeFile(inputId, idx) {
+    var dt = fileStore[inputId];
+    if (!dt) return;
+    var newDt = new DataTransfer();
+    for (var i = 0; i < dt.files.length; i++) {
+        if (i !== idx) newDt.items.add(dt.files[i]);
+    }
+    fileStore[inputId] = newDt;
+    document.getElementById(inputId).files = newDt.files;
+    renderChips(inputId);
+}
+
+function addFiles(inputId, newFiles) {
+    if (!fileStore[inputId]) fileStore[inputId] = new DataTransfer();
+    var dt = fileStore[inputId];
+    for (var i = 0; i < newFiles.length; i++) {
+        dt.items.add(newFiles[i]);
+    }
+    document.getElementById(inputId).files = dt.files;
+    renderChips(inputId);
+}
+
+/* Init all upload zones */
+document.querySelectorAll('.upload-zone').forEach(function(zone) {
+    var inputId = zone.getAttribute('data-input');
+    var fileInput = document.getElementById(inputId);
+
+    /* Click to browse */
+    zone.addEventListener('click', function(e) {
+        if (e.target.closest('.browse-btn') || e.target === zone || e.target.closest('.upload-icon') || e.target.closest('.upload-text') || e.target.closest('.upload-hint')) {
+            fileInput.click();
+        }
+    });
+
+    /* File input change */
+    fileInput.addEventListener('change', function() {
+        if (this.files.length > 0) {
+            addFiles(inputId, this.files);
+        }
+    });
+
+    /* Drag events */
+    zone.addEventListener('dragover', function(e) {
+        e.preventDefault();
+        e.stopPropagation();
+        zone.classList.add('dragover');
+    });
+    zone.addEventListener('dragleave', function(e) {
+        e.preventDefault();
+        e.stopPropagation();
+        zone.classList.remove('dragover');
+    });
+    zone.addEventListener('drop', function(e) {
+        e.preventDefault();
+        e.stopPropagation();
+        zone.classList.remove('dragover');
+        if (e.dataTransfer.files.length > 0) {
+            addFiles(inputId, e.dataTransfer.files);
+        }
+    });
+});
+
+/* ── Chunked, resumable uploads (intake_form/uploads.py) ── */
+var vetPage = document.currentScript.dataset;
+var UPLOAD_CHUNK_SIZE = Number(vetPage.chunkSize);
+var UPLOAD_RETRIES = 5;
+var csrfToken = document.querySelector('[name=csrfmiddlewaretoken]').value;
+
+/* A session URL per file survives reloads, so an interrupted upload resumes */
+function uploadKey(file, category) {
+    return 'vet-upload:' + vetPage.pet + ':' + category + ':' + file.name + ':' + file.size + ':' + file.lastModified;
+}
+
+function jsonOrThrow(r) {
+    if (!r.ok) throw new Error('Upload failed (' + r.status + ')');
+    return r.json();
+}
+
+function openUpload(file, category) {
+    var saved = localStorage.getItem(uploadKey(file, category));
+    if (saved) {
+        return fetch(saved).then(function(r) {
+            return r.ok ? r.json() : newUpload(file, category);
+        });
+    }
+    return newUpload(file, category);
+}
+
+function newUpload(file, category) {
+    var body = new FormData();
+    body.append('category', category);
+    body.append('filename', file.name);
+    body.append('size', file.size);
+    body.append('csrfmiddlewaretoken', csrfToken);
+    return fetch(vetPage.uploadStart, {method: 'POST', body: body})
+        .then(jsonOrThrow)
+        .then(function(state) {
+            localStorage.setItem(uploadKey(file, category), state.url);
+            return state;
+        });
+}
+
+function sendChunks(file, state, onProgress, retries) {
+    onProgress(state.offset);
+    if (state.upload_id) return Promise.resolve(state);
+    var end = Math.min(state.offset + UPLOAD_CHUNK_SIZE, file.size);
+    return fetch(state.url, {
+        method: 'PATCH',
+        headers: {'Upload-Offset': String(state.offset), 'Content-Type': 'application/offset+octet-stream', 'X-CSRFToken': csrfToken},
+        body: file.slice(state.offset, end)
+    }).then(function(r) {
+        /* 409: the server has a different offset (or, with Retry-After, is still
+           writing another chunk); carry on from there */
+        if (r.status === 409) {
+            var wait = (Number(r.headers.get('Retry-After')) || 0) * 1000;
+            return new Promise(function(resolve) { setTimeout(resolve, wait); })
+                .then(function() { return fetch(state.url).then(jsonOrThrow); });
+        }
+        return jsonOrThrow(r);
+    }).then(function(next) {
+        return sendChunks(file, next, onProgress, UPLOAD_RETRIES);
+    }, function(err) {
+        if (retries <= 0) throw err;
+        return new Promise(function(resolve) { setTimeout(resolve, 1000); })
+            .then(function() { return fetch(state.url).then(jsonOrThrow); })
+            .then(function(current) { return sendChunks(file, current, onProgress, retries - 1); },
+                  function() { return sendChunks(file, state, onProgress, retries - 1); });
+    });
+}
+
+/* ── Submit with upload progress ── */
+function submitWithProgress() {
+    var form = document.querySelector('form');
+    var progressWrap = document.getElementById('upload-progress');
+    var progressBar = document.getElementById('progress-bar');
+    var progressPct = document.getElementById('progress-pct');
+    var progressText = document.getElementById('progress-text');
+    var submitBtn = document.getElementById('submit-btn');
+
+    var queue = [];
+    var totalBytes = 0;
+    Object.keys(fileStore).forEach(function(inputId) {
+        var files = fileStore[inputId].files;
+        for (var i = 0; i < files.length; i++) {
+            queue.push({file: files[i], category: inputId.replace('file-', ''), inputId: inputId});
+            totalBytes += files[i].size;
+        }
+    });
+
+    /* If no files, just submit normally (faster) */
+    if (queue.length === 0) {
+        form.submit();
+        return;
+    }
+
+    /* Show progress */
+    progressWrap.classList.add('active');
+    submitBtn.disabled = true;
+    submitBtn.textContent = 'Uploading...';
+    submitBtn.style.opacity = '0.6';
+    progressText.textContent = 'Uploading files...';
+
+    var doneBytes = 0;
+    var chain = Promise.resolve();
+    queue.forEach(function(item) {
+        chain = chain.then(function() {
+            return openUpload(item.file, item.category).then(function(state) {
+                return sendChunks(item.file, state, function(offset) {
+                    var pct = totalBytes ? Math.round(((doneBytes + offset) / totalBytes) * 100) : 100;
+                    progressBar.style.width = pct + '%';
+                    progressPct.textContent = pct + '%';
+                }, UPLOAD_RETRIES);
+            }).then(function() {
+                localStorage.removeItem(uploadKey(item.file, item.category));
+                doneBytes += item.file.size;
+            });
+        });
+    });
+
+    chain.then(function() {
+        progressText.textContent = 'Done!';
+        /* Files are stored already; submit the rest of the form without them */
+        Object.keys(fileStore).forEach(function(inputId) {
+            document.getElementById(inputId).value = '';
+        });
+        fileStore = {};
+        form.submit();
+    }, function() {
+        progressText.textContent = 'Upload interrupted. Press Save again to resume.';
+        submitBtn.disabled = false;
+        submitBtn.textContent = 'Save Clinical History';
+        submitBtn.style.opacity = '1';
+    });
+}
@@ -0,0 +1,80 @@
+"""
+Content-addressed storage for vet uploads.
+
+Files are stored once under blobs/<aa>/<bb>/<sha256><ext>, so the same lab
+report uploaded for several pets (or twice for one) is written and kept once.
+UploadBlob counts the VetUploads pointing at each blob; the file is removed
+when the last one goes.
+
+Saving takes the reference before it looks for the file, in one transaction,
+and removal deletes the UploadBlob row before the file, in another. Whichever
+gets the row first wins, so a file that is about to be removed is written
+again rather than reused.
+"""
+import hashlib
+import os
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+BLOB_DIR = 'blobs'
+HASH_BLOCK = 64 * 1024
+
+
+def blob_name(sha256, filename=''):
+    # Keep the extension so media URLs are still served with a sensible type
+    ext = os.path.splitext(filename)[1].lower()[:16]
+    return f'{BLOB_DIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}{ext}'
+
+
+def blob_sha256(name):
+    """The hash a blob name was derived from, or '' for files stored before blobs"""
+    if not name or not name.startswith(f'{BLOB_DIR}/'):
+        return ''
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+def hash_content(content):
+    hasher = hashlib.sha256()
+    content.seek(0)
+    for block in iter(lambda: content.read(HASH_BLOCK), b''):
+        hasher.update(block)
+    content.seek(0)
+    return hasher.hexdigest()
+
+
+@deconstructible(path='intake_form.storage.ContentAddressedStorage')
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage that names files by their SHA-256. Saving content that
+    is already stored writes nothing. Callers that already know the hash
+    (chunked uploads) can set `content.sha256` to skip hashing as well.
+
+    Each save takes one reference to the blob (UploadBlob) for the row that
+    will name it; callers that count references themselves set
+    `content.blob_refs = 0`.
+    """
+
+    def save(self, name, content, max_length=None):
+        from .models import UploadBlob  # models imports this module
+
+        sha256 = getattr(content, 'sha256', None) or hash_content(content)
+        name = blob_name(sha256, name or getattr(content, 'name', ''))
+        with transaction.atomic():
+            refs = getattr(content, 'blob_refs', 1)
+            if refs:
+                UploadBlob.acquire(name, content.size, count=refs)
+            if self.exists(name):
+                return name
+            saved = self._save(name, content)
+            if saved != name:
+                # Lost a race with an identical upload; FileSystemStorage renamed ours
+                self.delete(saved)
+        return name
+
+
+blob_storage = ContentAddressedStorage()
+
+
+def vet_upload_storage():
+    return blob_storage
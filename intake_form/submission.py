@@ -0,0 +1,539 @@
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.utils.text import capfirst
+from .models import (
+    PetParent, Pet, HouseholdDetails, FeedingBehavior,
+    FoodPreferences, CommercialDietHistory, HomemadeDietHistory,
+    CommercialTreatHistory, HomemadeTreatHistory, Supplement,
+    RecentDietChange, FoodStorage, FitnessActivity, ActivityDetail,
+    RehabilitationTherapy, MedicalHistory, AdverseReaction,
+    VaccinationStatus, PrimaryVetInfo, ConsentForm,
+    DietPlanPreferences, AdviceSource, ChronicCondition,
+    BrandToAvoid, TreatPreferenceInPlan, MultiSelectChoice, CaseIdSequence, CaseVersion
+)
+from .multiselect import choice_rows
+
+
+# ═══════════════════════════════════════════════════════
+# HELPERS
+# ═══════════════════════════════════════════════════════
+
+def _at(values, i, default=''):
+    """Value at index i of a submitted [] list, or default if the list is short"""
+    return values[i] if i < len(values) else default
+
+
+def _int_at(values, i, default=1):
+    """Integer at index i of a submitted [] list, or default if missing/blank"""
+    return int(values[i]) if i < len(values) and values[i] else default
+
+
+class CaseGraph:
+    """
+    Unsaved model instances for one intake submission.
+
+    The parent and pet are plain instances; every other row hangs off the pet
+    (or the parent, for consent) and only gets its FK once the graph is saved.
+    """
+
+    def __init__(self, parent, pet, rows=None, consent=None):
+        self.parent = parent
+        self.pet = pet
+        self.rows = rows or []
+        self.consent = consent
+
+    def rows_by_model(self):
+        """Group pet rows by model class, keeping submission order"""
+        grouped = {}
+        for row in self.rows:
+            grouped.setdefault(type(row), []).append(row)
+        return grouped
+
+    def save(self):
+        """Persist the whole case in one transaction with one INSERT per table"""
+        with transaction.atomic():
+            self.parent.save()
+            self.pet.owner = self.parent
+            self.pet.save()
+            for model, instances in self.rows_by_model().items():
+                for obj in instances:
+                    obj.pet = self.pet
+                model.objects.bulk_create(instances)
+            # bulk_create skips signals, so index the checkbox answers here
+            MultiSelectChoice.objects.bulk_create([c for row in self.rows for c in choice_rows(row)])
+            if self.consent is not None:
+                self.consent.pet_parent = self.parent
+                self.consent.save()
+        return self.parent
+
+
+def save_case_graphs(graphs):
+    """
+    Persist many cases with one INSERT per table for the whole batch (bulk
+    imports). bulk_create sends no signals, so the case versions and
+    multi-select choices they would have written are created here too.
+    """
+    if not graphs:
+        return []
+    with transaction.atomic():
+        parents = [graph.parent for graph in graphs]
+        unnumbered = [parent for parent in parents if not parent.case_id]
+        for parent, case_id in zip(unnumbered, CaseIdSequence.next_case_ids(len(unnumbered))):
+            parent.case_id = case_id
+        PetParent.objects.bulk_create(parents)
+        for graph in graphs:
+            graph.pet.owner = graph.parent
+        Pet.objects.bulk_create([graph.pet for graph in graphs])
+        CaseVersion.objects.bulk_create([CaseVersion(pet=graph.pet) for graph in graphs])
+
+        rows_by_model = {}
+        for graph in graphs:
+            for model, instances in graph.rows_by_model().items():
+                for obj in instances:
+                    obj.pet = graph.pet
+                rows_by_model.setdefault(model, []).extend(instances)
+        for model, instances in rows_by_model.items():
+            model.objects.bulk_create(instances)
+        MultiSelectChoice.objects.bulk_create(
+            [c for graph in graphs for row in graph.rows for c in choice_rows(row)]
+        )
+        consents = []
+        for graph in graphs:
+            if graph.consent is not None:
+                graph.consent.pet_parent = graph.parent
+                consents.append(graph.consent)
+        ConsentForm.objects.bulk_create(consents)
+    return parents
+
+
+# ═══════════════════════════════════════════════════════
+# SECTION BUILDERS
+# Each takes the submitted data (QueryDict-like: .get/.getlist)
+# and returns unsaved rows whose `pet` is filled in on save.
+# ═══════════════════════════════════════════════════════
+
+def build_parent(post):
+    return PetParent(
+        name=post.get('parent_name'),
+        email=post.get('parent_email'),
+        phone=post.get('parent_phone'),
+        location_primary_vet=post.get('parent_location', '')
+    )
+
+
+def build_pet(post):
+    pet_weight = post.get('pet_weight', '')
+    return Pet(
+        name=post.get('pet_name', ''),
+        dob_age=post.get('pet_age', ''),
+        species=post.get('pet_species', 'dog'),
+        breed=post.get('pet_breed', ''),
+        colour=post.get('pet_colour', ''),
+        sex=post.get('pet_sex', 'male'),
+        neutered=post.get('pet_neutered') == 'yes',
+        current_weight_kg=pet_weight if pet_weight else None,
+        body_condition=post.get('pet_body_condition', 'ideal'),
+        consultation_goals=post.get('pet_consultation_goals', '')
+    )
+
+
+def build_household(post):
+    return [HouseholdDetails(
+        food_ingredients_to_avoid=post.get('household_avoid_ingredients', ''),
+        can_arrange_special_food=post.get('household_arrange_food', 'no'),
+        who_feeds=post.get('household_who_feeds', 'varies'),
+        feeder_name=post.get('household_feeder_name', ''),
+        other_pets=post.get('household_other_pets') == 'yes',
+        other_pets_details=post.get('household_other_pets_details', ''),
+        pet_housed=post.get('household_pet_housed', 'indoors')
+    )]
+
+
+def build_feeding(post):
+    unmonitored_other = post.get('unmonitored_other', '')
+    unmonitored_str = ','.join(post.getlist('unmonitored_sources'))
+    if unmonitored_other:
+        unmonitored_str += ',' + unmonitored_other
+
+    meals_per_day = post.get('feeding_meals_per_day')
+
+    return [FeedingBehavior(
+        food_availability=post.get('feeding_food_availability', 'always'),
+        food_availability_times=post.get('feeding_food_times', ''),
+        meals_per_day=int(meals_per_day) if meals_per_day else None,
+        eating_behaviors=','.join(post.getlist('feeding_behaviors')),
+        attitude_changed=post.get('feeding_attitude_changed') == 'yes',
+        attitude_change_details=post.get('feeding_attitude_details', ''),
+        unmonitored_food_access=post.get('feeding_unmonitored') == 'yes',
+        unmonitored_sources=unmonitored_str,
+        good_appetite=post.get('feeding_good_appetite', ''),
+        appetite_recently=post.get('feeding_appetite_recently', ''),
+        bowl_type=','.join(post.getlist('bowl_types')),
+        bowl_type_other=post.get('bowl_type_other', ''),
+        bowl_material=','.join(post.getlist('bowl_material')),
+        bowl_material_other=post.get('bowl_material_other', ''),
+        water_bowl_type=','.join(post.getlist('water_bowl_types')),
+        water_bowl_material=','.join(post.getlist('water_bowl_material')),
+        water_bowl_material_other=post.get('water_bowl_material_other', ''),
+        recent_change_4_weeks=post.get('recent_diet_change_4wks') == 'yes',
+        recent_change_4_weeks_details=post.get('recent_change_4wks_details', '')
+    )]
+
+
+def build_preferences(post):
+    rows = [
+        FoodPreferences(
+            current_food_preferences=','.join(post.getlist('food_preferences')),
+            current_treat_preferences=','.join(post.getlist('treat_preferences')),
+            refuses_food=post.get('food_refuses') == 'yes',
+            refused_food_details=post.get('food_refuses_details', ''),
+            preferred_treats_in_plan=post.get('preferred_treats_in_plan', ''),
+            food_brands_to_avoid=post.get('brands_to_avoid', ''),
+            important_food_factors=','.join(post.getlist('food_factors'))
+        ),
+        # Q16: Treat Preferences in Plan (checkboxes)
+        TreatPreferenceInPlan(
+            preferences=','.join(post.getlist('treat_plan_preferences'))
+        ),
+        # Q20: Advice Source
+        AdviceSource(
+            sources=','.join(post.getlist('advice_sources')),
+            other_source=post.get('advice_source_other', '')
+        ),
+    ]
+
+    # Q17: Brands to Avoid (dynamic table)
+    brand_names = post.getlist('avoid_brand_name[]')
+    brand_reasons = post.getlist('avoid_brand_reason[]')
+    for i in range(len(brand_names)):
+        if brand_names[i].strip():
+            rows.append(BrandToAvoid(
+                brand_name=brand_names[i],
+                reason=_at(brand_reasons, i)
+            ))
+    return rows
+
+
+def build_food_storage(post):
+    rows = []
+    for st in ['dry', 'wet', 'raw', 'homecooked', 'dehydrated']:
+        loc = post.get(f'storage_{st}_location', '')
+        period = post.get(f'storage_{st}_period', '')
+        if loc or period:
+            rows.append(FoodStorage(
+                food_type=st,
+                storage_location=loc,
+                time_period=period
+            ))
+    return rows
+
+
+def build_diet_history(post):
+    rows = []
+
+    # ── Commercial Diet History (dynamic table) ──
+    diet_types = post.getlist('diet_type[]')
+    diet_brands = post.getlist('diet_brand[]')
+    diet_products = post.getlist('diet_product[]')
+    diet_amounts = post.getlist('diet_amount[]')
+    diet_toppers = post.getlist('diet_topper[]')
+    diet_topper_amts = post.getlist('diet_topper_amount[]')
+    diet_meals = post.getlist('diet_meals[]')
+    diet_since = post.getlist('diet_since[]')
+    diet_reason = post.getlist('diet_reason_stopped[]')
+    for i in range(len(diet_types)):
+        if diet_types[i] and _at(diet_brands, i):
+            rows.append(CommercialDietHistory(
+                diet_type=diet_types[i],
+                brand=diet_brands[i],
+                product_details=_at(diet_products, i),
+                amount_per_day=_at(diet_amounts, i),
+                food_topper_details=_at(diet_toppers, i),
+                topper_amount_per_meal=_at(diet_topper_amts, i),
+                meals_per_day=_int_at(diet_meals, i),
+                fed_since=_at(diet_since, i),
+                reason_stopped=_at(diet_reason, i)
+            ))
+
+    # ── Homemade Diet History (dynamic table) ──
+    hd_ingredients = post.getlist('hd_ingredient[]')
+    hd_quantities = post.getlist('hd_quantity[]')
+    hd_preparations = post.getlist('hd_preparation[]')
+    hd_frequencies = post.getlist('hd_frequency[]')
+    hd_since = post.getlist('hd_since[]')
+    hd_reason = post.getlist('hd_reason_stopped[]')
+    for i in range(len(hd_ingredients)):
+        if hd_ingredients[i].strip():
+            rows.append(HomemadeDietHistory(
+                ingredient_food_item=hd_ingredients[i],
+                raw_quantity_per_day=_at(hd_quantities, i),
+                preparation_method=_at(hd_preparations, i),
+                feed_frequency_per_day=_int_at(hd_frequencies, i),
+                fed_since=_at(hd_since, i),
+                reason_stopped=_at(hd_reason, i)
+            ))
+
+    # ── Commercial Treat History (dynamic table) ──
+    ct_types = post.getlist('ct_type[]')
+    ct_brands = post.getlist('ct_brand[]')
+    ct_products = post.getlist('ct_product[]')
+    ct_quantities = post.getlist('ct_quantity[]')
+    ct_since = post.getlist('ct_since[]')
+    ct_reason = post.getlist('ct_reason_stopped[]')
+    for i in range(len(ct_types)):
+        if ct_types[i].strip():
+            rows.append(CommercialTreatHistory(
+                treat_type=ct_types[i],
+                brand=_at(ct_brands, i),
+                product_details=_at(ct_products, i),
+                quantity_per_day=_at(ct_quantities, i),
+                fed_since=_at(ct_since, i),
+                reason_stopped=_at(ct_reason, i)
+            ))
+
+    # ── Homemade Treat History (dynamic table) ──
+    treat_type_forms = post.getlist('treat_type_form[]')
+    treat_ingredients = post.getlist('treat_ingredient[]')
+    treat_preparations = post.getlist('treat_preparation[]')
+    treat_quantities = post.getlist('treat_quantity[]')
+    treat_since_list = post.getlist('treat_since[]')
+    treat_reason = post.getlist('treat_reason_stopped[]')
+    for i in range(len(treat_ingredients)):
+        if treat_ingredients[i].strip():
+            rows.append(HomemadeTreatHistory(
+                treat_type_form=_at(treat_type_forms, i),
+                ingredient=treat_ingredients[i],
+                preparation_method=_at(treat_preparations, i),
+                quantity_per_day=_at(treat_quantities, i),
+                fed_since=_at(treat_since_list, i),
+                reason_stopped=_at(treat_reason, i)
+            ))
+
+    # ── Supplements (dynamic table) ──
+    if post.get('supplements_given') == 'yes':
+        supp_brands = post.getlist('supplement_brand[]')
+        supp_forms = post.getlist('supplement_form[]')
+        supp_amounts = post.getlist('supplement_amount[]')
+        supp_per_day = post.getlist('supplement_per_day[]')
+        supp_since = post.getlist('supplement_since[]')
+        for i in range(len(supp_brands)):
+            if supp_brands[i].strip():
+                rows.append(Supplement(
+                    brand_name=supp_brands[i],
+                    form=_at(supp_forms, i),
+                    amount=_at(supp_amounts, i),
+                    per_day=_int_at(supp_per_day, i),
+                    fed_since=_at(supp_since, i)
+                ))
+
+    # ── Recent Diet Changes (dynamic table) ──
+    if post.get('diet_changed_2_3_months') == 'yes':
+        rdc_brands = post.getlist('rdc_brand[]')
+        rdc_products = post.getlist('rdc_product[]')
+        rdc_forms = post.getlist('rdc_form[]')
+        rdc_amounts = post.getlist('rdc_amount[]')
+        rdc_meals = post.getlist('rdc_meals[]')
+        rdc_start = post.getlist('rdc_start[]')
+        rdc_stop = post.getlist('rdc_stop[]')
+        rdc_reason = post.getlist('rdc_reason[]')
+        for i in range(len(rdc_products)):
+            if rdc_products[i].strip():
+                rows.append(RecentDietChange(
+                    brand=_at(rdc_brands, i),
+                    product_food_ingredient=rdc_products[i],
+                    form_type=_at(rdc_forms, i),
+                    amount_per_day=_at(rdc_amounts, i),
+                    meals_per_day=_int_at(rdc_meals, i),
+                    start_date=_at(rdc_start, i),
+                    stop_date=_at(rdc_stop, i),
+                    reason_stopped=_at(rdc_reason, i)
+                ))
+
+    # ── Diet Plan Preferences ──
+    rows.append(DietPlanPreferences(
+        preferences=','.join(post.getlist('diet_plan_preferences'))
+    ))
+    return rows
+
+
+def build_fitness(post):
+    rows = [FitnessActivity(
+        activity_level=post.get('activity_level', 'moderate'),
+        exercise_duration=post.get('exercise_duration', ''),
+        leash_walk_frequency=post.get('leash_walk_frequency', ''),
+        fenced_yard_access=post.get('fenced_yard') == 'yes',
+        urban_rural=post.get('urban_rural', ''),
+        travel_buddy=post.get('travel_buddy', ''),
+        travel_modes=post.get('travel_modes', ''),
+        exercise_types=','.join(post.getlist('exercise_types')),
+        training_show_dog=post.get('training_show_dog') == 'yes',
+        training_details=post.get('training_details', ''),
+        recent_activity_changes=post.get('recent_activity_changes') == 'yes',
+        activity_change_details=post.get('activity_change_details', ''),
+        increase_exercise_feasible=post.get('increase_exercise') == 'yes'
+    )]
+
+    # ── Activity Details (table Q28) ──
+    for act in ['run', 'walk', 'fetch', 'pulling', 'agility', 'swimming']:
+        duration = post.get(f'activity_{act}_duration', '')
+        freq = post.get(f'activity_{act}_frequency', '')
+        if duration or freq:
+            rows.append(ActivityDetail(
+                activity_type=act,
+                duration_distance=duration,
+                frequency_per_week=freq
+            ))
+
+    # ── Rehabilitation Therapy ──
+    rows.append(RehabilitationTherapy(
+        receives_therapy=post.get('receives_rehab') == 'yes',
+        therapy_types=','.join(post.getlist('rehab_therapies'))
+    ))
+    return rows
+
+
+def build_medical(post):
+    weight_amount = post.get('medical_weight_amount')
+    vomit_per_day = post.get('medical_vomit_per_day')
+    vomit_per_week = post.get('medical_vomit_per_week')
+    poops_per_day = post.get('medical_poops_per_day')
+    symptoms = post.getlist('medical_symptoms')
+
+    # Q40: Medication admin method
+    pill_pocket_details = post.get('pill_pocket_details', '')
+    food_treat_details = post.get('med_food_treat_details', '')
+    med_admin_str = ','.join(post.getlist('medication_admin'))
+    if pill_pocket_details:
+        med_admin_str += '|pill_pocket:' + pill_pocket_details
+    if food_treat_details:
+        med_admin_str += '|food_treat:' + food_treat_details
+
+    rows = [MedicalHistory(
+        weight_change=post.get('medical_weight_change') == 'yes',
+        weight_change_type=post.get('medical_weight_type', ''),
+        weight_change_amount_kg=float(weight_amount) if weight_amount else None,
+        weight_change_period=post.get('medical_weight_period', ''),
+        difficulty_chewing='difficulty_chewing' in symptoms,
+        difficulty_swallowing='difficulty_swallowing' in symptoms,
+        excessive_salivation='excessive_salivation' in symptoms,
+        symptom_details=post.get('symptom_details', ''),
+        vomiting_per_day=int(vomit_per_day) if vomit_per_day else None,
+        vomiting_per_week=int(vomit_per_week) if vomit_per_week else None,
+        vomiting_colour=post.get('medical_vomit_colour', ''),
+        vomiting_since=post.get('medical_vomit_since', ''),
+        urination_changed=post.get('medical_urination_changed') == 'yes',
+        urination_direction=post.get('medical_urination_direction', ''),
+        urine_colour=post.get('medical_urine_colour', ''),
+        urine_change_since=post.get('medical_urine_since', ''),
+        drinking_changed=post.get('medical_drinking_changed') == 'yes',
+        drinking_direction=post.get('medical_drinking_direction', ''),
+        drinking_change_since=post.get('medical_drinking_since', ''),
+        stool_quality_changed=post.get('medical_stool_changed') == 'yes',
+        stool_colour=post.get('medical_stool_colour', ''),
+        poops_per_day=int(poops_per_day) if poops_per_day else None,
+        stool_types=','.join(post.getlist('medical_stool_types')),
+        stool_change_since=post.get('medical_stool_since', ''),
+        medication_admin_method=med_admin_str
+    )]
+
+    # ── Q41: Adverse Reactions (dynamic table) ──
+    if post.get('has_adverse_reactions') == 'yes':
+        ar_brands = post.getlist('ar_brand[]')
+        ar_products = post.getlist('ar_product[]')
+        ar_forms = post.getlist('ar_form[]')
+        ar_since = post.getlist('ar_since[]')
+        ar_symptoms = post.getlist('ar_symptoms[]')
+        for i in range(len(ar_products)):
+            if ar_products[i].strip():
+                rows.append(AdverseReaction(
+                    brand=_at(ar_brands, i),
+                    product_ingredient_medication=ar_products[i],
+                    form_type=_at(ar_forms, i),
+                    fed_since=_at(ar_since, i),
+                    reaction_symptoms=_at(ar_symptoms, i)
+                ))
+
+    # ── Q43: Chronic Condition ──
+    rows.append(ChronicCondition(
+        has_chronic=post.get('has_chronic_condition') == 'yes',
+        details=post.get('chronic_condition_details', '')
+    ))
+
+    # ── Vaccination Status ──
+    rows.append(VaccinationStatus(
+        yearly_vaccinations=post.get('vacc_yearly') == 'yes',
+        deworming=post.get('vacc_deworming') == 'yes',
+        topical_tick_flea=post.get('vacc_topical_tick', 'no'),
+        oral_tick_flea=post.get('vacc_oral_tick', 'no')
+    ))
+    return rows
+
+
+def build_primary_vet(post):
+    return [PrimaryVetInfo(
+        vet_name=post.get('vet_name'),
+        practice_name_location=post.get('vet_practice'),
+        clinic_phone=post.get('vet_phone'),
+        email=post.get('vet_email')
+    )]
+
+
+def build_consent(post):
+    return ConsentForm(agreed=post.get('consent_agreed') == 'yes')
+
+
+# Order matches the sections of form.html
+SECTION_BUILDERS = [
+    ('household', build_household),
+    ('feeding', build_feeding),
+    ('preferences', build_preferences),
+    ('food_storage', build_food_storage),
+    ('diet_history', build_diet_history),
+    ('fitness', build_fitness),
+    ('medical', build_medical),
+    ('primary_vet', build_primary_vet),
+]
+
+
+def validate_intake(post):
+    """
+    Parse a submission and list the problems that would stop it saving (no
+    DB access). Returns (graph, errors); graph is None if it could not be parsed.
+    """
+    graph = None
+    errors = []
+    for field, label in [('parent_name', 'Your name'), ('parent_email', 'Your email'),
+                         ('parent_phone', 'Your phone number'), ('pet_name', "Your pet's name")]:
+        if not post.get(field, '').strip():
+            errors.append(f'{label} is required.')
+    try:
+        validate_email(post.get('parent_email', ''))
+        graph = parse_intake_submission(post)
+        # Catch values the database would refuse (e.g. a non-numeric weight)
+        for obj in [graph.parent, graph.pet, *graph.rows]:
+            for field in obj._meta.concrete_fields:
+                if field.is_relation or field.primary_key or not field.editable:
+                    continue
+                value = getattr(obj, field.attname)
+                if value is None and not field.null:
+                    errors.append(f'{capfirst(field.verbose_name)} is missing.')
+                field.to_python(value)
+    except ValidationError as exc:
+        errors.extend(exc.messages)
+    except ValueError:
+        errors.append('Some numbers in the form could not be read.')
+    return graph, errors
+
+
+def parse_intake_submission(post):
+    """Turn a submitted intake form into an unsaved CaseGraph (no DB access)"""
+    rows = []
+    for _, builder in SECTION_BUILDERS:
+        rows.extend(builder(post))
+    return CaseGraph(
+        parent=build_parent(post),
+        pet=build_pet(post),
+        rows=rows,
+        consent=build_consent(post),
+    )
@@ -0,0 +1,135 @@
+"""
+Synthetic cases for load tests and capacity planning (manage.py generate_cases).
+
+Every case is fully populated: the intake sections come from
+sample_intake_post() (so they track the form), and a share of cases also get
+the vet's side: clinical history, conditions, medications, surgeries,
+imaging and uploads. Uploads point at a small pool of shared blobs, the way
+repeated lab-report templates deduplicate in production.
+
+Case `i` of seed `s` is always the same case, whatever the batch size, and a
+rerun only adds the cases that are missing.
+"""
+import random
+from django.core.files.base import ContentFile
+from django.db import transaction
+from .models import (
+    PetParent, ClinicalHistory, ClinicalCondition, LongTermMedication, SurgicalHistory,
+    DiagnosticImaging, UploadBlob, VetUpload
+)
+from .sample_data import sample_intake_post
+from .storage import blob_sha256, blob_storage, hash_content
+from .submission import parse_intake_submission, save_case_graphs
+
+CONDITIONS = [
+    ('Pancreatitis', 'Vomiting, abdominal pain', 'Maropitant', '1 mg/kg daily', '5 days'),
+    ('Chronic kidney disease', 'Polyuria, weight loss', 'Benazepril', '0.5 mg/kg daily', 'Ongoing'),
+    ('Atopic dermatitis', 'Pruritus', 'Oclacitinib', '0.4 mg/kg BID', '14 days'),
+    ('Diabetes mellitus', 'Polydipsia', 'Insulin', '0.5 U/kg BID', 'Ongoing'),
+    ('Osteoarthritis', 'Stiffness', 'Carprofen', '2 mg/kg BID', 'Ongoing'),
+    ('IBD', 'Chronic diarrhoea', 'Prednisolone', '1 mg/kg daily', '6 weeks'),
+]
+MEDICATIONS = [('Omega-3', '1 capsule', 'daily'), ('Glucosamine', '500 mg', 'daily'),
+               ('Probiotic', '1 sachet', 'daily'), ('Levothyroxine', '0.02 mg/kg', 'BID')]
+SURGERIES = ['Spay', 'Neuter', 'Dental extraction', 'Cruciate repair', 'Mass removal', 'Gastropexy']
+IMAGING = ['Abdominal ultrasound', 'Thoracic radiograph', 'Echocardiogram', 'CT scan']
+UPLOAD_CATEGORIES = ['blood_work', 'diagnostic_imaging']
+BLOB_POOL = 25
+
+
+def case_rng(seed, index):
+    return random.Random(seed * 1_000_003 + index)
+
+
+def synthetic_email(seed, index):
+    return f'synthetic-{seed}-{index}@example.com'
+
+
+def shared_blobs(count=BLOB_POOL):
+    """(name, size) of a few small PDF-like files, stored once in blob storage"""
+    blobs = []
+    for i in range(count):
+        content = ContentFile(b'%PDF-1.4\n% synthetic lab report ' + str(i).encode() * 64, name=f'report{i}.pdf')
+        content.sha256 = hash_content(content)
+        # generate_batch counts the references as uploads use the blob
+        content.blob_refs = 0
+        blobs.append((blob_storage.save(content.name, content), content.size))
+    return blobs
+
+
+def _vet_rows(rng, pet, blobs, max_rows):
+    """Unsaved vet-side rows for one pet: (history, conditions, other rows)"""
+    history = ClinicalHistory(pet=pet, additional_notes=rng.choice(['', 'Stable', 'Recheck in 4 weeks']))
+    conditions = [
+        ClinicalCondition(condition_disease=c[0], clinical_symptoms=c[1], medication_name=c[2],
+                          dose_frequency=c[3], treatment_length=c[4])
+        for c in rng.sample(CONDITIONS, rng.randint(0, min(max_rows, len(CONDITIONS))))
+    ]
+    rows = [
+        LongTermMedication(pet=pet, medication_name=m[0], dose=m[1], frequency=m[2])
+        for m in rng.sample(MEDICATIONS, rng.randint(0, min(max_rows, len(MEDICATIONS))))
+    ]
+    rows += [SurgicalHistory(pet=pet, surgery_name=rng.choice(SURGERIES), date_performed=f'{rng.randint(2015, 2025)}')
+             for _ in range(rng.randint(0, max_rows))]
+    rows += [DiagnosticImaging(pet=pet, imaging_type=rng.choice(IMAGING), date_performed=f'{rng.randint(2020, 2025)}')
+             for _ in range(rng.randint(0, max_rows))]
+    if blobs:
+        for _ in range(rng.randint(0, max_rows)):
+            name, size = rng.choice(blobs)
+            rows.append(VetUpload(
+                pet=pet, category=rng.choice(UPLOAD_CATEGORIES), file=name, size=size,
+                sha256=blob_sha256(name), content_type='application/pdf',
+                original_filename=f'{rng.choice(["cbc", "chemistry", "ultrasound", "urinalysis"])}.pdf',
+            ))
+    return history, conditions, rows
+
+
+def generate_batch(seed, indexes, max_rows=3, vet_share=0.5, blobs=None):
+    """Create the cases for `indexes` in one transaction; returns (cases, child rows) created"""
+    graphs, rngs = [], []
+    for index in indexes:
+        rng = case_rng(seed, index)
+        post = sample_intake_post(index=index, rng=rng, max_rows=max_rows)
+        post['parent_email'] = synthetic_email(seed, index)
+        graphs.append(parse_intake_submission(post))
+        rngs.append(rng)
+
+    with transaction.atomic():
+        save_case_graphs(graphs)
+        histories, conditions, by_model = [], [], {}
+        for graph, rng in zip(graphs, rngs):
+            if rng.random() >= vet_share:
+                continue
+            history, case_conditions, rows = _vet_rows(rng, graph.pet, blobs, max_rows)
+            histories.append(history)
+            conditions.append(case_conditions)
+            for row in rows:
+                by_model.setdefault(type(row), []).append(row)
+        ClinicalHistory.objects.bulk_create(histories)
+        for history, case_conditions in zip(histories, conditions):
+            for condition in case_conditions:
+                condition.clinical_history = history
+        ClinicalCondition.objects.bulk_create([c for case_conditions in conditions for c in case_conditions])
+        for model, rows in by_model.items():
+            model.objects.bulk_create(rows)
+        # One refcount bump per shared blob, not per upload
+        refs = {}
+        for upload in by_model.get(VetUpload, []):
+            refs[upload.file.name] = refs.get(upload.file.name, 0) + 1
+        sizes = dict(blobs or [])
+        for name, count in refs.items():
+            UploadBlob.acquire(name, sizes[name], count=count)
+
+    child_rows = (sum(len(graph.rows) + 1 for graph in graphs) + len(histories)
+                  + sum(map(len, conditions)) + sum(map(len, by_model.values())))
+    return len(graphs), child_rows
+
+
+def missing_indexes(seed, count):
+    """Indexes below `count` whose case isn't in the database yet"""
+    prefix = f'synthetic-{seed}-'
+    present = {
+        int(email[len(prefix):].split('@')[0])
+        for email in PetParent.objects.filter(email__startswith=prefix).values_list('email', flat=True).iterator()
+    }
+    return (i for i in range(count) if i not in present)
@@ -1,3 +1,1225 @@
-from django.test import TestCase
+import csv
+import gzip
+import hashlib
+import inspect
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+import zlib
+from datetime import timedelta
+from io import StringIO
+from itertools import islice
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.db import IntegrityError, OperationalError, connection
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.signals import request_started
+from django.core.management.base import CommandError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, LiveServerTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .benchmarks import PRODUCTION_STORAGES, SCENARIOS, run_benchmarks, run_page_weight, seed_cases
+from .case_cache import cache_stats
+from .case_pdf import ARTIFACT_DIR, case_pdf_filename, render_artifact, render_case_pdf
+from .checks import check_case_search_triggers
+from .dashboard import (
+    SEARCH_TABLE, SEARCH_TRIGGERS, fts_available, keyset_page, missing_search_triggers, rebuild_search_index,
+    search_cases,
+)
+from .db_tuning import DEFAULT_PRAGMAS, current_pragmas, sqlite_pragmas
+from .instrumentation import QueryRecorder, request_metrics
+from .loaders import CASE_GRAPH_QUERIES, load_case_graph
+from .loadtest import LoadTest, generated_posts, with_emails
+from .models import (
+    PetParent, Pet, CaseIdSequence, CaseVersion, CommercialDietHistory, Supplement, ConsentForm,
+    ClinicalHistory, ClinicalCondition, LongTermMedication, VetUpload, UploadSession, UploadBlob,
+    FoodPreferences, MedicalHistory, DraftSection
+)
+from .metrics import SUBMISSIONS, exposition
+from .middleware import BothModesMiddleware
+from .multiselect import choice_counts, cohort, has_choice
+from .routers import PINNED_COOKIE, ReplicaRouter, use_replica
+from .sample_data import sample_intake_post
+from .storage import ContentAddressedStorage
+from .submission import parse_intake_submission
+from .synthetic import generate_batch, missing_indexes, shared_blobs
+from . import bulk_import, dashboard, drafts, journal, uploads
+
+
+def create_case(index=0, rows=2):
+    """A fully populated case, including the vet's clinical history"""
+    post = sample_intake_post(index=index, rows=rows)
+    post['supplements_given'] = 'yes'
+    post['diet_changed_2_3_months'] = 'yes'
+    post['has_adverse_reactions'] = 'yes'
+    pet = parse_intake_submission(post).save().pets.get()
+    clinical = ClinicalHistory.objects.create(pet=pet, additional_notes='Stable')
+    for i in range(rows):
+        ClinicalCondition.objects.create(
+            clinical_history=clinical, condition_disease=f'Condition {i}', clinical_symptoms='-',
+            medication_name='-', dose_frequency='-', treatment_length='-'
+        )
+        LongTermMedication.objects.create(pet=pet, medication_name=f'Med {i}', dose='1', frequency='daily')
+        for category in ['blood_work', 'diagnostic_imaging']:
+            VetUpload.objects.create(
+                pet=pet, category=category, file=f'vet_uploads/2026/01/report{i}.pdf',
+                original_filename=f'report{i}.pdf'
+            )
+    return pet
+
+
+class IntakeSubmissionTests(TestCase):
+
+    def test_post_creates_full_case(self):
+        post = sample_intake_post(index=1, rows=2)
+        post['supplements_given'] = 'yes'
+        response = self.client.post(reverse('intake_form'), dict(post.lists()))
+        self.assertRedirects(response, reverse('success'))
+
+        pet = Pet.objects.get(owner__email='owner1@example.com')
+        self.assertEqual(CommercialDietHistory.objects.filter(pet=pet).count(), 2)
+        self.assertEqual(Supplement.objects.filter(pet=pet).count(), 2)
+        self.assertTrue(pet.household.pk)
+        self.assertTrue(pet.medical_history.pk)
+        self.assertTrue(ConsentForm.objects.get(pet_parent=pet.owner).agreed)
+
+    def test_parse_does_not_touch_database(self):
+        with self.assertNumQueries(0):
+            parse_intake_submission(sample_intake_post(index=2, rows=3))
+
+    def test_failed_save_leaves_no_partial_case(self):
+        # Primary vet name is NOT NULL; it is written after the parent, pet and diet rows
+        post = sample_intake_post(index=3, rows=2)
+        del post['vet_name']
+        with self.assertRaises(IntegrityError):
+            parse_intake_submission(post).save()
+        self.assertFalse(PetParent.objects.exists())
+        self.assertFalse(CommercialDietHistory.objects.exists())
+
+
+class CaseIdSequenceTests(TestCase):
+
+    def _parent(self, n, **kwargs):
+        return PetParent.objects.create(name=f'Owner {n}', email=f'o{n}@example.com', phone='1', **kwargs)
+
+    def test_ids_are_sequential_per_year(self):
+        first, second = self._parent(1), self._parent(2)
+        prefix = first.case_id.rsplit('-', 1)[0]
+        self.assertEqual(first.case_id, f'{prefix}-0001')
+        self.assertEqual(second.case_id, f'{prefix}-0002')
+
+    def test_counter_starts_after_legacy_random_ids(self):
+        legacy = self._parent(1, case_id='PNV-2019-7312')
+        self.assertEqual(legacy.case_id, 'PNV-2019-7312')
+        self.assertEqual(CaseIdSequence.next_case_id(year=2019), 'PNV-2019-7313')
+        self.assertEqual(CaseIdSequence.next_case_id(year=2019), 'PNV-2019-7314')
+
+
+class CaseGraphLoaderTests(TestCase):
+
+    def test_load_case_graph_query_count(self):
+        pet = create_case(index=1, rows=3)
+        with self.assertNumQueries(CASE_GRAPH_QUERIES):
+            loaded = load_case_graph(pet.pk)
+        with self.assertNumQueries(0):
+            loaded.household.pet_housed
+            loaded.owner.consent.agreed
+            list(loaded.clinical_history.conditions.all())
+            loaded.supplements.exists()
+
+    def test_case_pages_do_not_grow_with_row_count(self):
+        cache.clear()
+        small, large = create_case(index=1, rows=1), create_case(index=2, rows=4)
+        for name in ['case_detail', 'case_pdf']:
+            with self.subTest(name=name):
+                # +1 for the case version lookup in front of the page cache
+                with self.assertNumQueries(CASE_GRAPH_QUERIES + 1):
+                    self.client.get(reverse(name, args=[small.pk]))
+                with self.assertNumQueries(CASE_GRAPH_QUERIES + 1):
+                    response = self.client.get(reverse(name, args=[large.pk]))
+                self.assertContains(response, large.owner.case_id)
+
+
+class CaseDashboardTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.parents = []
+        for i in range(7):
+            parent = PetParent.objects.create(name=f'Owner {i}', email=f'owner{i}@example.com', phone='1')
+            Pet.objects.create(owner=parent, name=f'Pet{i}', dob_age='2', species='dog', breed='Indie',
+                               sex='male', body_condition='ideal', consultation_goals='-')
+            cls.parents.append(parent)
+        # Ties on created_at must not drop or repeat rows across pages
+        PetParent.objects.filter(pk__in=[p.pk for p in cls.parents[2:5]]).update(
+            created_at=cls.parents[2].created_at
+        )
+
+    def test_keyset_pages_cover_every_case_once(self):
+        seen, cursor = [], None
+        while True:
+            page, cursor = keyset_page(PetParent.objects.all(), cursor, size=3)
+            seen.extend(p.pk for p in page)
+            if not cursor:
+                break
+        self.assertEqual(sorted(seen), sorted(p.pk for p in self.parents))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_search_by_email_case_id_and_pet_name(self):
+        parent = self.parents[3]
+        for q in ['owner3@example', parent.case_id, 'Pet3']:
+            with self.subTest(q=q):
+                self.assertEqual(list(search_cases(PetParent.objects.all(), q)), [parent])
+
+    def test_search_index_follows_pet_renames(self):
+        Pet.objects.filter(owner=self.parents[1]).update(name='Biscuit')
+        self.assertEqual(list(search_cases(PetParent.objects.all(), 'iscui')), [self.parents[1]])
+        self.assertFalse(search_cases(PetParent.objects.all(), 'Pet1').exists())
+
+    def test_search_triggers_survive_migrations_and_can_be_rebuilt(self):
+        # A migration that rebuilds pet/petparent on SQLite drops their triggers
+        self.assertEqual(missing_search_triggers(), [])
+        self.assertEqual(check_case_search_triggers(None, databases=['default']), [])
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER intake_form_casesearch_pet_au')
+        self.assertEqual([w.id for w in check_case_search_triggers(None, databases=['default'])],
+                         ['intake_form.W001'])
+        Pet.objects.filter(owner=self.parents[1]).update(name='Biscuit')
+        self.assertFalse(search_cases(PetParent.objects.all(), 'iscui').exists())
+
+        call_command('rebuild_case_search', if_missing=True, stdout=StringIO())
+        self.assertEqual(missing_search_triggers(), [])
+        self.assertEqual(len(SEARCH_TRIGGERS), 6)
+        self.assertEqual(list(search_cases(PetParent.objects.all(), 'iscui')), [self.parents[1]])
+
+    def test_dashboard_pages_through_results(self):
+        response = self.client.get(reverse('case_list'))
+        self.assertEqual(len(response.context['parents']), 7)
+        self.assertIsNone(response.context['next_cursor'])
+        self.assertContains(response, 'Cases Shown')
+
+        # A search counts its matches, not every case
+        response = self.client.get(reverse('case_list'), {'q': self.parents[1].case_id})
+        self.assertEqual(list(response.context['parents']), [self.parents[1]])
+        self.assertContains(response, 'Matches Shown')
+
+    def test_fts_table_is_looked_for_again_until_found(self):
+        dashboard._fts_aliases.clear()
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE {SEARCH_TABLE}')
+        self.assertFalse(fts_available())
+        rebuild_search_index()
+        self.assertTrue(fts_available(PetParent.objects.all().db))
+
+
+class CaseCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.pet = create_case(index=1, rows=1)
+        self.url = reverse('case_detail', args=[self.pet.pk])
+
+    def test_repeat_views_are_served_from_cache(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertContains(response, self.pet.name)
+        self.assertGreaterEqual(cache_stats()['case_detail']['hits'], 1)
+
+    def test_edits_to_any_section_invalidate(self):
+        self.client.get(self.url)
+        household = self.pet.household
+        household.feeder_name = 'Ravi Kumar'
+        household.save()
+        self.assertContains(self.client.get(self.url), 'Ravi Kumar')
+
+        LongTermMedication.objects.create(pet=self.pet, medication_name='Gabapentin', dose='1', frequency='bid')
+        self.assertContains(self.client.get(reverse('case_pdf', args=[self.pet.pk])), 'Gabapentin')
+
+        before = CaseVersion.objects.get(pet=self.pet).version
+        ClinicalCondition.objects.get(clinical_history__pet=self.pet).delete()
+        self.assertEqual(CaseVersion.objects.get(pet=self.pet).version, before + 1)
+
+    def test_owner_changes_invalidate_their_pets(self):
+        self.client.get(self.url)
+        owner = self.pet.owner
+        owner.name = 'Meera Iyer'
+        owner.save()
+        self.assertContains(self.client.get(self.url), 'Meera Iyer')
+
+    def test_deleting_a_case_does_not_recreate_versions(self):
+        self.pet.owner.delete()
+        self.assertFalse(CaseVersion.objects.exists())
+
+    def test_reopening_an_unchanged_case_is_a_304(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.assertTrue(response.has_header('Last-Modified'))
+        with self.assertNumQueries(1):
+            cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], response['ETag'])
+
+        household = self.pet.household
+        household.feeder_name = 'Ravi Kumar'
+        household.save()
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertContains(changed, 'Ravi Kumar')
+        self.assertNotEqual(changed['ETag'], response['ETag'])
+
+    def test_case_list_revalidates_until_a_case_changes(self):
+        etag = self.client.get(reverse('case_list'))['ETag']
+        self.assertEqual(self.client.get(reverse('case_list'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        create_case(index=2, rows=1)
+        self.assertEqual(self.client.get(reverse('case_list'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_case_pages_are_compressed(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertIn(self.pet.name, gzip.decompress(response.content).decode())
+        revalidated = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        # Below COMPRESSION_MIN_BYTES: sent as is
+        self.assertFalse(self.client.get(reverse('success'), HTTP_ACCEPT_ENCODING='gzip').has_header('Content-Encoding'))
+
+
+def pdf_text(content):
+    """Concatenated text of every page's content stream"""
+    streams = re.findall(rb'stream\n(.*?)\nendstream', content, re.S)
+    return b''.join(zlib.decompress(stream) for stream in streams).decode('cp1252')
+
+
+class CasePdfTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        settings_override = override_settings(MEDIA_ROOT=media, CASE_PDF_WORKERS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.pet = create_case(index=1, rows=2)
+        self.url = reverse('case_pdf_file', args=[self.pet.pk])
+
+    def test_pdf_contains_the_case(self):
+        content = render_case_pdf(load_case_graph(self.pet.pk))
+        self.assertTrue(content.startswith(b'%PDF-1.4'))
+        text = pdf_text(content)
+        for expected in [self.pet.owner.case_id, self.pet.name, 'Condition 1', 'report0.pdf']:
+            self.assertIn(expected, text)
+
+    def test_long_cases_flow_onto_more_pages(self):
+        short = render_case_pdf(load_case_graph(self.pet.pk))
+        long = render_case_pdf(load_case_graph(create_case(index=2, rows=40).pk))
+        pages = lambda content: int(re.search(rb'/Type /Pages .*?/Count (\d+)', content).group(1))
+        self.assertGreater(pages(long), pages(short))
+
+    def test_artifact_is_reused_until_the_case_changes(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        first = b''.join(response.streaming_content)
+
+        # Pet + version lookups only; nothing is re-rendered
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(b''.join(response.streaming_content), first)
+
+        household = self.pet.household
+        household.feeder_name = 'Ravi Kumar'
+        household.save()
+        self.assertIn('Ravi Kumar', pdf_text(b''.join(self.client.get(self.url).streaming_content)))
+        _, files = default_storage.listdir(f'{ARTIFACT_DIR}/{self.pet.pk}')
+        self.assertEqual(len(files), 1)
+
+    def test_late_render_of_an_old_version_keeps_the_newer_pdf(self):
+        old = CaseVersion.objects.get(pet=self.pet).version
+        self.pet.household.save()
+        newer = render_artifact(self.pet.pk)
+        with mock.patch('intake_form.case_pdf.current_version', return_value=old):
+            render_artifact(self.pet.pk)
+        self.assertTrue(default_storage.exists(newer))
+
+    def test_export_skips_a_case_it_cannot_render(self):
+        unversioned = create_case(index=2, rows=1)
+        CaseVersion.objects.filter(pet=unversioned).delete()
+        output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output)
+        with self.assertRaisesMessage(CommandError, f'Not exported: {unversioned.pk}'):
+            call_command('export_case_pdfs', output=output, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(os.listdir(output), [case_pdf_filename(self.pet)])
+
+
+class VetFormSyncTests(TestCase):
+
+    def setUp(self):
+        self.pet = create_case(index=1, rows=3)
+        self.url = reverse('vet_form', args=[self.pet.pk])
+
+    def _post_data(self, medications, with_ids=True):
+        conditions = list(self.pet.clinical_history.conditions.all())
+        data = {
+            'additional_notes': self.pet.clinical_history.additional_notes,
+            'cond_id[]': [c.pk for c in conditions],
+            'cond_disease[]': [c.condition_disease for c in conditions],
+            'cond_symptoms[]': [c.clinical_symptoms for c in conditions],
+            'cond_medication[]': [c.medication_name for c in conditions],
+            'cond_dose[]': [c.dose_frequency for c in conditions],
+            'cond_length[]': [c.treatment_length for c in conditions],
+            'med_id[]': [pk or '' for pk, _ in medications],
+            'med_name[]': [name for _, name in medications],
+            'med_dose[]': ['1'] * len(medications),
+            'med_frequency[]': ['daily'] * len(medications),
+        }
+        if not with_ids:
+            del data['cond_id[]'], data['med_id[]']
+        return data
+
+    def _medications(self):
+        return list(LongTermMedication.objects.filter(pet=self.pet).order_by('pk').values_list('pk', 'medication_name'))
+
+    def test_unchanged_form_writes_nothing(self):
+        before = self._medications()
+        self.assertContains(self.client.get(self.url), f'name="med_id[]" value="{before[0][0]}"')
+        version = CaseVersion.objects.get(pet=self.pet).version
+        for with_ids in [True, False]:
+            self.client.post(self.url, self._post_data(before, with_ids=with_ids))
+            self.assertEqual(self._medications(), before)
+        self.assertEqual(CaseVersion.objects.get(pet=self.pet).version, version)
+
+    def test_only_changed_rows_are_written(self):
+        (keep_pk, _), (edit_pk, _), (drop_pk, _) = self._medications()
+        condition_pks = set(ClinicalCondition.objects.values_list('pk', flat=True))
+        version = CaseVersion.objects.get(pet=self.pet).version
+
+        self.client.post(self.url, self._post_data(
+            [(keep_pk, 'Med 0'), (edit_pk, 'Gabapentin'), (None, 'Omega-3'), (None, '')]
+        ))
+        after = dict(self._medications())
+        self.assertEqual(after[keep_pk], 'Med 0')
+        self.assertEqual(after[edit_pk], 'Gabapentin')
+        self.assertNotIn(drop_pk, after)
+        self.assertEqual(sorted(after.values()), ['Gabapentin', 'Med 0', 'Omega-3'])
+        self.assertEqual(set(ClinicalCondition.objects.values_list('pk', flat=True)), condition_pks)
+        self.assertGreater(CaseVersion.objects.get(pet=self.pet).version, version)
+
+
+class ChunkedUploadTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        settings_override = override_settings(MEDIA_ROOT=media, VET_UPLOAD_WORKERS=0, VET_UPLOAD_CHUNK_SIZE=1000)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.pet = create_case(index=1, rows=1)
+        self.content = b'%PDF-1.4\n' + bytes(range(256)) * 10
+
+    def _start(self):
+        response = self.client.post(reverse('upload_start', args=[self.pet.pk]), {
+            'category': 'blood_work', 'filename': 'cbc.pdf', 'size': len(self.content),
+        })
+        self.assertEqual(response.status_code, 201)
+        return response.json()['url']
+
+    def _patch(self, url, offset, end):
+        return self.client.patch(url, self.content[offset:end], content_type='application/offset+octet-stream',
+                                 headers={'Upload-Offset': str(offset)})
+
+    def test_upload_resumes_and_is_hashed_incrementally(self):
+        url = self._start()
+        self.assertEqual(self._patch(url, 0, 1000).json()['offset'], 1000)
+
+        # A retried or out-of-order chunk is refused with the offset to resume from
+        response = self._patch(url, 500, 1500)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '1000')
+
+        # A restarted process rebuilds the running hash from the partial file
+        uploads._hashers.clear()
+        self._patch(url, 1000, 2000)
+        self.assertEqual(self.client.head(url)['Upload-Offset'], '2000')
+        with self.captureOnCommitCallbacks(execute=True):
+            state = self._patch(url, 2000, len(self.content)).json()
+
+        upload = VetUpload.objects.get(pk=state['upload_id'])
+        self.assertEqual(upload.sha256, hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(upload.file.read(), self.content)
+        self.assertEqual(upload.content_type, 'application/pdf')
+        self.assertFalse(uploads.partial_path(UploadSession.objects.get()).exists())
+
+    def test_one_writer_per_session_and_the_file_is_moved_not_copied(self):
+        url = self._start()
+        session = UploadSession.objects.get()
+        # Another process is mid-chunk: wait, don't write over it
+        UploadSession.objects.filter(pk=session.pk).update(writer=uuid.uuid4())
+        response = self._patch(url, 0, 1000)
+        self.assertEqual((response.status_code, response['Retry-After']), (409, '1'))
+        # ...unless that writer has been gone longer than the lease
+        UploadSession.objects.filter(pk=session.pk).update(
+            updated_at=timezone.now() - timedelta(seconds=uploads.CHUNK_LEASE_SECONDS + 1))
+        self.assertEqual(self._patch(url, 0, 1000).status_code, 200)
+        self._patch(url, 1000, 2000)
+
+        inode = os.stat(uploads.partial_path(session)).st_ino
+        with self.captureOnCommitCallbacks(execute=True):
+            state = self._patch(url, 2000, len(self.content)).json()
+        upload = VetUpload.objects.get(pk=state['upload_id'])
+        self.assertEqual(os.stat(upload.file.path).st_ino, inode)
+        self.assertIsNone(UploadSession.objects.get().writer)
+
+    def test_oversized_chunks_and_unknown_categories_are_refused(self):
+        url = self._start()
+        self.assertEqual(self._patch(url, 0, 1001).status_code, 413)
+        response = self.client.post(reverse('upload_start', args=[self.pet.pk]),
+                                    {'category': 'x-ray', 'filename': 'a.png', 'size': 10})
+        self.assertEqual(response.status_code, 400)
+
+    def test_abandoned_sessions_are_purged(self):
+        url = self._start()
+        self._patch(url, 0, 1000)
+        abandoned = UploadSession.objects.get()
+        # Its hasher is dropped once another session stores one after the lease has run out
+        later = time.monotonic() + uploads.CHUNK_LEASE_SECONDS + 1
+        with mock.patch('intake_form.uploads.time.monotonic', return_value=later):
+            self._patch(self._start(), 0, 1000)
+        self.assertNotIn(abandoned.pk, uploads._hashers)
+
+        UploadSession.objects.filter(pk=abandoned.pk).update(updated_at=timezone.now() - timedelta(days=8))
+        out = StringIO()
+        call_command('purge_upload_sessions', stdout=out)
+        self.assertEqual(out.getvalue().strip(), '1 upload sessions deleted')
+        self.assertFalse(UploadSession.objects.filter(pk=abandoned.pk).exists())
+        self.assertFalse(uploads.partial_path(abandoned).exists())
+        self.assertEqual(UploadSession.objects.count(), 1)
+
+
+class BlobStorageTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        settings_override = override_settings(MEDIA_ROOT=media, VET_UPLOAD_WORKERS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.pets = [create_case(index=i, rows=0) for i in range(2)]
+        self.report = b'%PDF-1.4 same CBC report'
+
+    def _upload(self, pet, name='cbc.pdf'):
+        return VetUpload.objects.create(pet=pet, category='blood_work', original_filename=name,
+                                        file=SimpleUploadedFile(name, self.report))
+
+    def test_duplicates_share_one_blob_until_the_last_reference_goes(self):
+        first = self._upload(self.pets[0])
+        with mock.patch.object(ContentAddressedStorage, '_save', side_effect=AssertionError('rewrote blob')):
+            second = self._upload(self.pets[1], name='CBC copy.pdf')
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual(first.sha256, hashlib.sha256(self.report).hexdigest())
+        self.assertEqual(UploadBlob.objects.get().refcount, 2)
+
+        storage = first.file.storage
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(storage.exists(second.file.name))
+        self.assertEqual(UploadBlob.objects.get().refcount, 1)
+
+        # Cascading deletes release their references too
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pets[1].owner.delete()
+        self.assertFalse(storage.exists(second.file.name))
+        self.assertFalse(UploadBlob.objects.exists())
+
+    def test_blob_taken_again_before_its_removal_runs_is_kept(self):
+        first = self._upload(self.pets[0])
+        with self.captureOnCommitCallbacks() as callbacks:
+            first.delete()
+        # Same report uploaded again after the last release, before the removal ran
+        second = self._upload(self.pets[1])
+        for callback in callbacks:
+            callback()
+        self.assertTrue(second.file.storage.exists(second.file.name))
+        blob = UploadBlob.objects.get()
+        self.assertEqual((blob.refcount, blob.size), (1, len(self.report)))
+
+
+class MultiSelectChoiceTests(TestCase):
+
+    def setUp(self):
+        self.pets = [create_case(index=i, rows=0) for i in range(3)]
+        for pet, food, stool in zip(self.pets, ['raw,kibble', 'raw', 'kibble'], ['soft', 'firm', 'soft']):
+            FoodPreferences.objects.filter(pet=pet).update(current_food_preferences=food)
+            MedicalHistory.objects.filter(pet=pet).update(stool_types=stool)
+            # update() skips signals; a save() resyncs the choice rows
+            FoodPreferences.objects.get(pet=pet).save()
+            MedicalHistory.objects.get(pet=pet).save()
+
+    def test_intake_submission_indexes_choices(self):
+        # Sections are bulk-created on submit, without post_save
+        pet = create_case(index=5, rows=0)
+        history = MedicalHistory.objects.get(pet=pet)
+        stored = set(pet.choices.filter(field='medical_history__stool_types').values_list('value', flat=True))
+        self.assertTrue(stored)
+        self.assertEqual(stored, set(history.stool_types.split(',')))
+
+    def test_cohort_queries(self):
+        raw_soft = cohort(food_preferences__current_food_preferences='raw', medical_history__stool_types='soft')
+        self.assertEqual(list(raw_soft), [self.pets[0]])
+        soft_or_firm_kibble = Pet.objects.filter(
+            has_choice('food_preferences__current_food_preferences', 'kibble'),
+            has_choice('medical_history__stool_types', 'soft', 'firm'),
+        )
+        self.assertEqual(set(soft_or_firm_kibble), {self.pets[0], self.pets[2]})
+        self.assertEqual(choice_counts('food_preferences__current_food_preferences'), {'kibble': 2, 'raw': 2})
+        with self.assertRaises(ValueError):
+            has_choice('pet__name', 'Rex')
+
+    def test_edits_resync_choices(self):
+        history = MedicalHistory.objects.get(pet=self.pets[1])
+        history.stool_types = 'soft,loose'
+        history.save()
+        self.assertEqual(set(cohort(medical_history__stool_types='soft')), set(self.pets))
+        self.assertEqual(choice_counts('medical_history__stool_types')['loose'], 1)
+
+    def test_deleted_or_updated_sections_leave_no_stale_choices(self):
+        MedicalHistory.objects.get(pet=self.pets[0]).delete()
+        self.assertNotIn(self.pets[0], cohort(medical_history__stool_types='soft'))
+        self.assertTrue(cohort(food_preferences__current_food_preferences='raw').filter(pk=self.pets[0].pk).exists())
+
+        # .update() sends no signal; the command catches the index up
+        MedicalHistory.objects.filter(pet=self.pets[1]).update(stool_types='loose')
+        call_command('rebuild_multiselect_choices', stdout=StringIO())
+        self.assertEqual(list(cohort(medical_history__stool_types='loose')), [self.pets[1]])
+
+
+class IntakeJournalTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings_override = override_settings(INTAKE_JOURNAL_DIR=directory, INTAKE_JOURNAL_WORKERS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Case IDs reserved by another test were rolled back with it
+        journal._case_ids.clear()
+
+    def test_async_submit_journals_then_saves(self):
+        post = sample_intake_post(index=0)
+        with mock.patch.object(journal, 'schedule_drain') as schedule:
+            response = self.client.post(reverse('intake_form_async'), post)
+        self.assertRedirects(response, reverse('success'), fetch_redirect_response=False)
+        schedule.assert_called_once()
+        case_id = re.search(r'PNV-\d{4}-\d{4}', str(list(response.wsgi_request._messages)[0])).group()
+        self.assertFalse(PetParent.objects.exists())
+        self.assertEqual(journal.pending_count(), 1)
+
+        self.assertEqual(journal.drain(), 1)
+        parent = PetParent.objects.get()
+        self.assertEqual(parent.case_id, case_id)
+        self.assertEqual(parent.pets.get().name, post['pet_name'])
+        self.assertEqual(journal.pending_count(), 0)
+        # Replaying the same entry (crash before the checkpoint) saves nothing twice
+        journal.append(case_id, post)
+        self.assertEqual(journal.drain(), 0)
+        self.assertEqual(PetParent.objects.count(), 1)
+
+    def test_invalid_submission_is_refused_up_front(self):
+        post = sample_intake_post(index=0)
+        post['pet_weight'] = 'heavy'
+        response = self.client.post(reverse('intake_form_async'), post)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(journal.pending_count(), 0)
+        # The answers come back to be filled in again
+        self.assertEqual(response.context['posted_answers']['pet_name'], [post['pet_name']])
+        self.assertContains(response, 'id="posted-answers"', status_code=400)
+
+    def test_email_is_reserved_while_its_submission_is_queued(self):
+        post = sample_intake_post(index=0)
+        with mock.patch.object(journal, 'schedule_drain'):
+            first = self.client.post(reverse('intake_form_async'), post)
+            second = self.client.post(reverse('intake_form_async'), {**post, 'pet_name': 'Copy'})
+        self.assertEqual((first.status_code, second.status_code), (302, 400))
+        self.assertIn('A case already exists for this email address.', second.context['errors'])
+        self.assertEqual(journal.pending_count(), 1)
+
+    @override_settings(INTAKE_JOURNAL_CASE_ID_BLOCK=20)
+    def test_enqueue_writes_nothing_to_the_database(self):
+        posts = [sample_intake_post(index=i) for i in range(3)]
+        number = lambda entry: int(entry['case_id'].rsplit('-', 1)[1])
+        with mock.patch.object(journal, 'schedule_drain'):
+            first = journal.enqueue(posts[0])
+            # Just the email lookup: the case ID comes from the block reserved above
+            with CaptureQueriesContext(connection) as queries:
+                second = journal.enqueue(posts[1])
+            self.assertEqual([q['sql'].split()[0] for q in queries], ['SELECT'])
+            self.assertEqual((number(first), CaseIdSequence.objects.get().last_value), (1, 20))
+            self.assertEqual(journal._pending_emails(), {posts[0]['parent_email'], posts[1]['parent_email']})
+
+            # Drained and truncated: the index starts over, the addresses now have cases
+            journal.drain()
+            self.assertEqual(journal._pending_emails(), set())
+            with self.assertRaises(journal.DuplicateEmail):
+                journal.enqueue(posts[1])
+            third = journal.enqueue(posts[2])
+        self.assertEqual(PetParent.objects.get(email=posts[1]['parent_email']).case_id, second['case_id'])
+        # The refused submission gave its case ID back
+        self.assertEqual(number(third), number(second) + 1)
+
+    def test_first_request_drains_what_an_earlier_process_left(self):
+        journal.append('PNV-2026-9200', sample_intake_post(index=0))
+        # As apps.py connects it at startup; it disconnects itself after one request
+        request_started.connect(journal.drain_leftovers, dispatch_uid=journal.LEFTOVERS_UID)
+        with mock.patch.object(journal, 'schedule_drain') as schedule:
+            self.client.get(reverse('success'))
+            self.client.get(reverse('success'))
+        schedule.assert_called_once()
+
+    def test_bad_entry_is_rejected_without_blocking_the_batch(self):
+        good = [sample_intake_post(index=i) for i in range(3)]
+        # Same email as the first case: the unique constraint refuses it at drain time
+        duplicate = good[0].copy()
+        duplicate['pet_name'] = 'Copy'
+        for i, post in enumerate([good[0], good[1], duplicate, good[2]]):
+            journal.append(f'PNV-2026-{9000 + i}', post)
+        with self.captureOnCommitCallbacks(execute=True), self.assertLogs('intake_form.journal', 'ERROR'):
+            self.assertEqual(journal.drain(batch_size=10), 3)
+        self.assertEqual(PetParent.objects.count(), 3)
+        rejected = journal._path('intake.rejected').read_text().splitlines()
+        self.assertEqual(len(rejected), 1)
+        self.assertIn('PNV-2026-9002', rejected[0])
+
+    def test_locked_database_is_retried_not_rejected(self):
+        journal.append('PNV-2026-9100', sample_intake_post(index=0))
+        save_entry = journal._save_entry
+        failures = [OperationalError('database is locked')]
+
+        def locked_once(entry):
+            if failures:
+                raise failures.pop()
+            return save_entry(entry)
+
+        with mock.patch.object(journal, '_save_entry', locked_once), mock.patch.object(journal.time, 'sleep'):
+            self.assertEqual(journal.drain(), 1)
+        self.assertEqual(PetParent.objects.get().case_id, 'PNV-2026-9100')
+        self.assertFalse(journal._path('intake.rejected').exists())
+
+    def test_failed_batches_never_stall_the_drain(self):
+        journal.append('PNV-2026-9300', sample_intake_post(index=0))
+        journal.append('PNV-2026-9301', sample_intake_post(index=1))
+        save_entry = journal._save_entry
+
+        def broken_second(entry):
+            if entry['case_id'] == 'PNV-2026-9301':
+                raise OperationalError('no such column: oops')
+            return save_entry(entry)
+
+        # Locked through every retry: the drain backs off and keeps the entries
+        locked = mock.patch.object(journal, '_save_entry', side_effect=OperationalError('database is locked'))
+        with locked, mock.patch.object(journal.time, 'sleep'), mock.patch.object(journal, '_retry_later') as later:
+            with self.assertLogs('intake_form.journal', 'WARNING'):
+                self.assertEqual(journal.drain(), 0)
+        later.assert_called_once()
+        self.assertEqual(journal.pending_count(), 2)
+
+        # Any other database error rejects just the entry that raised it
+        with mock.patch.object(journal, '_save_entry', broken_second), self.assertLogs('intake_form.journal', 'ERROR'):
+            self.assertEqual(journal.drain(), 1)
+        self.assertEqual(journal.pending_count(), 0)
+        self.assertIn('PNV-2026-9301', journal._path('intake.rejected').read_text())
+
+
+class ImportCasesTests(TestCase):
+
+    def _import(self, name, content, **options):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = f'{directory}/{name}'
+        with open(path, 'w') as f:
+            f.write(content)
+        out, err = StringIO(), StringIO()
+        call_command('import_cases', path, workers=0, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_jsonl_import_builds_whole_cases(self):
+        existing = create_case(index=0, rows=0)
+        posts = [sample_intake_post(index=i) for i in range(4)]
+        posts[2]['pet_weight'] = 'unknown'
+        lines = [json.dumps({k: post.getlist(k) for k in post}) for post in posts] + ['{broken']
+        out, err = self._import('history.jsonl', '\n'.join(lines), batch_size=2)
+
+        self.assertIn('5 rows: 2 imported, 1 already present, 2 failed', out)
+        self.assertIn('Line 3:', err)
+        self.assertIn('Line 5: Not valid JSON', err)
+        imported = Pet.objects.exclude(pk=existing.pk).select_related('owner')
+        self.assertEqual(len(imported), 2)
+        for pet in imported:
+            self.assertTrue(CaseVersion.objects.filter(pet=pet).exists())
+            self.assertTrue(pet.choices.exists())
+            self.assertTrue(ConsentForm.objects.filter(pet_parent=pet.owner).exists())
+            self.assertTrue(MedicalHistory.objects.filter(pet=pet).exists())
+        self.assertEqual(len({pet.owner.case_id for pet in imported}), 2)
+        expected_diets = sum(isinstance(row, CommercialDietHistory)
+                             for post in (posts[1], posts[3]) for row in parse_intake_submission(post).rows)
+        self.assertEqual(CommercialDietHistory.objects.filter(pet__in=imported).count(), expected_diets)
+
+    def test_csv_repeated_columns_are_multi_values(self):
+        content = (
+            'parent_name,parent_email,parent_phone,pet_name,food_preferences,food_preferences,'
+            'vet_name,vet_practice,vet_phone,vet_email\n'
+            'Asha,asha@example.com,555-0100,Bruno,raw,kibble,,,,\n'
+            'Ravi,ravi@example.com,555-0101,Tiger,raw\n'
+        )
+        out, err = self._import('history.csv', content)
+        self.assertIn('1 imported', out)
+        self.assertIn('Line 3: Vet name is missing.', err)
+        prefs = FoodPreferences.objects.get(pet__name='Bruno')
+        self.assertEqual(prefs.current_food_preferences, 'raw,kibble')
+
+    def test_a_batch_that_keeps_conflicting_is_saved_case_by_case(self):
+        posts = [sample_intake_post(index=i) for i in range(3)]
+        save = bulk_import.save_case_graphs
+
+        def racing(graphs):
+            # Another worker always takes one of this batch's emails first
+            if len(graphs) > 1 or graphs[0].parent.email == posts[1]['parent_email']:
+                raise IntegrityError('UNIQUE constraint failed: intake_form_petparent.email')
+            return save(graphs)
+
+        lines = [json.dumps({k: post.getlist(k) for k in post}) for post in posts]
+        with mock.patch.object(bulk_import, 'save_case_graphs', side_effect=racing) as saves:
+            out, err = self._import('history.jsonl', '\n'.join(lines))
+        self.assertEqual(saves.call_count, bulk_import.BATCH_ATTEMPTS + 3)
+        self.assertIn('2 imported', out)
+        self.assertIn('Line 2: Saved by another import meanwhile', err)
+        self.assertEqual(PetParent.objects.count(), 2)
+
+
+class CaseExportTests(TestCase):
+
+    def test_cases_table_is_wide_and_one_query(self):
+        pets = [create_case(index=i, rows=1) for i in range(3)]
+        response = self.client.get(reverse('case_export', args=['cases']))
+        self.assertTrue(response.streaming)
+        with self.assertNumQueries(1):
+            body = b''.join(response.streaming_content).decode()
+        header, *rows = list(csv.reader(StringIO(body)))
+        self.assertEqual(header[:2], ['pet_id', 'case_id'])
+        self.assertIn('medical_history__stool_types', header)
+        self.assertNotIn('email', header)
+        self.assertEqual([int(row[0]) for row in rows], [pet.pk for pet in pets])
+        stool = header.index('medical_history__stool_types')
+        self.assertEqual(rows[0][stool], MedicalHistory.objects.get(pet=pets[0]).stool_types)
+
+    def test_repeating_sections_are_long_tables(self):
+        pet = create_case(index=0, rows=2)
+        out = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, out)
+        call_command('export_cases', output=out, tables=['long_term_medications', 'clinical_conditions'],
+                     stdout=StringIO())
+        with open(f'{out}/long_term_medications.csv') as f:
+            header, *rows = list(csv.reader(f))
+        self.assertEqual(header[:3], ['pet_id', 'case_id', 'medication_name'])
+        self.assertEqual([row[2] for row in rows], ['Med 0', 'Med 1'])
+        self.assertEqual({row[1] for row in rows}, {pet.owner.case_id})
+        with open(f'{out}/clinical_conditions.csv') as f:
+            self.assertEqual(len(f.readlines()), 3)
+        self.assertEqual(self.client.get('/intake/cases/export/nope.csv').status_code, 404)
+
+
+@override_settings(CASE_PDF_WORKERS=0, VET_UPLOAD_WORKERS=0)
+class UrlBenchmarkTests(TestCase):
+
+    def test_every_scenario_runs_and_reports(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        with override_settings(MEDIA_ROOT=media):
+            self.assertEqual(seed_cases(4), 4)
+            self.assertEqual(seed_cases(4), 0)
+            results = run_benchmarks(requests=2)
+        self.assertEqual(list(results), SCENARIOS)
+        for name, stats in results.items():
+            self.assertTrue(all(status < 400 for status in stats['status']), (name, stats))
+            self.assertLessEqual(stats['p50_ms'], stats['p95_ms'])
+        self.assertEqual(results['intake_form_get']['queries'], 0)
+
+
+class SyntheticCaseTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        settings_override = override_settings(MEDIA_ROOT=media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_generation_is_deterministic_and_resumable(self):
+        blobs = shared_blobs(3)
+        cases, rows = generate_batch(5, [0, 1, 2], vet_share=1, blobs=blobs)
+        self.assertEqual(cases, 3)
+        self.assertEqual(list(missing_indexes(5, 5)), [3, 4])
+        self.assertEqual(ClinicalHistory.objects.count(), 3)
+        self.assertTrue(CaseVersion.objects.count() == Pet.objects.count() == 3)
+
+        # Shared blobs are reference counted like real uploads
+        uploads = VetUpload.objects.count()
+        self.assertEqual(sum(UploadBlob.objects.values_list('refcount', flat=True)), uploads)
+
+        first = Pet.objects.get(owner__email='synthetic-5-1@example.com')
+        snapshot = (first.name, first.breed, first.long_term_medications.count())
+        PetParent.objects.all().delete()
+        generate_batch(5, [1], vet_share=1, blobs=blobs)
+        again = Pet.objects.get(owner__email='synthetic-5-1@example.com')
+        self.assertEqual((again.name, again.breed, again.long_term_medications.count()), snapshot)
+
+
+class LoadTestHarnessTests(LiveServerTestCase):
+    def test_payloads_reuse_only_earlier_emails(self):
+        payloads = list(islice(with_emails(generated_posts(), seed=1, duplicate_rate=0.5), 20))
+        seen = set()
+        for post, duplicate in payloads:
+            self.assertEqual(post['parent_email'] in seen, duplicate)
+            seen.add(post['parent_email'])
+        self.assertTrue(any(duplicate for _, duplicate in payloads))
+
+    def test_run_against_live_server(self):
+        url = self.live_server_url + reverse('intake_form')
+        # One user: live server threads share the in-memory test database connection
+        report = LoadTest(url, with_emails(generated_posts()), total=4).run(concurrency=1)
+        self.assertEqual(report['outcomes'], {'ok': 4})
+        self.assertEqual(report['error_rate'], 0)
+        self.assertEqual(report['case_id_collisions'], 0)
+        self.assertEqual(sum(report['histogram'].values()), 4)
+        self.assertEqual(PetParent.objects.count(), 4)
+
+
+class RequestInstrumentationTests(TestCase):
+    def setUp(self):
+        request_metrics.clear()
+
+    def test_recorder_spots_repeated_queries(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            PetParent.objects.filter(email='a@example.com').exists()
+            PetParent.objects.filter(email='a@example.com').exists()
+            PetParent.objects.filter(email='b@example.com').exists()
+        self.assertEqual(recorder.count, 3)
+        self.assertEqual(recorder.duplicates, 1)
+        [(sql, repeats)] = recorder.duplicate_sql().items()
+        self.assertIn('intake_form_petparent', sql)
+        self.assertEqual(repeats, 1)
+
+    def test_server_timing_header_and_rolling_metrics(self):
+        response = self.client.get(reverse('case_list'))
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries, \d+ duplicate"')
+        self.assertIn('view;dur=', timing)
+        self.assertIn('total;dur=', timing)
+        self.client.get(reverse('case_list'))
+
+        metrics = self.client.get(reverse('request_metrics')).json()['views']
+        self.assertEqual(metrics['case_list']['requests'], 2)
+        self.assertEqual(metrics['case_list']['status'], {'200': 2})
+        self.assertGreater(metrics['case_list']['queries_avg'], 0)
+
+    async def test_middleware_stays_async_under_asgi(self):
+        handler = ASGIHandler()
+        self.assertTrue(handler._middleware_chain.async_mode)
+        # Their process_view hooks are coroutines, not sync_to_async wrappers
+        ours = [m for m in handler._view_middleware if isinstance(getattr(m, '__self__', None), BothModesMiddleware)]
+        self.assertEqual(len(ours), 2)
+        self.assertTrue(all(inspect.iscoroutinefunction(m) for m in ours))
+
+        response = await self.async_client.get(reverse('case_list'), headers={'Accept-Encoding': 'gzip'})
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* queries')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+
+def metric_value(text, sample):
+    """Value of one sample line in an exposition, 0 if absent"""
+    match = re.search(rf'^{re.escape(sample)} (\S+)$', text, re.MULTILINE)
+    return float(match.group(1)) if match else 0
+
+
+class PrometheusMetricsTests(TestCase):
+    SAVED = 'nutrivet_intake_submissions_total{source="form",outcome="saved"}'
+
+    def test_requests_and_submissions_are_exposed(self):
+        before = self.client.get('/metrics').content.decode()
+        self.client.post(reverse('intake_form'), sample_intake_post(index=0))
+        self.client.get(reverse('case_list'))
+        response = self.client.get('/metrics')
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+
+        self.assertEqual(metric_value(text, self.SAVED) - metric_value(before, self.SAVED), 1)
+        requests = 'nutrivet_requests_total{view="case_list",status="200"}'
+        self.assertEqual(metric_value(text, requests) - metric_value(before, requests), 1)
+        count = metric_value(text, 'nutrivet_request_duration_seconds_count{view="case_list"}')
+        self.assertEqual(metric_value(text, 'nutrivet_request_duration_seconds_bucket{view="case_list",le="+Inf"}'), count)
+        self.assertIn('# TYPE nutrivet_request_duration_seconds histogram', text)
+
+    def test_worker_processes_are_summed(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        own = metric_value(exposition(), self.SAVED)
+        # The last flushes of a live worker and of one that has exited
+        for name, pid, saved in [('worker-live.json', os.getppid(), 5), ('worker-gone.json', 2 ** 22 + 1, 7)]:
+            with open(f'{directory}/{name}', 'w') as f:
+                json.dump({'pid': pid, 'metrics': {SUBMISSIONS.name: [[['form', 'saved'], saved]],
+                                                   'retired_metric': [[[], 1]]}}, f)
+        with override_settings(METRICS_DIR=directory):
+            text = exposition()
+            # The exited worker is folded into exited.json: counted once, its file gone
+            self.assertEqual(metric_value(exposition(), self.SAVED), own + 12)
+        self.assertEqual(metric_value(text, self.SAVED), own + 12)
+        self.assertNotIn('retired_metric', text)
+        files = sorted(p.name for p in Path(directory).glob('*.json'))
+        self.assertEqual(len(files), 3)
+        self.assertIn('exited.json', files)
+        self.assertIn('worker-live.json', files)
+
+
+class SqliteTuningTests(TestCase):
+    def test_new_connections_get_the_pragmas(self):
+        pragmas = current_pragmas(connection)
+        self.assertEqual(pragmas['busy_timeout'], DEFAULT_PRAGMAS['busy_timeout'])
+        self.assertEqual(pragmas['cache_size'], DEFAULT_PRAGMAS['cache_size'])
+        self.assertEqual(connection.settings_dict['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+
+    def test_settings_override_single_pragmas(self):
+        with override_settings(SQLITE_PRAGMAS={'busy_timeout': 1000, 'mmap_size': None}):
+            pragmas = sqlite_pragmas()
+        self.assertEqual(pragmas['busy_timeout'], 1000)
+        self.assertNotIn('mmap_size', pragmas)
+        self.assertEqual(pragmas['journal_mode'], 'WAL')
+
+
+class ReplicaRoutingTests(TestCase):
+    def test_router_reads_from_replica_only_when_asked(self):
+        router = ReplicaRouter()
+        with override_settings(READ_REPLICA='replica'):
+            self.assertIsNone(router.db_for_read(Pet))
+            with use_replica():
+                self.assertEqual(router.db_for_read(Pet), 'replica')
+                self.assertEqual(router.db_for_write(Pet), 'default')
+            self.assertFalse(router.allow_migrate('replica', 'intake_form'))
+        with use_replica():
+            self.assertIsNone(router.db_for_read(Pet))
+
+    # The replica alias is the primary itself here: only the routing decision is under test
+    @override_settings(READ_REPLICA='default')
+    def test_reporting_reads_stick_to_primary_after_a_write(self):
+        self.assertTrue(self.client.get(reverse('case_list')).wsgi_request.read_replica)
+        self.assertFalse(self.client.get(reverse('intake_form')).wsgi_request.read_replica)
+
+        response = self.client.post(reverse('intake_form'), sample_intake_post(index=0))
+        self.assertIn(PINNED_COOKIE, response.cookies)
+        self.assertFalse(self.client.get(reverse('case_list')).wsgi_request.read_replica)
+
+
+class AdminQueryTests(TestCase):
+    ROWS = 10_000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        generate_batch(0, range(3), vet_share=1)
+        parents = PetParent.objects.bulk_create(
+            PetParent(case_id=f'PNV-2020-{i:05d}', email=f'bulk{i}@example.com', name=f'Owner {i}', phone='1')
+            for i in range(cls.ROWS)
+        )
+        pets = Pet.objects.bulk_create(
+            Pet(owner=parent, name=f'Pet {i}', dob_age='2', species='dog', breed='Indie', sex='male',
+                body_condition='ideal', consultation_goals='-')
+            for i, parent in enumerate(parents)
+        )
+        LongTermMedication.objects.bulk_create(
+            LongTermMedication(pet=pet, medication_name='Omega-3', dose='1', frequency='daily') for pet in pets
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _changelist(self, model, **params):
+        url = reverse(f'admin:intake_form_{model._meta.model_name}_changelist')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_changelists_take_constant_queries(self):
+        models = [m for m in admin.site._registry if m._meta.app_label == 'intake_form']
+        self.assertEqual(len(models), 31)
+        for model in models:
+            with self.subTest(model=model.__name__):
+                # Session, user, page count, page rows: nothing per row, no full count
+                _, queries = self._changelist(model)
+                self.assertLessEqual(queries, 4)
+
+    def test_search_filter_and_inlines(self):
+        response, _ = self._changelist(LongTermMedication, q='PNV-2020-00042')
+        self.assertEqual([row.pet.name for row in response.context['cl'].result_list], ['Pet 42'])
+        response, _ = self._changelist(Pet, species__exact='cat')
+        self.assertEqual(response.context['cl'].result_count, Pet.objects.filter(species='cat').count())
+
+        pet = Pet.objects.filter(long_term_medications__isnull=False).order_by('pk').first()
+        LongTermMedication.objects.bulk_create(
+            LongTermMedication(pet=pet, medication_name=f'Med {i}', dose='1', frequency='daily') for i in range(20)
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('admin:intake_form_pet_change', args=[pet.pk]))
+        self.assertLess(len(ctx.captured_queries), 20)
+
+
+class FormShellTests(TestCase):
+    def test_repeat_visit_is_a_304(self):
+        response = self.client.get(reverse('intake_form'))
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.assertRegex(response['ETag'], r'^"[0-9a-f]{32}"$')
+        self.assertNotContains(response, 'csrf-token-placeholder')
+        self.assertEqual(self.client.get(reverse('intake_form')).content, response.content)
+
+        cached = self.client.get(reverse('intake_form'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b'')
+
+        # Another visitor gets their own token, and so another ETag
+        other = Client().get(reverse('intake_form'))
+        self.assertNotEqual(other['ETag'], response['ETag'])
+
+    def test_embedded_token_passes_csrf_check(self):
+        client = Client(enforce_csrf_checks=True)
+        html = client.get(reverse('intake_form')).content.decode()
+        token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', html).group(1)
+
+        post = sample_intake_post(index=1)
+        self.assertEqual(client.post(reverse('intake_form'), post).status_code, 403)
+        post['csrfmiddlewaretoken'] = token
+        self.assertRedirects(client.post(reverse('intake_form'), post), reverse('success'))
+
+
+class StaticAssetTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        overrides = override_settings(STORAGES=PRODUCTION_STORAGES, STATIC_ROOT=root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_pages_link_fingerprinted_precompressed_assets(self):
+        html = self.client.get(reverse('intake_form')).content.decode()
+        css, js = re.findall(r'(?:href|src)="(/static/intake_form/form\.[0-9a-f]{12}\.(?:css|js))"', html)
+        self.assertNotIn('<style>', html)
+
+        response = self.client.get(js, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Cache-Control'], 'max-age=315360000, public, immutable')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        body = gzip.decompress(b''.join(response.streaming_content))
+        self.assertIn(b'function addDietRow()', body)
+
+        plain = self.client.get(css, HTTP_ACCEPT_ENCODING='identity')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertEqual(self.client.get(css, HTTP_IF_NONE_MATCH=plain['ETag']).status_code, 304)
+        # Unhashed names may change under the same URL
+        self.assertEqual(self.client.get('/static/intake_form/form.css')['Cache-Control'], 'max-age=60, public')
+
+    async def test_assets_are_served_under_asgi(self):
+        response = await self.async_client.get('/static/intake_form/form.css', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b'{', gzip.decompress(b''.join(response.streaming_content)))
+
+    def test_a_build_without_collectstatic_fails_loudly(self):
+        empty = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, empty)
+        with override_settings(STATIC_ROOT=empty):
+            with self.assertRaisesMessage(ValueError, 'Missing staticfiles manifest entry'):
+                self.client.get(reverse('intake_form'))
+    def test_page_weight_report(self):
+        create_case(1)
+        weights = run_page_weight(['intake_form', 'vet_form'])
+        self.assertEqual(weights['vet_form']['status'], 200)
+        self.assertEqual([a['encoding'] for a in weights['vet_form']['assets']], ['gzip', 'gzip'])
+        form = weights['intake_form']
+        self.assertEqual(form['repeat_visit_bytes'], form['html_bytes'])
+        self.assertGreater(form['first_visit_bytes'], form['html_bytes'])
+
+
+class DraftCaseTests(TestCase):
+    def setUp(self):
+        self.draft = self.client.post(reverse('draft_start')).json()
+        post = sample_intake_post(index=1, rows=2)
+        post['supplements_given'] = 'yes'
+        self.owner_pet = {k: post.getlist(k) for k in post if k.startswith(('parent_', 'pet_'))}
+        self.rest = {k: post.getlist(k) for k in post if k not in self.owner_pet}
+
+    def patch(self, sections):
+        return self.client.patch(self.draft['url'], json.dumps({'sections': sections}),
+                                 content_type='application/json')
+
+    def test_each_autosave_writes_only_its_sections(self):
+        self.patch({'owner_pet': self.owner_pet, 'medical': self.rest})
+        medical = DraftSection.objects.get(name='medical')
+        # The open-check and the upsert, in one transaction (a savepoint inside TestCase)
+        with self.assertNumQueries(4):
+            response = self.patch({'owner_pet': {**self.owner_pet, 'pet_name': ['Biscuit']}})
+        self.assertEqual(response.json(), {'saved': ['owner_pet']})
+        self.assertEqual(DraftSection.objects.get(name='owner_pet').answers['pet_name'], ['Biscuit'])
+        self.assertEqual(DraftSection.objects.get(name='medical').updated_at, medical.updated_at)
+        self.assertEqual(self.patch({'payment': {}}).status_code, 400)
+
+    def test_submit_saves_the_case_once(self):
+        self.patch({'owner_pet': self.owner_pet})
+        incomplete = self.client.post(self.draft['submit_url'])
+        self.assertEqual(incomplete.status_code, 400)
+        self.assertIn('Vet name is missing.', incomplete.json()['errors'])
+
+        self.patch({'medical': self.rest})
+        response = self.client.post(self.draft['submit_url'])
+        self.assertEqual(response.json()['redirect'], reverse('success'))
+        pet = Pet.objects.get(owner__email='owner1@example.com')
+        self.assertEqual(CommercialDietHistory.objects.filter(pet=pet).count(), 2)
+        self.assertEqual(Supplement.objects.filter(pet=pet).count(), 2)
+
+        # A retried submit (the first answer was lost) gets the same case
+        retry = self.client.post(self.draft['submit_url'])
+        self.assertEqual(retry.json()['case_id'], pet.owner.case_id)
+        self.assertEqual(PetParent.objects.count(), 1)
+        self.assertEqual(self.patch({'medical': self.rest}).status_code, 409)
+        self.assertEqual(self.client.get(self.draft['url']).json()['case_id'], pet.owner.case_id)
+
+    def test_submit_refuses_an_email_that_already_has_a_case(self):
+        self.client.post(reverse('intake_form'), sample_intake_post(index=1))
+        self.patch({'owner_pet': self.owner_pet, 'medical': self.rest})
+        response = self.client.post(self.draft['submit_url'])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], [drafts.DUPLICATE_EMAIL])
+
+        # Taken between the check and the save: still a 400, and the draft stays open
+        with mock.patch.object(drafts, 'PetParent') as unchecked:
+            unchecked.objects.filter.return_value.exists.side_effect = [False, True]
+            response = self.client.post(self.draft['submit_url'])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], [drafts.DUPLICATE_EMAIL])
+        self.assertEqual(PetParent.objects.count(), 1)
+        self.assertFalse(self.client.get(self.draft['url']).json()['submitted'])
+
+    def test_other_integrity_errors_are_not_reported_as_duplicate_emails(self):
+        self.patch({'owner_pet': self.owner_pet, 'medical': self.rest})
+        collision = IntegrityError('UNIQUE constraint failed: intake_form_petparent.case_id')
+        with mock.patch('intake_form.submission.CaseGraph.save', side_effect=collision):
+            with self.assertRaises(IntegrityError):
+                drafts.submit_draft(self.draft['id'])
@@ -0,0 +1,326 @@
+"""
+Resumable, chunked vet uploads.
+
+The browser opens an UploadSession, then sends the file in chunks, each tagged
+with the byte offset it starts at. Chunks are streamed straight from the
+request onto a partial file under MEDIA_ROOT (bounded memory; nothing is
+buffered whole) while a SHA-256 is updated incrementally. An interrupted upload
+resumes from `received`. When the last byte arrives the file is moved (not
+copied) into storage as a VetUpload and post-processing (type sniffing,
+thumbnails) runs on a background pool.
+
+One chunk is written at a time per session, across processes: a request
+first takes the session's `writer` lease with a conditional UPDATE (only
+while `received` is still its offset), and hands it back with the new offset.
+
+Sessions that stop short are never finished; `manage.py purge_upload_sessions`
+deletes those idle for more than VET_UPLOAD_SESSION_MAX_AGE_DAYS, with their
+partial files.
+"""
+import hashlib
+import mimetypes
+import os
+import time
+import uuid
+from datetime import timedelta
+from io import BytesIO
+from pathlib import Path
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from . import background
+from .metrics import UPLOAD_BYTES
+from .models import UploadSession, VetUpload
+
+READ_BLOCK = 64 * 1024
+# A chunk still being written after this long is presumed abandoned (the worker died)
+CHUNK_LEASE_SECONDS = 10 * 60
+THUMBNAIL_SIZE = (320, 320)
+
+
+class UploadError(Exception):
+    """A chunk that cannot be accepted; `status` is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class OffsetMismatch(UploadError):
+    """The chunk does not start where the stored data ends (client should resume from `offset`)"""
+    retry_after = None
+
+    def __init__(self, offset, message=None):
+        super().__init__(message or f'Expected a chunk starting at byte {offset}', status=409)
+        self.offset = offset
+
+
+class ChunkInProgress(OffsetMismatch):
+    """Another request is still writing a chunk of this session (client should retry shortly)"""
+    retry_after = 1
+
+    def __init__(self, offset):
+        super().__init__(offset, 'Another chunk of this upload is still being written')
+
+
+# ═══════════════════════════════════════════════════════
+# SESSIONS & CHUNKS
+# ═══════════════════════════════════════════════════════
+
+# (offset, running SHA-256, monotonic time stored) per session for this
+# process; rebuilt from the partial file after a restart, when a chunk landed
+# on another process, or once dropped for sitting idle past the lease.
+_hashers = {}
+
+
+class PartialFile(File):
+    """The assembled upload on disk; FileSystemStorage moves it into place (file_move_safe)"""
+
+    def __init__(self, path, name, size, sha256):
+        super().__init__(None, name=name)
+        self.path = path
+        self.size = size
+        # Already hashed while the chunks arrived
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return str(self.path)
+
+
+def partial_path(session):
+    return Path(settings.MEDIA_ROOT) / 'partial_uploads' / f'{session.pk}.part'
+
+
+def start_session(pet, category, filename, size):
+    if category not in dict(VetUpload.CATEGORY_CHOICES):
+        raise UploadError(f'Unknown category {category!r}')
+    if size < 0 or size > settings.VET_UPLOAD_MAX_SIZE:
+        raise UploadError(f'Files must be at most {settings.VET_UPLOAD_MAX_SIZE} bytes', status=413)
+    session = UploadSession.objects.create(
+        pet=pet, category=category, filename=os.path.basename(filename)[:255] or 'upload', size=size
+    )
+    path = partial_path(session)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+    if size == 0:
+        finish(session)
+    return session
+
+
+def _hasher_for(session, path):
+    offset, hasher, _ = _hashers.get(session.pk, (None, None, None))
+    if offset == session.received:
+        return hasher.copy()
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        remaining = session.received
+        while remaining:
+            block = f.read(min(READ_BLOCK, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            remaining -= len(block)
+    return hasher
+
+
+def _claim(session, offset, length):
+    """Take the session's writer lease for the chunk at `offset`; returns the lease"""
+    lease = uuid.uuid4()
+    now = timezone.now()
+    claimed = UploadSession.objects.filter(
+        Q(writer__isnull=True) | Q(updated_at__lt=now - timedelta(seconds=CHUNK_LEASE_SECONDS)),
+        pk=session.pk, upload__isnull=True, received=offset, size__gt=offset, size__gte=offset + length,
+    ).update(writer=lease, updated_at=now)
+    if claimed:
+        return lease
+
+    session.refresh_from_db(fields=['received', 'upload', 'writer'])
+    if session.upload_id or session.complete:
+        raise UploadError('Upload already complete', status=409)
+    if offset != session.received:
+        raise OffsetMismatch(session.received)
+    if offset + length > session.size:
+        raise UploadError('Chunk runs past the declared file size')
+    raise ChunkInProgress(session.received)
+
+
+def append_chunk(session, offset, stream, length):
+    """
+    Stream `length` bytes from `stream` onto the session's partial file.
+
+    Returns the session with `received` advanced; completes it when the last
+    byte arrives.
+    """
+    if length > settings.VET_UPLOAD_CHUNK_SIZE:
+        raise UploadError(f'Chunks must be at most {settings.VET_UPLOAD_CHUNK_SIZE} bytes', status=413)
+    lease = _claim(session, offset, length)
+    leased = UploadSession.objects.filter(pk=session.pk, writer=lease)
+    try:
+        session.received = offset
+        path = partial_path(session)
+        hasher = _hasher_for(session, path)
+        written = 0
+        with open(path, 'r+b') as out:
+            # Drop bytes from an earlier chunk that failed before it was recorded
+            out.truncate(offset)
+            out.seek(offset)
+            while written < length:
+                block = stream.read(min(READ_BLOCK, length - written))
+                if not block:
+                    break
+                out.write(block)
+                hasher.update(block)
+                written += len(block)
+        if written != length:
+            raise UploadError('Chunk ended early; resume from the last recorded offset')
+    except Exception:
+        leased.update(writer=None)
+        raise
+
+    # Once `received` reaches `size` no one can claim again, so only this
+    # request goes on to finish()
+    if not leased.update(received=offset + written, writer=None, updated_at=timezone.now()):
+        raise UploadError('The chunk took too long and was superseded; resume from the recorded offset',
+                          status=409)
+    session.received = offset + written
+    UPLOAD_BYTES.inc(written, path='chunked')
+    _remember(session, hasher)
+    if session.complete:
+        finish(session)
+    return session
+
+
+def finish(session):
+    """Move the assembled file into storage as a VetUpload and queue post-processing"""
+    path = partial_path(session)
+    hasher = _hasher_for(session, path)
+    with transaction.atomic():
+        sha256 = hasher.hexdigest()
+        # Renamed into blob storage; a blob that is already stored isn't written again
+        upload = VetUpload.objects.create(
+            pet_id=session.pet_id, category=session.category, original_filename=session.filename,
+            size=session.size, sha256=sha256, file=PartialFile(path, session.filename, session.size, sha256),
+        )
+        session.upload = upload
+        session.save(update_fields=['upload', 'updated_at'])
+    _forget(session)
+    transaction.on_commit(lambda: enqueue_processing(upload.pk))
+    return upload
+
+
+def discard_session(session):
+    _forget(session)
+    session.delete()
+
+
+def _remember(session, hasher):
+    now = time.monotonic()
+    # Sessions idle past the lease are likely abandoned; a resumed one rehashes its partial file
+    for pk, (_, _, stored_at) in list(_hashers.items()):
+        if now - stored_at > CHUNK_LEASE_SECONDS:
+            _hashers.pop(pk, None)
+    _hashers[session.pk] = (session.received, hasher, now)
+
+
+def _forget(session):
+    partial_path(session).unlink(missing_ok=True)
+    _hashers.pop(session.pk, None)
+
+
+def purge_sessions(max_age_days=None):
+    """
+    Delete unfinished sessions idle for more than VET_UPLOAD_SESSION_MAX_AGE_DAYS,
+    and their partial files; returns how many
+    """
+    days = settings.VET_UPLOAD_SESSION_MAX_AGE_DAYS if max_age_days is None else max_age_days
+    stale = UploadSession.objects.filter(upload__isnull=True, updated_at__lt=timezone.now() - timedelta(days=days))
+    deleted = 0
+    for session in stale.iterator():
+        discard_session(session)
+        deleted += 1
+    return deleted
+
+
+# ═══════════════════════════════════════════════════════
+# POST-PROCESSING (background pool)
+# ═══════════════════════════════════════════════════════
+
+# Leading bytes -> MIME type, checked in order
+MAGIC_NUMBERS = [
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'II*\x00', 'image/tiff'),
+    (b'MM\x00*', 'image/tiff'),
+    (b'BM', 'image/bmp'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/msword'),
+]
+THUMBNAIL_TYPES = {'image/png', 'image/jpeg', 'image/gif', 'image/tiff', 'image/bmp', 'image/webp'}
+
+
+def sniff_content_type(head, filename=''):
+    """MIME type from the first bytes of a file, falling back to its extension"""
+    if head[128:132] == b'DICM':
+        return 'application/dicom'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    for magic, content_type in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return content_type
+    if head.startswith(b'PK\x03\x04') and filename.lower().endswith('.docx'):
+        return 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+    return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+
+def make_thumbnail(f):
+    """PNG thumbnail bytes, or None if Pillow is unavailable or can't read the image"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    try:
+        with Image.open(f) as image:
+            image.thumbnail(THUMBNAIL_SIZE)
+            out = BytesIO()
+            image.convert('RGB').save(out, 'PNG')
+            return out.getvalue()
+    except (OSError, ValueError):
+        return None
+
+
+def process_upload(upload_id):
+    """Sniff the type, hash legacy uploads and build a thumbnail for images"""
+    upload = VetUpload.objects.filter(pk=upload_id).first()
+    if upload is None or not upload.file:
+        return None
+    with upload.file.open('rb') as f:
+        head = f.read(132)
+        upload.content_type = sniff_content_type(head, upload.original_filename)
+        if not upload.sha256:
+            hasher = hashlib.sha256(head)
+            for block in iter(lambda: f.read(READ_BLOCK), b''):
+                hasher.update(block)
+            upload.sha256 = hasher.hexdigest()
+        if upload.size is None:
+            upload.size = upload.file.size
+        if upload.content_type in THUMBNAIL_TYPES:
+            f.seek(0)
+            thumbnail = make_thumbnail(f)
+            if thumbnail:
+                stem = os.path.splitext(upload.original_filename)[0]
+                upload.thumbnail.save(f'{stem}.png', ContentFile(thumbnail), save=False)
+    # update() rather than save(): nothing shown on the case pages changes
+    VetUpload.objects.filter(pk=upload.pk).update(
+        content_type=upload.content_type, sha256=upload.sha256, size=upload.size,
+        thumbnail=upload.thumbnail.name or '', processed_at=timezone.now(),
+    )
+    return upload.pk
+
+
+def enqueue_processing(upload_id):
+    return background.submit('vet-uploads', settings.VET_UPLOAD_WORKERS, process_upload, upload_id)
@@ -3,10 +3,19 @@ from . import views
 
 urlpatterns = [
     path('', views.intake_form_view, name='intake_form'),
+    path('submit/', views.intake_form_async_view, name='intake_form_async'),
+    path('drafts/', views.draft_start_view, name='draft_start'),
+    path('drafts/<uuid:draft_id>/', views.draft_view, name='draft'),
+    path('drafts/<uuid:draft_id>/submit/', views.draft_submit_view, name='draft_submit'),
     path('success/', views.success_view, name='success'),
     path('cases/', views.case_list_view, name='case_list'),
+    path('cases/export/<slug:table>.csv', views.case_export_view, name='case_export'),
+    path('metrics/requests/', views.request_metrics_view, name='request_metrics'),
     path('cases/<int:pk>/', views.case_detail_view, name='case_detail'),
     path('cases/<int:pk>/pdf/', views.case_pdf_view, name='case_pdf'),
+    path('cases/<int:pk>/pdf/download/', views.case_pdf_download_view, name='case_pdf_file'),
     path('cases/<int:pk>/vet/', views.vet_form_view, name='vet_form'),
+    path('cases/<int:pk>/uploads/', views.upload_start_view, name='upload_start'),
+    path('uploads/<uuid:session_id>/', views.upload_chunk_view, name='upload_chunk'),
     path('vet-upload/<int:upload_id>/delete/', views.delete_vet_upload, name='delete_vet_upload'),
 ]
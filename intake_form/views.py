@@ -1,430 +1,122 @@
+import json
+from concurrent.futures import TimeoutError as RenderTimeout
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib import messages
-from django.db import models as db_models
-from django.views.decorators.http import require_POST
-from .models import (
-    PetParent, Pet, HouseholdDetails, FeedingBehavior,
-    FoodPreferences, CommercialDietHistory, HomemadeDietHistory,
-    CommercialTreatHistory, HomemadeTreatHistory, Supplement,
-    RecentDietChange, FoodStorage, FitnessActivity, ActivityDetail,
-    RehabilitationTherapy, MedicalHistory, AdverseReaction,
-    VaccinationStatus, PrimaryVetInfo, ConsentForm,
-    DietPlanPreferences, AdviceSource, ChronicCondition,
-    BrandToAvoid, TreatPreferenceInPlan,
-    ClinicalHistory, ClinicalCondition, LongTermMedication,
-    SurgicalHistory, DiagnosticImaging, VetUpload
-)
+from django.db import transaction
+from django.views.decorators.http import require_POST, require_http_methods
+from .models import PetParent, Pet, CaseVersion, ClinicalHistory, VetUpload, UploadSession, DraftCase
+from .case_cache import cached_case_page, conditional_case_list
+from .case_pdf import case_pdf_filename, current_artifact, submit_render
+from .dashboard import search_cases, keyset_page
+from .drafts import DraftError, draft_state, save_sections, submit_draft
+from .export import stream_csv, tables as export_tables
+from .form_shell import form_response
+from .instrumentation import request_metrics
+from .metrics import SUBMISSIONS, UPLOAD_BYTES, exposition
+from .loaders import case_graph_queryset, uploads_by_category
+from .row_sync import posted_rows, sync_rows
+from .submission import parse_intake_submission, validate_intake
+from . import journal
+from .uploads import UploadError, OffsetMismatch, start_session, append_chunk, discard_session, enqueue_processing
 
 
 def intake_form_view(request):
     """Display and process the intake form"""
 
     if request.method == 'POST':
-        # ── Pet Parent ──
-        pet_parent = PetParent.objects.create(
-            name=request.POST.get('parent_name'),
-            email=request.POST.get('parent_email'),
-            phone=request.POST.get('parent_phone'),
-            location_primary_vet=request.POST.get('parent_location', '')
-        )
-
-        # ── Pet ──
-        pet_weight = request.POST.get('pet_weight', '')
-        pet = Pet.objects.create(
-            owner=pet_parent,
-            name=request.POST.get('pet_name', ''),
-            dob_age=request.POST.get('pet_age', ''),
-            species=request.POST.get('pet_species', 'dog'),
-            breed=request.POST.get('pet_breed', ''),
-            colour=request.POST.get('pet_colour', ''),
-            sex=request.POST.get('pet_sex', 'male'),
-            neutered=request.POST.get('pet_neutered') == 'yes',
-            current_weight_kg=pet_weight if pet_weight else None,
-            body_condition=request.POST.get('pet_body_condition', 'ideal'),
-            consultation_goals=request.POST.get('pet_consultation_goals', '')
-        )
-
-        # ── Household Details ──
-        HouseholdDetails.objects.create(
-            pet=pet,
-            food_ingredients_to_avoid=request.POST.get('household_avoid_ingredients', ''),
-            can_arrange_special_food=request.POST.get('household_arrange_food', 'no'),
-            who_feeds=request.POST.get('household_who_feeds', 'varies'),
-            feeder_name=request.POST.get('household_feeder_name', ''),
-            other_pets=request.POST.get('household_other_pets') == 'yes',
-            other_pets_details=request.POST.get('household_other_pets_details', ''),
-            pet_housed=request.POST.get('household_pet_housed', 'indoors')
-        )
-
-        # ── Feeding Behavior ──
-        feeding_behaviors = request.POST.getlist('feeding_behaviors')
-        unmonitored_sources_list = request.POST.getlist('unmonitored_sources')
-        unmonitored_other = request.POST.get('unmonitored_other', '')
-        unmonitored_str = ','.join(unmonitored_sources_list)
-        if unmonitored_other:
-            unmonitored_str += ',' + unmonitored_other
-
-        bowl_types_str = ','.join(request.POST.getlist('bowl_types'))
-        bowl_material_str = ','.join(request.POST.getlist('bowl_material'))
-        water_bowl_types_str = ','.join(request.POST.getlist('water_bowl_types'))
-        water_bowl_material_str = ','.join(request.POST.getlist('water_bowl_material'))
-
-        meals_per_day = request.POST.get('feeding_meals_per_day')
-
-        FeedingBehavior.objects.create(
-            pet=pet,
-            food_availability=request.POST.get('feeding_food_availability', 'always'),
-            food_availability_times=request.POST.get('feeding_food_times', ''),
-            meals_per_day=int(meals_per_day) if meals_per_day else None,
-            eating_behaviors=','.join(feeding_behaviors),
-            attitude_changed=request.POST.get('feeding_attitude_changed') == 'yes',
-            attitude_change_details=request.POST.get('feeding_attitude_details', ''),
-            unmonitored_food_access=request.POST.get('feeding_unmonitored') == 'yes',
-            unmonitored_sources=unmonitored_str,
-            good_appetite=request.POST.get('feeding_good_appetite', ''),
-            appetite_recently=request.POST.get('feeding_appetite_recently', ''),
-            bowl_type=bowl_types_str,
-            bowl_type_other=request.POST.get('bowl_type_other', ''),
-            bowl_material=bowl_material_str,
-            bowl_material_other=request.POST.get('bowl_material_other', ''),
-            water_bowl_type=water_bowl_types_str,
-            water_bowl_material=water_bowl_material_str,
-            water_bowl_material_other=request.POST.get('water_bowl_material_other', ''),
-            recent_change_4_weeks=request.POST.get('recent_diet_change_4wks') == 'yes',
-            recent_change_4_weeks_details=request.POST.get('recent_change_4wks_details', '')
-        )
-
-        # ── Food Preferences ──
-        food_prefs_str = ','.join(request.POST.getlist('food_preferences'))
-        treat_prefs_str = ','.join(request.POST.getlist('treat_preferences'))
-        food_factors_str = ','.join(request.POST.getlist('food_factors'))
-
-        FoodPreferences.objects.create(
-            pet=pet,
-            current_food_preferences=food_prefs_str,
-            current_treat_preferences=treat_prefs_str,
-            refuses_food=request.POST.get('food_refuses') == 'yes',
-            refused_food_details=request.POST.get('food_refuses_details', ''),
-            preferred_treats_in_plan=request.POST.get('preferred_treats_in_plan', ''),
-            food_brands_to_avoid=request.POST.get('brands_to_avoid', ''),
-            important_food_factors=food_factors_str
-        )
-
-        # ── Q16: Treat Preferences in Plan (checkboxes) ──
-        treat_plan_prefs = request.POST.getlist('treat_plan_preferences')
-        TreatPreferenceInPlan.objects.create(
-            pet=pet,
-            preferences=','.join(treat_plan_prefs)
-        )
-
-        # ── Q17: Brands to Avoid (dynamic table) ──
-        brand_names = request.POST.getlist('avoid_brand_name[]')
-        brand_reasons = request.POST.getlist('avoid_brand_reason[]')
-        for i in range(len(brand_names)):
-            if brand_names[i].strip():
-                BrandToAvoid.objects.create(
-                    pet=pet,
-                    brand_name=brand_names[i],
-                    reason=brand_reasons[i] if i < len(brand_reasons) else ''
-                )
+        # Parse everything first, then write the case in one transaction
+        pet_parent = parse_intake_submission(request.POST).save()
+        SUBMISSIONS.inc(source='form', outcome='saved')
+        messages.success(request, f'Form submitted successfully! Your Case ID is: {pet_parent.case_id}')
+        return redirect('success')
 
-        # ── Food Storage ──
-        storage_types = ['dry', 'wet', 'raw', 'homecooked', 'dehydrated']
-        for st in storage_types:
-            loc = request.POST.get(f'storage_{st}_location', '')
-            period = request.POST.get(f'storage_{st}_period', '')
-            if loc or period:
-                FoodStorage.objects.create(
-                    pet=pet,
-                    food_type=st,
-                    storage_location=loc,
-                    time_period=period
-                )
+    # GET request - show the form (pre-rendered, see form_shell.py)
+    return form_response(request)
 
-        # ── Q20: Advice Source ──
-        advice_sources = request.POST.getlist('advice_sources')
-        AdviceSource.objects.create(
-            pet=pet,
-            sources=','.join(advice_sources),
-            other_source=request.POST.get('advice_source_other', '')
-        )
-
-        # ── Commercial Diet History (dynamic table) ──
-        diet_types = request.POST.getlist('diet_type[]')
-        diet_brands = request.POST.getlist('diet_brand[]')
-        diet_products = request.POST.getlist('diet_product[]')
-        diet_amounts = request.POST.getlist('diet_amount[]')
-        diet_toppers = request.POST.getlist('diet_topper[]')
-        diet_topper_amts = request.POST.getlist('diet_topper_amount[]')
-        diet_meals = request.POST.getlist('diet_meals[]')
-        diet_since = request.POST.getlist('diet_since[]')
-        diet_reason = request.POST.getlist('diet_reason_stopped[]')
-
-        for i in range(len(diet_types)):
-            if diet_types[i] and diet_brands[i]:
-                CommercialDietHistory.objects.create(
-                    pet=pet,
-                    diet_type=diet_types[i],
-                    brand=diet_brands[i],
-                    product_details=diet_products[i] if i < len(diet_products) else '',
-                    amount_per_day=diet_amounts[i] if i < len(diet_amounts) else '',
-                    food_topper_details=diet_toppers[i] if i < len(diet_toppers) else '',
-                    topper_amount_per_meal=diet_topper_amts[i] if i < len(diet_topper_amts) else '',
-                    meals_per_day=int(diet_meals[i]) if i < len(diet_meals) and diet_meals[i] else 1,
-                    fed_since=diet_since[i] if i < len(diet_since) else '',
-                    reason_stopped=diet_reason[i] if i < len(diet_reason) else ''
-                )
 
-        # ── Homemade Diet History (dynamic table) ──
-        hd_ingredients = request.POST.getlist('hd_ingredient[]')
-        hd_quantities = request.POST.getlist('hd_quantity[]')
-        hd_preparations = request.POST.getlist('hd_preparation[]')
-        hd_frequencies = request.POST.getlist('hd_frequency[]')
-        hd_since = request.POST.getlist('hd_since[]')
-        hd_reason = request.POST.getlist('hd_reason_stopped[]')
-
-        for i in range(len(hd_ingredients)):
-            if hd_ingredients[i].strip():
-                HomemadeDietHistory.objects.create(
-                    pet=pet,
-                    ingredient_food_item=hd_ingredients[i],
-                    raw_quantity_per_day=hd_quantities[i] if i < len(hd_quantities) else '',
-                    preparation_method=hd_preparations[i] if i < len(hd_preparations) else '',
-                    feed_frequency_per_day=int(hd_frequencies[i]) if i < len(hd_frequencies) and hd_frequencies[i] else 1,
-                    fed_since=hd_since[i] if i < len(hd_since) else '',
-                    reason_stopped=hd_reason[i] if i < len(hd_reason) else ''
-                )
+async def intake_form_async_view(request):
+    """
+    Intake form with write-behind saving: the submission is validated,
+    journaled and answered with its case ID; the case reaches the database
+    shortly after, from the journal consumer.
+    """
+    if request.method == 'POST':
+        _, errors = validate_intake(request.POST)
+        if not errors:
+            try:
+                # Reserves the email, so a second submission for it is refused here
+                entry = await sync_to_async(journal.enqueue)(request.POST)
+            except journal.DuplicateEmail:
+                errors.append('A case already exists for this email address.')
+        if errors:
+            SUBMISSIONS.inc(source='async', outcome='invalid')
+            # form.js puts the posted answers back into the form
+            return await sync_to_async(render)(request, 'intake_form/form.html', {
+                'errors': errors, 'posted_answers': journal.post_to_dict(request.POST),
+            }, status=400)
+        SUBMISSIONS.inc(source='async', outcome='queued')
+        messages.success(request, f'Form submitted successfully! Your Case ID is: {entry["case_id"]}')
+        return redirect('success')
 
-        # ── Commercial Treat History (dynamic table) ──
-        ct_types = request.POST.getlist('ct_type[]')
-        ct_brands = request.POST.getlist('ct_brand[]')
-        ct_products = request.POST.getlist('ct_product[]')
-        ct_quantities = request.POST.getlist('ct_quantity[]')
-        ct_since = request.POST.getlist('ct_since[]')
-        ct_reason = request.POST.getlist('ct_reason_stopped[]')
-
-        for i in range(len(ct_types)):
-            if ct_types[i].strip():
-                CommercialTreatHistory.objects.create(
-                    pet=pet,
-                    treat_type=ct_types[i],
-                    brand=ct_brands[i] if i < len(ct_brands) else '',
-                    product_details=ct_products[i] if i < len(ct_products) else '',
-                    quantity_per_day=ct_quantities[i] if i < len(ct_quantities) else '',
-                    fed_since=ct_since[i] if i < len(ct_since) else '',
-                    reason_stopped=ct_reason[i] if i < len(ct_reason) else ''
-                )
+    return await sync_to_async(form_response)(request)
 
-        # ── Homemade Treat History (dynamic table) ──
-        treat_type_forms = request.POST.getlist('treat_type_form[]')
-        treat_ingredients = request.POST.getlist('treat_ingredient[]')
-        treat_preparations = request.POST.getlist('treat_preparation[]')
-        treat_quantities = request.POST.getlist('treat_quantity[]')
-        treat_since_list = request.POST.getlist('treat_since[]')
-        treat_reason = request.POST.getlist('treat_reason_stopped[]')
-
-        for i in range(len(treat_ingredients)):
-            if treat_ingredients[i].strip():
-                HomemadeTreatHistory.objects.create(
-                    pet=pet,
-                    treat_type_form=treat_type_forms[i] if i < len(treat_type_forms) else '',
-                    ingredient=treat_ingredients[i],
-                    preparation_method=treat_preparations[i] if i < len(treat_preparations) else '',
-                    quantity_per_day=treat_quantities[i] if i < len(treat_quantities) else '',
-                    fed_since=treat_since_list[i] if i < len(treat_since_list) else '',
-                    reason_stopped=treat_reason[i] if i < len(treat_reason) else ''
-                )
 
-        # ── Supplements (dynamic table) ──
-        supp_brands = request.POST.getlist('supplement_brand[]')
-        supp_forms = request.POST.getlist('supplement_form[]')
-        supp_amounts = request.POST.getlist('supplement_amount[]')
-        supp_per_day = request.POST.getlist('supplement_per_day[]')
-        supp_since = request.POST.getlist('supplement_since[]')
-
-        if request.POST.get('supplements_given') == 'yes':
-            for i in range(len(supp_brands)):
-                if supp_brands[i].strip():
-                    Supplement.objects.create(
-                        pet=pet,
-                        brand_name=supp_brands[i],
-                        form=supp_forms[i] if i < len(supp_forms) else '',
-                        amount=supp_amounts[i] if i < len(supp_amounts) else '',
-                        per_day=int(supp_per_day[i]) if i < len(supp_per_day) and supp_per_day[i] else 1,
-                        fed_since=supp_since[i] if i < len(supp_since) else ''
-                    )
-
-        # ── Recent Diet Changes (dynamic table) ──
-        if request.POST.get('diet_changed_2_3_months') == 'yes':
-            rdc_brands = request.POST.getlist('rdc_brand[]')
-            rdc_products = request.POST.getlist('rdc_product[]')
-            rdc_forms = request.POST.getlist('rdc_form[]')
-            rdc_amounts = request.POST.getlist('rdc_amount[]')
-            rdc_meals = request.POST.getlist('rdc_meals[]')
-            rdc_start = request.POST.getlist('rdc_start[]')
-            rdc_stop = request.POST.getlist('rdc_stop[]')
-            rdc_reason = request.POST.getlist('rdc_reason[]')
-
-            for i in range(len(rdc_products)):
-                if rdc_products[i].strip():
-                    RecentDietChange.objects.create(
-                        pet=pet,
-                        brand=rdc_brands[i] if i < len(rdc_brands) else '',
-                        product_food_ingredient=rdc_products[i],
-                        form_type=rdc_forms[i] if i < len(rdc_forms) else '',
-                        amount_per_day=rdc_amounts[i] if i < len(rdc_amounts) else '',
-                        meals_per_day=int(rdc_meals[i]) if i < len(rdc_meals) and rdc_meals[i] else 1,
-                        start_date=rdc_start[i] if i < len(rdc_start) else '',
-                        stop_date=rdc_stop[i] if i < len(rdc_stop) else '',
-                        reason_stopped=rdc_reason[i] if i < len(rdc_reason) else ''
-                    )
-
-        # ── Diet Plan Preferences ──
-        diet_plan_prefs = request.POST.getlist('diet_plan_preferences')
-        DietPlanPreferences.objects.create(
-            pet=pet,
-            preferences=','.join(diet_plan_prefs)
-        )
-
-        # ── Fitness & Activity ──
-        FitnessActivity.objects.create(
-            pet=pet,
-            activity_level=request.POST.get('activity_level', 'moderate'),
-            exercise_duration=request.POST.get('exercise_duration', ''),
-            leash_walk_frequency=request.POST.get('leash_walk_frequency', ''),
-            fenced_yard_access=request.POST.get('fenced_yard') == 'yes',
-            urban_rural=request.POST.get('urban_rural', ''),
-            travel_buddy=request.POST.get('travel_buddy', ''),
-            travel_modes=request.POST.get('travel_modes', ''),
-            exercise_types=','.join(request.POST.getlist('exercise_types')),
-            training_show_dog=request.POST.get('training_show_dog') == 'yes',
-            training_details=request.POST.get('training_details', ''),
-            recent_activity_changes=request.POST.get('recent_activity_changes') == 'yes',
-            activity_change_details=request.POST.get('activity_change_details', ''),
-            increase_exercise_feasible=request.POST.get('increase_exercise') == 'yes'
-        )
-
-        # ── Activity Details (table Q28) ──
-        act_types = ['run', 'walk', 'fetch', 'pulling', 'agility', 'swimming']
-        for act in act_types:
-            duration = request.POST.get(f'activity_{act}_duration', '')
-            freq = request.POST.get(f'activity_{act}_frequency', '')
-            if duration or freq:
-                ActivityDetail.objects.create(
-                    pet=pet,
-                    activity_type=act,
-                    duration_distance=duration,
-                    frequency_per_week=freq
-                )
+def _draft_state(draft, status=200):
+    return JsonResponse({
+        **draft_state(draft),
+        'url': reverse('draft', args=[draft.pk]),
+        'submit_url': reverse('draft_submit', args=[draft.pk]),
+    }, status=status)
 
-        # ── Rehabilitation Therapy ──
-        rehab_therapies = request.POST.getlist('rehab_therapies')
-        RehabilitationTherapy.objects.create(
-            pet=pet,
-            receives_therapy=request.POST.get('receives_rehab') == 'yes',
-            therapy_types=','.join(rehab_therapies)
-        )
-
-        # ── Medical History ──
-        weight_amount = request.POST.get('medical_weight_amount')
-        vomit_per_day = request.POST.get('medical_vomit_per_day')
-        poops_per_day = request.POST.get('medical_poops_per_day')
-        stool_types = request.POST.getlist('medical_stool_types')
-
-        # Q40: Medication admin method
-        med_admin = request.POST.getlist('medication_admin')
-        pill_pocket_details = request.POST.get('pill_pocket_details', '')
-        food_treat_details = request.POST.get('med_food_treat_details', '')
-        med_admin_str = ','.join(med_admin)
-        if pill_pocket_details:
-            med_admin_str += '|pill_pocket:' + pill_pocket_details
-        if food_treat_details:
-            med_admin_str += '|food_treat:' + food_treat_details
-
-        MedicalHistory.objects.create(
-            pet=pet,
-            weight_change=request.POST.get('medical_weight_change') == 'yes',
-            weight_change_type=request.POST.get('medical_weight_type', ''),
-            weight_change_amount_kg=float(weight_amount) if weight_amount else None,
-            weight_change_period=request.POST.get('medical_weight_period', ''),
-            difficulty_chewing='difficulty_chewing' in request.POST.getlist('medical_symptoms'),
-            difficulty_swallowing='difficulty_swallowing' in request.POST.getlist('medical_symptoms'),
-            excessive_salivation='excessive_salivation' in request.POST.getlist('medical_symptoms'),
-            symptom_details=request.POST.get('symptom_details', ''),
-            vomiting_per_day=int(vomit_per_day) if vomit_per_day else None,
-            vomiting_per_week=int(request.POST.get('medical_vomit_per_week', '') or 0) if request.POST.get('medical_vomit_per_week') else None,
-            vomiting_colour=request.POST.get('medical_vomit_colour', ''),
-            vomiting_since=request.POST.get('medical_vomit_since', ''),
-            urination_changed=request.POST.get('medical_urination_changed') == 'yes',
-            urination_direction=request.POST.get('medical_urination_direction', ''),
-            urine_colour=request.POST.get('medical_urine_colour', ''),
-            urine_change_since=request.POST.get('medical_urine_since', ''),
-            drinking_changed=request.POST.get('medical_drinking_changed') == 'yes',
-            drinking_direction=request.POST.get('medical_drinking_direction', ''),
-            drinking_change_since=request.POST.get('medical_drinking_since', ''),
-            stool_quality_changed=request.POST.get('medical_stool_changed') == 'yes',
-            stool_colour=request.POST.get('medical_stool_colour', ''),
-            poops_per_day=int(poops_per_day) if poops_per_day else None,
-            stool_types=','.join(stool_types),
-            stool_change_since=request.POST.get('medical_stool_since', ''),
-            medication_admin_method=med_admin_str
-        )
-
-        # ── Q41: Adverse Reactions (dynamic table) ──
-        if request.POST.get('has_adverse_reactions') == 'yes':
-            ar_brands = request.POST.getlist('ar_brand[]')
-            ar_products = request.POST.getlist('ar_product[]')
-            ar_forms = request.POST.getlist('ar_form[]')
-            ar_since = request.POST.getlist('ar_since[]')
-            ar_symptoms = request.POST.getlist('ar_symptoms[]')
-
-            for i in range(len(ar_products)):
-                if ar_products[i].strip():
-                    AdverseReaction.objects.create(
-                        pet=pet,
-                        brand=ar_brands[i] if i < len(ar_brands) else '',
-                        product_ingredient_medication=ar_products[i],
-                        form_type=ar_forms[i] if i < len(ar_forms) else '',
-                        fed_since=ar_since[i] if i < len(ar_since) else '',
-                        reaction_symptoms=ar_symptoms[i] if i < len(ar_symptoms) else ''
-                    )
-
-        # ── Q43: Chronic Condition ──
-        ChronicCondition.objects.create(
-            pet=pet,
-            has_chronic=request.POST.get('has_chronic_condition') == 'yes',
-            details=request.POST.get('chronic_condition_details', '')
-        )
-
-        # ── Vaccination Status ──
-        VaccinationStatus.objects.create(
-            pet=pet,
-            yearly_vaccinations=request.POST.get('vacc_yearly') == 'yes',
-            deworming=request.POST.get('vacc_deworming') == 'yes',
-            topical_tick_flea=request.POST.get('vacc_topical_tick', 'no'),
-            oral_tick_flea=request.POST.get('vacc_oral_tick', 'no')
-        )
-
-        # ── Primary Vet Info ──
-        PrimaryVetInfo.objects.create(
-            pet=pet,
-            vet_name=request.POST.get('vet_name'),
-            practice_name_location=request.POST.get('vet_practice'),
-            clinic_phone=request.POST.get('vet_phone'),
-            email=request.POST.get('vet_email')
-        )
-
-        # ── Consent Form ──
-        ConsentForm.objects.create(
-            pet_parent=pet_parent,
-            agreed=request.POST.get('consent_agreed') == 'yes'
-        )
 
-        messages.success(request, f'Form submitted successfully! Your Case ID is: {pet_parent.case_id}')
-        return redirect('success')
+def _draft_error(exc):
+    return JsonResponse({'error': str(exc), 'errors': exc.errors}, status=exc.status)
+
 
-    # GET request - show the form
-    return render(request, 'intake_form/form.html')
+@require_POST
+def draft_start_view(request):
+    """Open a draft for the intake form to autosave into"""
+    return _draft_state(DraftCase.objects.create(), status=201)
+
+
+@require_http_methods(['GET', 'PATCH'])
+def draft_view(request, draft_id):
+    """
+    GET: the saved answers by section, to resume the form.
+    PATCH: {"sections": {section: {field: [values]}}} replaces just those sections.
+    """
+    if request.method == 'PATCH':
+        try:
+            sections = json.loads(request.body).get('sections')
+        except (ValueError, AttributeError):
+            return JsonResponse({'error': 'Send a JSON object'}, status=400)
+        try:
+            saved = save_sections(draft_id, sections)
+        except DraftError as exc:
+            return _draft_error(exc)
+        return JsonResponse({'saved': saved})
+    draft = get_object_or_404(DraftCase.objects.select_related('case').prefetch_related('sections'), pk=draft_id)
+    return _draft_state(draft)
+
+
+@require_POST
+def draft_submit_view(request, draft_id):
+    """Turn a draft's saved answers into a case (safe to retry)"""
+    try:
+        pet_parent, created = submit_draft(draft_id)
+    except DraftError as exc:
+        if exc.errors:
+            SUBMISSIONS.inc(source='draft', outcome='invalid')
+        return _draft_error(exc)
+    if created:
+        SUBMISSIONS.inc(source='draft', outcome='saved')
+    messages.success(request, f'Form submitted successfully! Your Case ID is: {pet_parent.case_id}')
+    return JsonResponse({'case_id': pet_parent.case_id, 'redirect': reverse('success')})
 
 
 def success_view(request):
@@ -432,112 +124,141 @@ def success_view(request):
     return render(request, 'intake_form/success.html')
 
 
+@conditional_case_list
 def case_list_view(request):
-    """Dashboard: list of all submitted cases"""
-    q = request.GET.get('q', '')
-    parents = PetParent.objects.prefetch_related('pets').order_by('-created_at')
+    """
+    Dashboard: submitted cases, newest first, one keyset page at a time. The
+    stat card counts the rows on the page; a COUNT(*) of every case would cost
+    a full scan per visit.
+    """
+    q = request.GET.get('q', '').strip()
+    parents = PetParent.objects.prefetch_related('pets')
     if q:
-        parents = parents.filter(
-            db_models.Q(name__icontains=q) |
-            db_models.Q(case_id__icontains=q) |
-            db_models.Q(pets__name__icontains=q)
-        ).distinct()
-    return render(request, 'intake_form/case_list.html', {'parents': parents, 'q': q})
+        parents = search_cases(parents, q)
+    page, next_cursor = keyset_page(parents, request.GET.get('after'))
+    context = {
+        'parents': page,
+        'q': q,
+        'next_cursor': next_cursor,
+        'is_first_page': not request.GET.get('after'),
+    }
+    return render(request, 'intake_form/case_list.html', context)
+
+
+def case_export_view(request, table):
+    """One research table as CSV, streamed straight from the database cursor"""
+    tables = export_tables()
+    if table not in tables:
+        raise Http404(f'No export table {table!r}')
+    response = StreamingHttpResponse(stream_csv(tables[table]), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{table}.csv"'
+    return response
 
 
+def request_metrics_view(request):
+    """Rolling per-view query counts, SQL time, duplicates and latency for this process"""
+    return JsonResponse({'window': settings.REQUEST_METRICS_WINDOW, 'views': request_metrics.snapshot()})
+
+
+def prometheus_metrics_view(request):
+    """Prometheus scrape target, summed over every worker process (see metrics.py)"""
+    return HttpResponse(exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@cached_case_page('case_detail')
 def case_detail_view(request, pk):
     """Detail view: all info for one pet"""
-    pet = get_object_or_404(Pet.objects.select_related('owner'), pk=pk)
+    pet = get_object_or_404(case_graph_queryset(), pk=pk)
     return render(request, 'intake_form/case_detail.html', {'pet': pet})
 
 
+@cached_case_page('case_pdf')
 def case_pdf_view(request, pk):
     """Simple printable/PDF view"""
-    pet = get_object_or_404(Pet.objects.select_related('owner'), pk=pk)
+    pet = get_object_or_404(case_graph_queryset(), pk=pk)
+    uploads = uploads_by_category(pet)
     context = {
         'pet': pet,
-        'blood_work_uploads': pet.vet_uploads.filter(category='blood_work'),
-        'imaging_uploads': pet.vet_uploads.filter(category='diagnostic_imaging'),
+        'blood_work_uploads': uploads['blood_work'],
+        'imaging_uploads': uploads['diagnostic_imaging'],
     }
     return render(request, 'intake_form/case_pdf.html', context)
 
 
+def case_pdf_download_view(request, pk):
+    """Server-rendered PDF, straight from the artifact store when the case hasn't changed"""
+    pet = get_object_or_404(Pet.objects.select_related('owner'), pk=pk)
+    name, exists = current_artifact(pk)
+    if name is None:
+        raise Http404('No case version recorded for this pet')
+    if not exists:
+        try:
+            name = submit_render(pk).result(timeout=settings.CASE_PDF_WAIT_SECONDS)
+        except RenderTimeout:
+            response = HttpResponse('The PDF is still being generated, please retry in a moment.', status=202)
+            response['Retry-After'] = '2'
+            return response
+    return FileResponse(
+        default_storage.open(name, 'rb'),
+        content_type='application/pdf',
+        filename=case_pdf_filename(pet),
+    )
+
+
+# Vet form dynamic tables: model field -> POST list
+CONDITION_FIELDS = {
+    'condition_disease': 'cond_disease[]',
+    'clinical_symptoms': 'cond_symptoms[]',
+    'medication_name': 'cond_medication[]',
+    'dose_frequency': 'cond_dose[]',
+    'treatment_length': 'cond_length[]',
+}
+MEDICATION_FIELDS = {'medication_name': 'med_name[]', 'dose': 'med_dose[]', 'frequency': 'med_frequency[]'}
+SURGERY_FIELDS = {'surgery_name': 'surg_name[]', 'date_performed': 'surg_date[]'}
+IMAGING_FIELDS = {'imaging_type': 'img_type[]', 'date_performed': 'img_date[]'}
+
+
 def vet_form_view(request, pk):
     """Clinical history form filled by the referring vet"""
     pet = get_object_or_404(Pet.objects.select_related('owner'), pk=pk)
 
     if request.method == 'POST':
-        # Clinical History
-        clinical, _ = ClinicalHistory.objects.get_or_create(pet=pet)
-        clinical.additional_notes = request.POST.get('additional_notes', '')
-        clinical.save()
-
-        # Clear old rows and re-save (simple approach for dynamic tables)
-        ClinicalCondition.objects.filter(clinical_history=clinical).delete()
-        cond_diseases = request.POST.getlist('cond_disease[]')
-        cond_symptoms = request.POST.getlist('cond_symptoms[]')
-        cond_meds = request.POST.getlist('cond_medication[]')
-        cond_doses = request.POST.getlist('cond_dose[]')
-        cond_lengths = request.POST.getlist('cond_length[]')
-        for i in range(len(cond_diseases)):
-            if cond_diseases[i].strip():
-                ClinicalCondition.objects.create(
-                    clinical_history=clinical,
-                    condition_disease=cond_diseases[i],
-                    clinical_symptoms=cond_symptoms[i] if i < len(cond_symptoms) else '',
-                    medication_name=cond_meds[i] if i < len(cond_meds) else '',
-                    dose_frequency=cond_doses[i] if i < len(cond_doses) else '',
-                    treatment_length=cond_lengths[i] if i < len(cond_lengths) else ''
-                )
-
-        # Long-term Medications
-        LongTermMedication.objects.filter(pet=pet).delete()
-        med_names = request.POST.getlist('med_name[]')
-        med_doses = request.POST.getlist('med_dose[]')
-        med_freqs = request.POST.getlist('med_frequency[]')
-        for i in range(len(med_names)):
-            if med_names[i].strip():
-                LongTermMedication.objects.create(
-                    pet=pet,
-                    medication_name=med_names[i],
-                    dose=med_doses[i] if i < len(med_doses) else '',
-                    frequency=med_freqs[i] if i < len(med_freqs) else ''
-                )
-
-        # Surgical History
-        SurgicalHistory.objects.filter(pet=pet).delete()
-        surg_names = request.POST.getlist('surg_name[]')
-        surg_dates = request.POST.getlist('surg_date[]')
-        for i in range(len(surg_names)):
-            if surg_names[i].strip():
-                SurgicalHistory.objects.create(
-                    pet=pet,
-                    surgery_name=surg_names[i],
-                    date_performed=surg_dates[i] if i < len(surg_dates) else ''
-                )
-
-        # Diagnostic Imaging
-        DiagnosticImaging.objects.filter(pet=pet).delete()
-        img_types = request.POST.getlist('img_type[]')
-        img_dates = request.POST.getlist('img_date[]')
-        for i in range(len(img_types)):
-            if img_types[i].strip():
-                DiagnosticImaging.objects.create(
-                    pet=pet,
-                    imaging_type=img_types[i],
-                    date_performed=img_dates[i] if i < len(img_dates) else ''
-                )
-
-        # Vet File Uploads (additive — NOT delete-and-recreate)
+        with transaction.atomic():
+            # Clinical History
+            clinical, _ = ClinicalHistory.objects.get_or_create(pet=pet)
+            notes = request.POST.get('additional_notes', '')
+            if notes != clinical.additional_notes:
+                clinical.additional_notes = notes
+                clinical.save(update_fields=['additional_notes'])
+
+            # Dynamic tables: write only the rows that changed (see row_sync.py)
+            synced = [
+                sync_rows(clinical.conditions.all(), posted_rows(request.POST, 'cond_id[]', CONDITION_FIELDS),
+                          CONDITION_FIELDS, clinical_history=clinical),
+                sync_rows(pet.long_term_medications.all(), posted_rows(request.POST, 'med_id[]', MEDICATION_FIELDS),
+                          MEDICATION_FIELDS, pet=pet),
+                sync_rows(pet.surgical_history.all(), posted_rows(request.POST, 'surg_id[]', SURGERY_FIELDS),
+                          SURGERY_FIELDS, pet=pet),
+                sync_rows(pet.diagnostic_imaging.all(), posted_rows(request.POST, 'img_id[]', IMAGING_FIELDS),
+                          IMAGING_FIELDS, pet=pet),
+            ]
+            # bulk_create/bulk_update send no signals, so bump the case version here
+            if any(result.changed for result in synced):
+                CaseVersion.bump(pet_id=pet.pk)
+
+        # Vet File Uploads (additive — NOT delete-and-recreate). The page sends
+        # files through the chunked upload endpoints; this is the no-JS fallback.
         for category in ['blood_work', 'diagnostic_imaging']:
             files = request.FILES.getlist(f'vet_files_{category}')
             for f in files:
-                VetUpload.objects.create(
+                upload = VetUpload.objects.create(
                     pet=pet,
                     category=category,
                     file=f,
                     original_filename=f.name,
                 )
+                UPLOAD_BYTES.inc(f.size, path='form')
+                enqueue_processing(upload.pk)
 
         messages.success(request, 'Clinical history saved successfully.')
         return redirect('case_detail', pk=pet.pk)
@@ -558,6 +279,7 @@ def vet_form_view(request, pk):
         'imaging': pet.diagnostic_imaging.all(),
         'blood_work_uploads': pet.vet_uploads.filter(category='blood_work'),
         'imaging_uploads': pet.vet_uploads.filter(category='diagnostic_imaging'),
+        'upload_chunk_size': settings.VET_UPLOAD_CHUNK_SIZE,
     }
     return render(request, 'intake_form/vet_form.html', context)
 
@@ -570,3 +292,64 @@ def delete_vet_upload(request, upload_id):
     upload.delete()
     messages.success(request, 'File removed successfully.')
     return redirect('vet_form', pk=pet_pk)
+
+
+# ═══════════════════════════════════════════════════════
+# CHUNKED VET UPLOADS (see uploads.py)
+# ═══════════════════════════════════════════════════════
+
+def _upload_state(session, status=200):
+    response = JsonResponse({
+        'id': str(session.pk),
+        'url': reverse('upload_chunk', args=[session.pk]),
+        'offset': session.received,
+        'size': session.size,
+        'upload_id': session.upload_id,
+    }, status=status)
+    response['Upload-Offset'] = str(session.received)
+    return response
+
+
+@require_POST
+def upload_start_view(request, pk):
+    """Open a resumable upload: POST category, filename and size"""
+    pet = get_object_or_404(Pet, pk=pk)
+    try:
+        size = int(request.POST.get('size', ''))
+        session = start_session(pet, request.POST.get('category', ''), request.POST.get('filename', ''), size)
+    except ValueError:
+        return JsonResponse({'error': 'size must be a whole number of bytes'}, status=400)
+    except UploadError as exc:
+        return JsonResponse({'error': str(exc)}, status=exc.status)
+    return _upload_state(session, status=201)
+
+
+@require_http_methods(['GET', 'HEAD', 'PATCH', 'DELETE'])
+def upload_chunk_view(request, session_id):
+    """
+    GET/HEAD: how many bytes have been stored (to resume from).
+    PATCH: append the raw request body at the Upload-Offset header.
+    DELETE: abandon the upload.
+    """
+    session = get_object_or_404(UploadSession, pk=session_id)
+    if request.method == 'DELETE':
+        discard_session(session)
+        return HttpResponse(status=204)
+    if request.method == 'PATCH':
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers.get('Content-Length') or 0)
+        except (KeyError, ValueError):
+            return JsonResponse({'error': 'Upload-Offset and Content-Length headers are required'}, status=400)
+        try:
+            # Read the body as a stream; never load it into memory whole
+            append_chunk(session, offset, request, length)
+        except OffsetMismatch as exc:
+            response = JsonResponse({'error': str(exc), 'offset': exc.offset}, status=exc.status)
+            response['Upload-Offset'] = str(exc.offset)
+            if exc.retry_after:
+                response['Retry-After'] = str(exc.retry_after)
+            return response
+        except UploadError as exc:
+            return JsonResponse({'error': str(exc)}, status=exc.status)
+    return _upload_state(session)
@@ -41,7 +41,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'intake_form.middleware.RequestTimingMiddleware',
+    'intake_form.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'intake_form.middleware.StaticFilesMiddleware',
+    'intake_form.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -56,8 +60,15 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Parse each template once per process (Django's default, spelled
+            # out); the autoreloader still picks up edits under runserver
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
@@ -77,6 +88,48 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections (and their page cache) across requests
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Take the write lock up front: no read-to-write upgrade deadlocks
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+}
+
+# Read replica (intake_form/routers.py)
+# To move reporting reads off the primary, add the replica as a second
+# DATABASES alias and name it in READ_REPLICA, e.g. for a SQLite copy kept
+# fresh by `manage.py sync_replica --follow`:
+#     DATABASES['replica'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'replica.sqlite3',
+#                             'TEST': {'MIRROR': 'default'}}
+#     READ_REPLICA = 'replica'
+# GETs of READ_REPLICA_VIEWS then read from it, except for a browser that
+# wrote something in the last READ_REPLICA_STICKY_SECONDS.
+DATABASE_ROUTERS = ['intake_form.routers.ReplicaRouter']
+READ_REPLICA = None
+READ_REPLICA_VIEWS = ['case_list', 'case_detail', 'case_pdf', 'case_pdf_file', 'case_export']
+READ_REPLICA_STICKY_SECONDS = 30
+
+# Per-connection SQLite pragmas (intake_form/db_tuning.py): WAL, busy timeout,
+# mmap and page cache. Override single pragmas here; None keeps SQLite's default.
+SQLITE_PRAGMAS = {}
+
+
+# Cache
+# Rendered case pages are keyed by case version (intake_form/case_cache.py);
+# LocMemCache evicts least-recently-used entries once MAX_ENTRIES is reached.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'nutrivet',
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+            'CULL_FREQUENCY': 10,
+        },
     }
 }
 
@@ -117,6 +170,72 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Static assets (WhiteNoise)
+# `manage.py collectstatic` fingerprints everything into STATIC_ROOT and
+# precompresses it (gzip; brotli too with the brotli package installed);
+# StaticFilesMiddleware (WhiteNoise's, async-capable) serves it, caching
+# hashed names as immutable. With DEBUG off a name missing from the
+# manifest is an error, so a deploy that skipped collectstatic fails on its
+# first page instead of linking unhashed, uncached files.
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+        else 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Response compression (intake_form/compression.py)
+# Text responses of at least COMPRESSION_MIN_BYTES go out gzip- or
+# brotli-compressed; streamed ones (CSV exports) always.
+COMPRESSION_MIN_BYTES = 1024
+
 # Media files (User uploads)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Case PDFs (intake_form/case_pdf.py)
+# Rendered in a background thread pool and stored under MEDIA_ROOT/case_pdfs,
+# one file per case version. A download request waits up to
+# CASE_PDF_WAIT_SECONDS for a fresh render before answering 202.
+CASE_PDF_WORKERS = 2
+CASE_PDF_WAIT_SECONDS = 10
+
+# Chunked vet uploads (intake_form/uploads.py)
+# Partial files live under MEDIA_ROOT/partial_uploads until the last chunk
+# arrives; post-processing (type sniffing, thumbnails) runs on a thread pool.
+# `manage.py purge_upload_sessions` deletes unfinished uploads idle for more
+# than VET_UPLOAD_SESSION_MAX_AGE_DAYS.
+VET_UPLOAD_MAX_SIZE = 1024 * 1024 * 1024
+VET_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+VET_UPLOAD_WORKERS = 2
+VET_UPLOAD_SESSION_MAX_AGE_DAYS = 7
+
+# Write-behind intake (intake_form/journal.py)
+# The async intake view journals submissions here; a background consumer
+# (or `manage.py drain_intake_journal`) saves them in batches.
+INTAKE_JOURNAL_DIR = BASE_DIR / 'intake_journal'
+INTAKE_JOURNAL_FSYNC = True
+INTAKE_JOURNAL_BATCH_SIZE = 50
+INTAKE_JOURNAL_WORKERS = 1
+# Case IDs each process reserves at a time for journaled submissions
+INTAKE_JOURNAL_CASE_ID_BLOCK = 20
+
+# Intake drafts (intake_form/drafts.py)
+# The form autosaves each step into a draft; `manage.py purge_intake_drafts`
+# deletes drafts older than INTAKE_DRAFT_MAX_AGE_DAYS.
+INTAKE_DRAFT_MAX_AGE_DAYS = 30
+
+# Request instrumentation (intake_form/instrumentation.py)
+# Every response carries a Server-Timing header (db, view, total); the last
+# REQUEST_METRICS_WINDOW requests per view are summarised at metrics/requests/.
+REQUEST_METRICS_WINDOW = 500
+
+# Prometheus metrics (intake_form/metrics.py), scraped at /metrics
+# Single process: leave METRICS_DIR unset. With several workers, set it to a
+# directory they share; each worker writes its totals there every
+# METRICS_FLUSH_SECONDS and any worker's /metrics sums them (exited workers'
+# files are folded into one as it goes).
+METRICS_DIR = None
+METRICS_FLUSH_SECONDS = 5
@@ -2,10 +2,12 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from intake_form.views import prometheus_metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('intake/', include('intake_form.urls')),
+    path('metrics', prometheus_metrics_view, name='prometheus_metrics'),
 ]
 
 if settings.DEBUG: